@@ -0,0 +1,417 @@
+import asyncio
+import heapq
+import itertools
+import logging
+import threading
+import time
+from contextlib import asynccontextmanager, contextmanager
+from typing import Any, AsyncIterator, Callable, Dict, Iterator, List, Optional, Tuple
+
+from core.config import settings
+from core.metrics import REGISTRY, Counter, Histogram
+
+logger = logging.getLogger(__name__)
+
+# Lower value is served first
+PRIORITIES = {"interactive": 0, "standard": 1, "background": 2}
+
+QUEUE_WAIT_SECONDS: Histogram = REGISTRY.register(Histogram(
+    "racksavant_admission_wait_seconds",
+    "Time spent queued for an agent slot or an LLM call",
+    ("priority", "queue")
+))
+ADMISSION_DECISIONS: Counter = REGISTRY.register(Counter(
+    "racksavant_admission_decisions_total",
+    "LLM admission outcomes: admitted, shed, or how a shed call was answered",
+    ("priority", "outcome")
+))
+
+class AdmissionRejected(RuntimeError):
+    """Raised when an LLM call is shed instead of queued."""
+
+    def __init__(self, message: str, retry_after: float = 1.0):
+        super().__init__(message)
+        self.retry_after = retry_after
+
+def estimate_tokens(text: str) -> int:
+    """Rough token count, about four characters per token for English text."""
+    return len(text) // 4 + 1
+
+def llm_scope(llm: Any) -> Tuple[str, str]:
+    """``(provider, model)`` that a model's rate limits apply to."""
+    try:
+        provider = llm._llm_type
+    except Exception:
+        provider = type(llm).__name__
+    model = getattr(llm, "model_name", None) or getattr(llm, "model", None) or type(llm).__name__
+    return str(provider), str(model)
+
+class TokenBucket:
+    """Refills at ``per_minute / 60`` per second up to one minute's worth.
+
+    Not thread-safe; ``ModelLimiter`` guards its buckets with its own lock.
+    """
+
+    def __init__(self, per_minute: float):
+        self.capacity = per_minute
+        self.rate = per_minute / 60.0
+        self.level = per_minute
+        self._updated = time.monotonic()
+
+    def refill(self, now: float) -> None:
+        self.level = min(self.capacity, self.level + (now - self._updated) * self.rate)
+        self._updated = now
+
+    def wait_time(self, amount: float) -> float:
+        """Seconds until ``amount`` is available; larger-than-capacity requests wait for a full bucket."""
+        missing = min(amount, self.capacity) - self.level
+        return max(0.0, missing / self.rate) if self.rate > 0 else float("inf")
+
+class _Waiter:
+    __slots__ = ("priority", "cost", "shed_at", "enqueued", "wake", "done", "outcome")
+
+    def __init__(self, priority: int, cost: int, shed_at: float, wake: Callable[[], None]):
+        self.priority = priority
+        self.cost = cost
+        self.shed_at = shed_at
+        self.enqueued = time.monotonic()
+        self.wake = wake
+        self.done = False
+        self.outcome: Optional[str] = None
+
+class Permit:
+    """An admitted LLM call; ``record`` reconciles the token estimate with actual usage."""
+
+    def __init__(self, limiter: "ModelLimiter", prompt: str, cost: int):
+        self.limiter = limiter
+        self.prompt = prompt
+        self.cost = cost
+
+    def record(self, response: str) -> None:
+        actual = estimate_tokens(self.prompt) + estimate_tokens(response)
+        self.limiter.refund(self.cost - actual)
+
+class ModelLimiter:
+    """Admission queue and rate limits for one provider/model.
+
+    A call is admitted when a concurrency slot, a request and its estimated
+    tokens are all available. Waiters are served strictly by priority, then
+    arrival order. A call is shed up front when the tokens already queued
+    ahead of it can't be served before its deadline, or later when its
+    deadline arrives while still queued, leaving ``min_service_seconds`` for
+    the call itself. A provider rate-limit error pauses admission for
+    ``backoff_seconds`` so retries don't pile onto a throttled provider.
+    """
+
+    def __init__(
+        self,
+        name: str,
+        requests_per_minute: float,
+        tokens_per_minute: float,
+        max_in_flight: int,
+        max_queued: int = 256,
+        min_service_seconds: float = 2.0,
+        backoff_seconds: float = 1.0
+    ):
+        self.name = name
+        self.requests = TokenBucket(requests_per_minute)
+        self.tokens = TokenBucket(tokens_per_minute)
+        self.max_in_flight = max_in_flight
+        self.max_queued = max_queued
+        self.min_service_seconds = min_service_seconds
+        self.backoff_seconds = backoff_seconds
+        self.in_flight = 0
+        self._paused_until = 0.0
+        self._queue: List[Tuple[int, int, _Waiter]] = []
+        self._sequence = itertools.count()
+        self._lock = threading.Lock()
+
+    def _enqueue(self, priority: str, cost: int, deadline: Optional[float], wake: Callable[[], None]) -> _Waiter:
+        rank = PRIORITIES.get(priority, PRIORITIES["standard"])
+        now = time.monotonic()
+        if deadline is None:
+            deadline = now + settings.llm_admission_max_wait_seconds + self.min_service_seconds
+        waiter = _Waiter(rank, cost, deadline - self.min_service_seconds, wake)
+        with self._lock:
+            self.requests.refill(now)
+            self.tokens.refill(now)
+            ahead = [w for _, _, w in self._queue if not w.done and w.priority <= rank]
+            if len(ahead) >= self.max_queued:
+                self._reject(priority, "shed_queue_full")
+            # Best case: everything ahead of us is served as fast as the buckets refill
+            expected = max(
+                self._paused_until - now,
+                self.requests.wait_time(len(ahead) + 1),
+                self.tokens.wait_time(sum(w.cost for w in ahead) + cost)
+            )
+            if now + expected > waiter.shed_at:
+                self._reject(priority, "shed_deadline")
+            heapq.heappush(self._queue, (rank, next(self._sequence), waiter))
+            self._dispatch(now)
+        return waiter
+
+    def _reject(self, priority: str, outcome: str) -> None:
+        ADMISSION_DECISIONS.inc(priority=priority, outcome=outcome)
+        retry_after = max(1.0, self.requests.wait_time(1), self.tokens.wait_time(self.tokens.capacity / 10))
+        raise AdmissionRejected(f"{self.name} is overloaded ({outcome})", retry_after=retry_after)
+
+    def _dispatch(self, now: float) -> Optional[float]:
+        """Admit or shed waiters at the head of the queue; call with the lock held.
+
+        Returns how long until the head could be admitted, or None when it is
+        waiting for a slot to be released (or the queue is empty).
+        """
+        while self._queue:
+            waiter = self._queue[0][2]
+            if waiter.done:
+                heapq.heappop(self._queue)
+                continue
+            if now >= waiter.shed_at:
+                heapq.heappop(self._queue)
+                self._settle(waiter, "shed_deadline")
+                continue
+            if self.in_flight >= self.max_in_flight:
+                return None
+            self.requests.refill(now)
+            self.tokens.refill(now)
+            wait = max(self._paused_until - now, self.requests.wait_time(1), self.tokens.wait_time(waiter.cost))
+            if wait > 0:
+                return wait
+            heapq.heappop(self._queue)
+            self.requests.level -= 1
+            self.tokens.level -= waiter.cost
+            self.in_flight += 1
+            self._settle(waiter, "admitted")
+        return None
+
+    @staticmethod
+    def _settle(waiter: _Waiter, outcome: str) -> None:
+        waiter.done = True
+        waiter.outcome = outcome
+        waiter.wake()
+
+    def _poll(self, waiter: _Waiter) -> Optional[float]:
+        """Advance the queue; returns how long to sleep, or None once ``waiter`` is settled."""
+        now = time.monotonic()
+        with self._lock:
+            wait = self._dispatch(now)
+            if not waiter.done and now >= waiter.shed_at:
+                # Out of time behind the head of the queue; it's removed lazily
+                self._settle(waiter, "shed_deadline")
+            if waiter.done:
+                return None
+            timeout = waiter.shed_at - now
+            return max(0.0, min(timeout, wait) if wait is not None else timeout)
+
+    def _abandon(self, waiter: _Waiter) -> None:
+        """The caller stopped waiting; release the slot if it was granted meanwhile."""
+        with self._lock:
+            granted = waiter.outcome == "admitted"
+            waiter.done = True
+        if granted:
+            self.release()
+
+    def _admitted(self, waiter: _Waiter, priority: str, prompt: str) -> Permit:
+        QUEUE_WAIT_SECONDS.observe(time.monotonic() - waiter.enqueued, priority=priority, queue=self.name)
+        ADMISSION_DECISIONS.inc(priority=priority, outcome=waiter.outcome)
+        if waiter.outcome != "admitted":
+            raise AdmissionRejected(f"{self.name} queue wait would pass the deadline")
+        return Permit(self, prompt, waiter.cost)
+
+    def acquire(self, prompt: str, priority: str, deadline: Optional[float]) -> Permit:
+        """Block until the call is admitted, raising ``AdmissionRejected`` if it is shed."""
+        event = threading.Event()
+        waiter = self._enqueue(priority, self._cost(prompt), deadline, event.set)
+        try:
+            while True:
+                timeout = self._poll(waiter)
+                if timeout is None:
+                    break
+                event.wait(timeout)
+                event.clear()
+        except BaseException:
+            self._abandon(waiter)
+            raise
+        return self._admitted(waiter, priority, prompt)
+
+    async def aacquire(self, prompt: str, priority: str, deadline: Optional[float]) -> Permit:
+        """Async ``acquire``; waiting doesn't tie up a thread."""
+        loop = asyncio.get_running_loop()
+        event = asyncio.Event()
+        waiter = self._enqueue(priority, self._cost(prompt), deadline, lambda: loop.call_soon_threadsafe(event.set))
+        try:
+            while True:
+                timeout = self._poll(waiter)
+                if timeout is None:
+                    break
+                try:
+                    await asyncio.wait_for(event.wait(), timeout)
+                except asyncio.TimeoutError:
+                    pass
+                event.clear()
+        except BaseException:
+            self._abandon(waiter)
+            raise
+        return self._admitted(waiter, priority, prompt)
+
+    def release(self, rate_limited: bool = False) -> None:
+        with self._lock:
+            self.in_flight -= 1
+            now = time.monotonic()
+            if rate_limited:
+                self._paused_until = max(self._paused_until, now + self.backoff_seconds)
+            self._dispatch(now)
+
+    def refund(self, tokens: float) -> None:
+        """Return over-estimated tokens to the bucket; negative values charge the difference."""
+        with self._lock:
+            self.tokens.level = min(self.tokens.capacity, self.tokens.level + tokens)
+
+    @staticmethod
+    def _cost(prompt: str) -> int:
+        return estimate_tokens(prompt) + settings.llm_admission_output_tokens
+
+    def stats(self) -> Dict[str, Any]:
+        with self._lock:
+            queued = [w for _, _, w in self._queue if not w.done]
+            return {
+                "in_flight": self.in_flight,
+                "max_in_flight": self.max_in_flight,
+                "queued": {
+                    name: sum(1 for w in queued if w.priority == rank) for name, rank in PRIORITIES.items()
+                },
+                "requests_available": round(self.requests.level, 1),
+                "tokens_available": round(self.tokens.level, 1),
+                "paused": self._paused_until > time.monotonic()
+            }
+
+def _is_rate_limit(error: BaseException) -> bool:
+    return getattr(error, "status_code", None) == 429 or "ratelimit" in type(error).__name__.lower()
+
+class AdmissionController:
+    """Process-wide admission control shared by every agent's LLM calls.
+
+    Keeps one ``ModelLimiter`` per provider/model, configured from
+    ``llm_rate_limits`` (keyed by ``"provider:model"`` or just the model)
+    with the ``llm_*_per_minute`` and ``llm_max_in_flight`` settings as
+    defaults.
+    """
+
+    def __init__(self):
+        self._limiters: Dict[Tuple[str, str], ModelLimiter] = {}
+        self._lock = threading.Lock()
+
+    def limiter_for(self, llm: Any) -> ModelLimiter:
+        scope = llm_scope(llm)
+        with self._lock:
+            limiter = self._limiters.get(scope)
+            if limiter is None:
+                provider, model = scope
+                limits = settings.llm_rate_limits.get(f"{provider}:{model}") or settings.llm_rate_limits.get(model, {})
+                limiter = self._limiters[scope] = ModelLimiter(
+                    f"{provider}/{model}",
+                    requests_per_minute=limits.get("rpm", settings.llm_requests_per_minute),
+                    tokens_per_minute=limits.get("tpm", settings.llm_tokens_per_minute),
+                    max_in_flight=int(limits.get("max_in_flight", settings.llm_max_in_flight)),
+                    max_queued=settings.llm_admission_queue_size,
+                    min_service_seconds=settings.llm_admission_min_service_seconds,
+                    backoff_seconds=settings.llm_rate_limit_backoff_seconds
+                )
+            return limiter
+
+    @contextmanager
+    def admit(self, llm: Any, prompt: str, priority: str, deadline: Optional[float] = None) -> Iterator[Permit]:
+        """Hold an admission slot for one blocking LLM call.
+
+        ``deadline`` is a ``time.monotonic()`` timestamp. Raises
+        ``AdmissionRejected`` if the call is shed.
+        """
+        limiter = self.limiter_for(llm)
+        permit = limiter.acquire(prompt, priority, deadline)
+        rate_limited = False
+        try:
+            yield permit
+        except BaseException as e:
+            rate_limited = _is_rate_limit(e)
+            raise
+        finally:
+            limiter.release(rate_limited)
+
+    @asynccontextmanager
+    async def aadmit(
+        self,
+        llm: Any,
+        prompt: str,
+        priority: str,
+        deadline: Optional[float] = None
+    ) -> AsyncIterator[Permit]:
+        """Async ``admit``, for streamed calls."""
+        limiter = self.limiter_for(llm)
+        permit = await limiter.aacquire(prompt, priority, deadline)
+        rate_limited = False
+        try:
+            yield permit
+        except BaseException as e:
+            rate_limited = _is_rate_limit(e)
+            raise
+        finally:
+            limiter.release(rate_limited)
+
+    def stats(self) -> Dict[str, Any]:
+        with self._lock:
+            limiters = list(self._limiters.values())
+        return {limiter.name: limiter.stats() for limiter in limiters}
+
+class PrioritySemaphore:
+    """``asyncio.Semaphore`` that hands free slots to the highest-priority waiter.
+
+    Used for the agent runtime's concurrency cap so a backlog of background
+    work can't hold every slot while interactive requests queue behind it.
+    """
+
+    def __init__(self, value: int):
+        self._value = value
+        self._waiters: List[Tuple[int, int, asyncio.Future]] = []
+        self._sequence = itertools.count()
+
+    async def acquire(self, priority: str = "standard") -> None:
+        started = time.monotonic()
+        if self._value > 0 and not self._waiters:
+            self._value -= 1
+        else:
+            future = asyncio.get_running_loop().create_future()
+            heapq.heappush(
+                self._waiters, (PRIORITIES.get(priority, PRIORITIES["standard"]), next(self._sequence), future)
+            )
+            try:
+                await future
+            except asyncio.CancelledError:
+                if future.done() and not future.cancelled():
+                    # Granted just as we gave up: pass the slot on
+                    self.release()
+                raise
+        QUEUE_WAIT_SECONDS.observe(time.monotonic() - started, priority=priority, queue="agent_slots")
+
+    def release(self) -> None:
+        while self._waiters:
+            _, _, future = heapq.heappop(self._waiters)
+            if not future.done():
+                future.set_result(None)
+                return
+        self._value += 1
+
+    def queued(self) -> int:
+        return sum(1 for _, _, future in self._waiters if not future.done())
+
+_default_controller: Optional[AdmissionController] = None
+_default_controller_lock = threading.Lock()
+
+def get_admission_controller() -> Optional[AdmissionController]:
+    """Return the process-wide admission controller, or None if disabled in settings."""
+    global _default_controller
+    if not settings.llm_admission_enabled:
+        return None
+    with _default_controller_lock:
+        if _default_controller is None:
+            _default_controller = AdmissionController()
+        return _default_controller
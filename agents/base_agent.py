@@ -1,26 +1,214 @@
+import asyncio
+import time
 from abc import ABC, abstractmethod
-from typing import Dict, Any, List
+from typing import AsyncIterator, Dict, Any, List, Optional
 from langchain import BaseLanguageModel
 from pydantic import BaseModel
+from core.config import settings
+from core.metrics import STAGE_ERRORS, STAGE_SECONDS, timed
+from .admission import ADMISSION_DECISIONS, AdmissionRejected, get_admission_controller
+from .conversation_history import ConversationHistory, get_conversation_store
+from .llm_cache import get_llm_cache
 
 class AgentContext(BaseModel):
     """Context information available to all agents."""
     user_profile: Dict[str, Any]
     conversation_history: List[Dict[str, str]]
     current_state: Dict[str, Any]
+    # When set, history is loaded from and saved to the conversation store
+    user_id: Optional[str] = None
 
 class BaseAgent(ABC):
     """Base class for all fashion recommendation agents."""
     
+    # Whether near-duplicate inputs may reuse a cached response; callers
+    # pass the variable part of the prompt as ``semantic_text``
+    semantic_cache = False
+    
+    # Admission priority class: interactive, standard or background
+    priority = "standard"
+    
     def __init__(self, llm: BaseLanguageModel, context: AgentContext):
         self.llm = llm
         self.context = context
+        self.llm_cache = get_llm_cache()
+        self.admission = get_admission_controller()
+        # time.monotonic() by which the caller needs an answer; set by AgentRuntime
+        self.deadline: Optional[float] = None
+        # Set once a shed call has been answered with degraded_response
+        self.degraded = False
+        self._history: Optional[ConversationHistory] = None
+    
+    def history(self) -> ConversationHistory:
+        """Conversation history for this request's session.
+        
+        Sessions with a ``user_id`` come from the persistent store (seeded from
+        ``context.conversation_history`` the first time); anonymous requests
+        get a bounded history built from the context alone.
+        """
+        if self._history is None:
+            if self.context.user_id:
+                self._history = get_conversation_store().get(
+                    self.context.user_id, seed=self.context.conversation_history
+                )
+            else:
+                self._history = ConversationHistory.from_messages(
+                    self.context.conversation_history,
+                    max_turns=settings.max_conversation_history,
+                    summary_tokens=settings.conversation_summary_tokens
+                )
+        return self._history
+    
+    def record_turn(self, user: str, assistant: str) -> None:
+        """Append a turn to the session history and persist it."""
+        history = self.history()
+        history.append(user, assistant)
+        if self.context.user_id:
+            get_conversation_store().save(self.context.user_id, history)
+    
+    def predict(self, prompt: str, semantic_text: Optional[str] = None) -> str:
+        """Call the LLM through the shared response cache and admission control.
+        
+        With ``semantic_cache`` enabled, a response cached for a similar
+        ``semantic_text`` from this agent type may be reused. Cache hits skip
+        admission. A call that is shed gets ``_shed``'s answer.
+        """
+        semantic_text = self._semantic_text(semantic_text)
+        namespace = self.get_agent_type()
+        with timed("llm_predict", agent=namespace):
+            if self.llm_cache is not None:
+                cached = self.llm_cache.lookup(self.llm, prompt, semantic_text, namespace)
+                if cached is not None:
+                    return cached
+            if self.admission is None:
+                response = self.llm.predict(prompt)
+            else:
+                try:
+                    with self.admission.admit(self.llm, prompt, self.priority, self.deadline) as permit:
+                        response = self.llm.predict(prompt)
+                        permit.record(response)
+                except AdmissionRejected as e:
+                    return self._shed(prompt, semantic_text, e)
+            if self.llm_cache is not None:
+                self.llm_cache.remember(self.llm, prompt, response, semantic_text, namespace)
+            return response
+    
+    def _semantic_text(self, semantic_text: Optional[str]) -> Optional[str]:
+        return semantic_text if self.semantic_cache else None
+    
+    async def astream_predict(self, prompt: str, semantic_text: Optional[str] = None) -> AsyncIterator[str]:
+        """Yield the LLM's response in chunks as they are generated.
+        
+        Cache hits arrive as a single chunk, and a streamed response is cached
+        once complete. Models without ``astream`` yield one chunk at the end.
+        The admission slot is held until the stream ends, and a shed call
+        yields ``_shed``'s answer as one chunk. Time to first chunk is
+        recorded as the ``llm_first_token`` stage.
+        """
+        semantic_text = self._semantic_text(semantic_text)
+        if self.llm_cache is not None:
+            cached = await asyncio.to_thread(
+                self.llm_cache.lookup, self.llm, prompt, semantic_text, self.get_agent_type()
+            )
+            if cached is not None:
+                yield cached
+                return
+        if self.admission is None:
+            async for chunk in self._astream_llm(prompt, semantic_text):
+                yield chunk
+            return
+        admitted = False
+        try:
+            async with self.admission.aadmit(self.llm, prompt, self.priority, self.deadline) as permit:
+                admitted = True
+                chunks = []
+                async for chunk in self._astream_llm(prompt, semantic_text):
+                    chunks.append(chunk)
+                    yield chunk
+                permit.record("".join(chunks))
+        except AdmissionRejected as e:
+            if admitted:
+                raise
+            yield await asyncio.to_thread(self._shed, prompt, semantic_text, e)
+    
+    async def _astream_llm(self, prompt: str, semantic_text: Optional[str]) -> AsyncIterator[str]:
+        agent = self.get_agent_type()
+        if hasattr(self.llm, "astream"):
+            source = self.llm.astream(prompt)
+        else:
+            source = self._apredict_chunks(prompt)
+        chunks = []
+        started = time.perf_counter()
+        try:
+            async for chunk in source:
+                # Chat models stream message chunks, plain LLMs stream strings
+                text = getattr(chunk, "content", chunk)
+                if not text:
+                    continue
+                if not chunks:
+                    STAGE_SECONDS.observe(time.perf_counter() - started, stage="llm_first_token", agent=agent)
+                chunks.append(text)
+                yield text
+        except Exception:
+            STAGE_ERRORS.inc(stage="llm_stream", agent=agent)
+            raise
+        STAGE_SECONDS.observe(time.perf_counter() - started, stage="llm_stream", agent=agent)
+        if self.llm_cache is not None:
+            await asyncio.to_thread(
+                self.llm_cache.remember, self.llm, prompt, "".join(chunks), semantic_text, agent
+            )
+    
+    async def _apredict_chunks(self, prompt: str) -> AsyncIterator[str]:
+        yield await asyncio.to_thread(self.llm.predict, prompt)
+    
+    def _shed(self, prompt: str, semantic_text: Optional[str], error: AdmissionRejected) -> str:
+        """Answer a call that admission control shed, or re-raise ``error``.
+        
+        Agents with ``semantic_cache`` first retry the semantic lookup, which
+        may have been filled while the call was queued; it only matches
+        entries this agent type stored. Otherwise ``degraded_response`` is
+        served and ``self.degraded`` set, so callers can tell a stand-in
+        from a real answer (and e.g. keep it out of the history).
+        """
+        if semantic_text is not None and self.llm_cache is not None:
+            cached = self.llm_cache.lookup(self.llm, prompt, semantic_text, self.get_agent_type())
+            if cached is not None:
+                ADMISSION_DECISIONS.inc(priority=self.priority, outcome="served_cached")
+                return cached
+        degraded = self.degraded_response(prompt)
+        if degraded is None:
+            ADMISSION_DECISIONS.inc(priority=self.priority, outcome="failed")
+            raise error
+        ADMISSION_DECISIONS.inc(priority=self.priority, outcome="served_degraded")
+        self.degraded = True
+        return degraded
+    
+    def degraded_response(self, prompt: str) -> Optional[str]:
+        """Stand-in LLM response when a call is shed; None fails the call instead."""
+        return None
     
     @abstractmethod
     def process(self, input_data: Dict[str, Any]) -> Dict[str, Any]:
         """Process the input data and return results."""
         pass
     
+    async def aprocess(self, input_data: Dict[str, Any]) -> Dict[str, Any]:
+        """Process the input data without blocking the event loop.
+        
+        Runs the synchronous ``process`` in a worker thread; subclasses with a
+        native async path can override this.
+        """
+        return await asyncio.to_thread(self.process, input_data)
+    
+    async def astream(self, input_data: Dict[str, Any]) -> AsyncIterator[Dict[str, Any]]:
+        """Yield ``{"event": ..., "data": ...}`` events while processing.
+        
+        Every stream ends with a ``result`` event carrying what ``process``
+        returns. Agents that can show partial output early override this to
+        emit ``token`` or ``item`` events before it.
+        """
+        yield {"event": "result", "data": await self.aprocess(input_data)}
+    
     @abstractmethod
     def get_agent_type(self) -> str:
         """Return the type of agent."""
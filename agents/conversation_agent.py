@@ -1,11 +1,16 @@
 from .base_agent import BaseAgent, AgentContext
-from typing import Dict, Any
+from typing import AsyncIterator, Dict, Any, Optional
+import asyncio
 from langchain import BaseLanguageModel
 from langchain.prompts import PromptTemplate
+from core.config import settings
 
 class ConversationAgent(BaseAgent):
     """Agent specialized in natural language conversations about fashion."""
     
+    # A user is waiting on every reply
+    priority = "interactive"
+    
     def __init__(self, llm: BaseLanguageModel, context: AgentContext):
         super().__init__(llm, context)
         self.prompt_template = PromptTemplate(
@@ -21,18 +26,34 @@ class ConversationAgent(BaseAgent):
     
     def process(self, input_data: Dict[str, Any]) -> Dict[str, Any]:
         """Process a conversation turn."""
-        history = "\n".join(
-            f"User: {msg['user']}\nAssistant: {msg['assistant']}"
-            for msg in self.context.conversation_history[-5:]  # Last 5 messages
-        )
-        
-        prompt = self.prompt_template.format(
-            history=history,
-            user_message=input_data.get("message", "")
+        message = input_data.get("message", "")
+        response = self.predict(self._prompt(message))
+        # An overload apology isn't a real reply; keep it out of the history
+        if not self.degraded:
+            self.record_turn(message, response)
+        return {"response": response, "degraded": self.degraded}
+    
+    async def astream(self, input_data: Dict[str, Any]) -> AsyncIterator[Dict[str, Any]]:
+        """Stream the reply as ``token`` events while the LLM generates it."""
+        message = input_data.get("message", "")
+        prompt = await asyncio.to_thread(self._prompt, message)
+        chunks = []
+        async for chunk in self.astream_predict(prompt):
+            chunks.append(chunk)
+            yield {"event": "token", "data": chunk}
+        response = "".join(chunks)
+        if not self.degraded:
+            await asyncio.to_thread(self.record_turn, message, response)
+        yield {"event": "result", "data": {"response": response, "degraded": self.degraded}}
+    
+    def _prompt(self, message: str) -> str:
+        return self.prompt_template.format(
+            history=self.history().render(settings.conversation_history_tokens),
+            user_message=message
         )
-        
-        response = self.llm.predict(prompt)
-        return {"response": response}
+    
+    def degraded_response(self, prompt: str) -> Optional[str]:
+        return "Sorry, I'm getting a lot of questions right now. Could you ask me again in a moment?"
     
     def get_agent_type(self) -> str:
         return "conversation"
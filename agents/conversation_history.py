@@ -0,0 +1,259 @@
+import json
+import logging
+import os
+import sqlite3
+import threading
+import time
+from collections import OrderedDict, deque
+from typing import Callable, Deque, Dict, List, NamedTuple, Optional, Sequence, Tuple
+
+from core.config import settings
+
+logger = logging.getLogger(__name__)
+
+# (user message, assistant response)
+Message = Tuple[str, str]
+# (previous summary, turns to fold in, token budget) -> new summary
+SummarizeFn = Callable[[str, Sequence[Message], int], str]
+
+def estimate_tokens(text: str) -> int:
+    """Rough token count (~4 characters per token for English text)."""
+    return (len(text) + 3) // 4
+
+def render_turn(user: str, assistant: str) -> str:
+    return f"User: {user}\nAssistant: {assistant}"
+
+def extractive_summary(summary: str, turns: Sequence[Message], max_tokens: int) -> str:
+    """Fold turns into a summary by keeping what the user asked, newest last.
+
+    Cheap and deterministic; pass an LLM-backed ``SummarizeFn`` to
+    ``ConversationHistory`` for abstractive summaries.
+    """
+    parts = [summary] if summary else []
+    parts.extend(user for user, _ in turns if user)
+    text = " | ".join(parts)
+    max_chars = max_tokens * 4
+    if len(text) > max_chars:
+        text = "..." + text[len(text) - max_chars + 3:]
+    return text
+
+class _Turn(NamedTuple):
+    user: str
+    assistant: str
+    text: str
+    tokens: int
+
+class _Window(NamedTuple):
+    version: int  # turns appended when rendered
+    first: int  # absolute index of the oldest turn included
+    summary: str  # summary of everything before ``first``
+    turns: Tuple[_Turn, ...]
+    header: str
+    body: str
+
+class ConversationHistory:
+    """Bounded conversation history for one session.
+
+    Keeps at most ``max_turns`` turns in a ring buffer; turns that fall off
+    are folded into a short running summary. ``render`` builds the history
+    block for a prompt under a token budget rather than a fixed message
+    count. Rendered windows are memoized per budget and advanced in place:
+    new turns are appended, and turns that no longer fit (or were evicted
+    from the ring) are folded into the window's own summary. That summary
+    only ever grows at its end, so it stays valid across evictions and
+    each turn is formatted and summarized once.
+    """
+
+    def __init__(
+        self,
+        max_turns: int = 10,
+        summary: str = "",
+        summary_tokens: int = 200,
+        summarize: SummarizeFn = extractive_summary
+    ):
+        self.max_turns = max_turns
+        self.summary = summary
+        self.summary_tokens = summary_tokens
+        self.summarize = summarize
+        self._turns: Deque[_Turn] = deque(maxlen=max_turns)
+        self._version = 0
+        self._windows: Dict[int, _Window] = {}
+        self._lock = threading.Lock()
+
+    @classmethod
+    def from_messages(cls, messages: Sequence[Dict[str, str]], **kwargs) -> "ConversationHistory":
+        """Build a history from ``AgentContext.conversation_history`` style dicts."""
+        history = cls(**kwargs)
+        for message in messages:
+            history.append(message.get("user", ""), message.get("assistant", ""))
+        return history
+
+    def append(self, user: str, assistant: str) -> None:
+        """Add a turn, folding the oldest one into the summary if full."""
+        with self._lock:
+            if len(self._turns) == self.max_turns:
+                oldest = self._turns[0]
+                self.summary = self.summarize(
+                    self.summary, [(oldest.user, oldest.assistant)], self.summary_tokens
+                )
+            text = render_turn(user, assistant)
+            self._turns.append(_Turn(user, assistant, text, estimate_tokens(text)))
+            self._version += 1
+
+    def render(self, max_tokens: int) -> str:
+        """Return the history block for a prompt, at most ``max_tokens`` long."""
+        with self._lock:
+            window = self._windows.get(max_tokens)
+            if window is None or window.version != self._version:
+                window = self._advance(window, max_tokens)
+                self._windows[max_tokens] = window
+            return window.header + window.body
+
+    def _advance(self, window: Optional[_Window], max_tokens: int) -> _Window:
+        """Append new turns to a window, dropping from its front what no longer fits."""
+        oldest = self._version - len(self._turns)
+        if window is None or window.version < oldest:
+            # Nothing to build on: start from the whole ring and its summary
+            window = None
+            first, summary, turns = oldest, self.summary, list(self._turns)
+        else:
+            first, summary = window.first, window.summary
+            turns = list(window.turns) + list(self._turns)[window.version - oldest:]
+
+        # Turns evicted from the ring have to go; then the oldest until the rest fit
+        start = max(0, oldest - first)
+        tokens = sum(turn.tokens for turn in turns[start:])
+        summary_budget = min(self.summary_tokens, max_tokens // 4)
+        if start or summary or tokens > max_tokens:
+            # Something is omitted: reserve room for a summary
+            while start < len(turns) and tokens > max_tokens - summary_budget:
+                tokens -= turns[start].tokens
+                start += 1
+
+        if start:
+            if window is not None and start == oldest - first and first == max(0, window.version - self.max_turns):
+                # The window started at the ring's oldest turn and only lost
+                # evicted turns, which append() already folded into self.summary
+                summary = self.summary
+            else:
+                dropped = [(turn.user, turn.assistant) for turn in turns[:start]]
+                summary = self.summarize(summary, dropped, summary_budget)
+            header = f"Summary of earlier conversation: {summary}\n" if summary else ""
+            body = "\n".join(turn.text for turn in turns[start:])
+        elif window is not None:
+            header = window.header
+            new_turns = turns[len(window.turns):]
+            body = "\n".join(([window.body] if window.body else []) + [turn.text for turn in new_turns])
+        else:
+            header = f"Summary of earlier conversation: {summary}\n" if summary else ""
+            body = "\n".join(turn.text for turn in turns)
+        return _Window(
+            version=self._version,
+            first=first + start,
+            summary=summary,
+            turns=tuple(turns[start:]),
+            header=header,
+            body=body
+        )
+
+    def as_messages(self) -> List[Dict[str, str]]:
+        with self._lock:
+            return [{"user": turn.user, "assistant": turn.assistant} for turn in self._turns]
+
+    def to_json(self) -> str:
+        with self._lock:
+            return json.dumps({
+                "summary": self.summary,
+                "turns": [[turn.user, turn.assistant] for turn in self._turns]
+            })
+
+    @classmethod
+    def from_json(cls, data: str, **kwargs) -> "ConversationHistory":
+        state = json.loads(data)
+        history = cls(summary=state.get("summary", ""), **kwargs)
+        for user, assistant in state.get("turns", []):
+            history.append(user, assistant)
+        return history
+
+    def __len__(self) -> int:
+        return len(self._turns)
+
+class ConversationStore:
+    """Conversation histories keyed by user id, persisted in SQLite.
+
+    Recently used sessions stay in an in-memory LRU so their rendered prompt
+    windows are reused across requests; every change is written through to
+    disk so sessions survive restarts and eviction.
+    """
+
+    def __init__(
+        self,
+        path: str,
+        max_turns: int = 10,
+        summary_tokens: int = 200,
+        max_sessions: int = 1000
+    ):
+        self.max_turns = max_turns
+        self.summary_tokens = summary_tokens
+        self.max_sessions = max_sessions
+        self._sessions: "OrderedDict[str, ConversationHistory]" = OrderedDict()
+        self._lock = threading.Lock()
+        os.makedirs(os.path.dirname(path) or ".", exist_ok=True)
+        self._conn = sqlite3.connect(path, check_same_thread=False)
+        self._conn.execute(
+            "CREATE TABLE IF NOT EXISTS conversations ("
+            "user_id TEXT PRIMARY KEY, history TEXT NOT NULL, updated_at REAL NOT NULL)"
+        )
+        self._conn.commit()
+
+    def get(self, user_id: str, seed: Sequence[Dict[str, str]] = ()) -> ConversationHistory:
+        """Return the user's history, starting from ``seed`` if none is stored."""
+        with self._lock:
+            history = self._sessions.get(user_id)
+            if history is not None:
+                self._sessions.move_to_end(user_id)
+                return history
+            row = self._conn.execute(
+                "SELECT history FROM conversations WHERE user_id = ?", (user_id,)
+            ).fetchone()
+            options = {"max_turns": self.max_turns, "summary_tokens": self.summary_tokens}
+            if row is not None:
+                history = ConversationHistory.from_json(row[0], **options)
+            else:
+                history = ConversationHistory.from_messages(seed, **options)
+            self._sessions[user_id] = history
+            while len(self._sessions) > self.max_sessions:
+                self._sessions.popitem(last=False)
+            return history
+
+    def save(self, user_id: str, history: ConversationHistory) -> None:
+        data = history.to_json()
+        with self._lock:
+            try:
+                self._conn.execute(
+                    "INSERT OR REPLACE INTO conversations (user_id, history, updated_at) VALUES (?, ?, ?)",
+                    (user_id, data, time.time())
+                )
+                self._conn.commit()
+            except sqlite3.Error as e:
+                logger.error(f"Error saving conversation for {user_id}: {e}")
+
+    def close(self) -> None:
+        with self._lock:
+            self._conn.close()
+
+_default_store: Optional[ConversationStore] = None
+_default_store_lock = threading.Lock()
+
+def get_conversation_store() -> ConversationStore:
+    """Return the process-wide conversation store configured in settings."""
+    global _default_store
+    with _default_store_lock:
+        if _default_store is None:
+            _default_store = ConversationStore(
+                settings.conversation_store_path,
+                max_turns=settings.max_conversation_history,
+                summary_tokens=settings.conversation_summary_tokens,
+                max_sessions=settings.conversation_cache_sessions
+            )
+        return _default_store
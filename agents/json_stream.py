@@ -0,0 +1,101 @@
+import json
+import logging
+from typing import Any, List, Optional
+
+logger = logging.getLogger(__name__)
+
+class StreamParseError(ValueError):
+    """Raised when LLM output holds no complete, well-formed JSON document."""
+
+class JsonObjectStream:
+    """Incrementally parse JSON that an LLM is still generating.
+
+    ``feed`` takes chunks as they arrive and returns every object that closed
+    at ``depth`` containers deep -- with the default of 2, the elements of a
+    ``{"recommendations": [...]}`` or ``{"results": [...]}`` array -- as soon
+    as its closing brace is seen, so callers can act on the first item before
+    the rest is generated. String and escape state carries across chunk
+    boundaries, and prose or code fences around the document are skipped;
+    a balanced but malformed candidate (a brace in prose) is dropped and
+    scanning resumes just after its opening brace. ``finish`` returns the
+    whole document once generation is done.
+    """
+
+    def __init__(self, depth: int = 2):
+        self.depth = depth
+        self._text = ""
+        self._pos = 0
+        self._stack: List[str] = []
+        self._in_string = False
+        self._escaped = False
+        self._start: Optional[int] = None
+        self._end: Optional[int] = None
+        self._item_start: Optional[int] = None
+        self._document: Any = None
+
+    def feed(self, chunk: str) -> List[Any]:
+        """Consume a chunk and return the objects it completed."""
+        if self._end is not None:
+            # Anything after the top-level document is trailing prose
+            return []
+        self._text += chunk
+        text = self._text
+        items = []
+        i = self._pos
+        while i < len(text):
+            ch = text[i]
+            i += 1
+            if self._in_string:
+                if self._escaped:
+                    self._escaped = False
+                elif ch == "\\":
+                    self._escaped = True
+                elif ch == '"':
+                    self._in_string = False
+            elif not self._stack and ch != "{":
+                continue
+            elif ch == '"':
+                self._in_string = True
+            elif ch in "{[":
+                if not self._stack:
+                    self._start = i - 1
+                self._stack.append(ch)
+                if ch == "{" and len(self._stack) == self.depth + 1:
+                    self._item_start = i - 1
+            elif ch in "}]":
+                self._stack.pop()
+                if ch == "}" and self._item_start is not None and len(self._stack) == self.depth:
+                    try:
+                        items.append(json.loads(text[self._item_start:i]))
+                    except json.JSONDecodeError:
+                        logger.debug(f"Skipping malformed streamed object: {text[self._item_start:i][:200]}")
+                    self._item_start = None
+                if not self._stack:
+                    try:
+                        self._document = json.loads(text[self._start:i])
+                    except json.JSONDecodeError:
+                        # A brace in prose, e.g. "use {size} here: {...}";
+                        # look for the next top-level object inside or after it
+                        logger.debug(f"Skipping malformed JSON candidate: {text[self._start:i][:200]}")
+                        i, self._start = self._start + 1, None
+                        self._in_string = self._escaped = False
+                        self._item_start = None
+                        continue
+                    self._end = i
+                    break
+        self._pos = len(text)
+        return items
+
+    def finish(self) -> Any:
+        """Parse the complete document, raising ``StreamParseError`` if there is none."""
+        if self._start is None:
+            raise StreamParseError("no JSON object in LLM output")
+        if self._end is None:
+            raise StreamParseError(f"LLM output ended inside a JSON object: {self._text[-200:]!r}")
+        return self._document
+
+def parse_json_object(text: str) -> Any:
+    """Parse the first top-level JSON object in ``text``, ignoring surrounding prose."""
+    stream = JsonObjectStream()
+    stream.feed(text)
+    return stream.finish()
@@ -0,0 +1,306 @@
+import hashlib
+import logging
+import os
+import re
+import sqlite3
+import threading
+import time
+from abc import ABC, abstractmethod
+from collections import OrderedDict
+from typing import Any, Callable, Dict, List, Optional, Tuple
+
+import numpy as np
+
+from core.config import settings
+
+logger = logging.getLogger(__name__)
+
+EmbedFn = Callable[[str], np.ndarray]
+
+class CacheStore(ABC):
+    """Storage for exact-match LLM responses with TTL and bounded size."""
+
+    @abstractmethod
+    def get(self, key: str) -> Optional[str]:
+        """Return the cached response, or None if absent or expired."""
+        pass
+
+    @abstractmethod
+    def set(self, key: str, value: str) -> None:
+        """Store a response, evicting the least recently used entries if full."""
+        pass
+
+    @abstractmethod
+    def __len__(self) -> int:
+        pass
+
+class InMemoryCacheStore(CacheStore):
+    """LRU cache store kept in process memory."""
+
+    def __init__(self, max_entries: int = 10000, ttl_seconds: float = 86400):
+        self.max_entries = max_entries
+        self.ttl_seconds = ttl_seconds
+        self._entries: "OrderedDict[str, Tuple[str, float]]" = OrderedDict()
+        self._lock = threading.Lock()
+        self.evictions = 0
+
+    def get(self, key: str) -> Optional[str]:
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry is None:
+                return None
+            value, created_at = entry
+            if time.time() - created_at > self.ttl_seconds:
+                del self._entries[key]
+                return None
+            self._entries.move_to_end(key)
+            return value
+
+    def set(self, key: str, value: str) -> None:
+        with self._lock:
+            self._entries[key] = (value, time.time())
+            self._entries.move_to_end(key)
+            while len(self._entries) > self.max_entries:
+                self._entries.popitem(last=False)
+                self.evictions += 1
+
+    def __len__(self) -> int:
+        return len(self._entries)
+
+class SQLiteCacheStore(CacheStore):
+    """Cache store persisted in a local SQLite file, shared across restarts."""
+
+    def __init__(self, path: str, max_entries: int = 100000, ttl_seconds: float = 86400):
+        self.max_entries = max_entries
+        self.ttl_seconds = ttl_seconds
+        self._lock = threading.Lock()
+        os.makedirs(os.path.dirname(path) or ".", exist_ok=True)
+        self._conn = sqlite3.connect(path, check_same_thread=False)
+        self._conn.execute(
+            "CREATE TABLE IF NOT EXISTS llm_cache ("
+            "key TEXT PRIMARY KEY, value TEXT NOT NULL, created_at REAL NOT NULL, last_used REAL NOT NULL)"
+        )
+        self._conn.execute("CREATE INDEX IF NOT EXISTS llm_cache_last_used ON llm_cache (last_used)")
+        self._conn.commit()
+        self.evictions = 0
+
+    def get(self, key: str) -> Optional[str]:
+        now = time.time()
+        with self._lock:
+            row = self._conn.execute(
+                "SELECT value, created_at FROM llm_cache WHERE key = ?", (key,)
+            ).fetchone()
+            if row is None:
+                return None
+            if now - row[1] > self.ttl_seconds:
+                self._conn.execute("DELETE FROM llm_cache WHERE key = ?", (key,))
+                self._conn.commit()
+                return None
+            self._conn.execute("UPDATE llm_cache SET last_used = ? WHERE key = ?", (now, key))
+            self._conn.commit()
+            return row[0]
+
+    def set(self, key: str, value: str) -> None:
+        now = time.time()
+        with self._lock:
+            self._conn.execute(
+                "INSERT OR REPLACE INTO llm_cache (key, value, created_at, last_used) VALUES (?, ?, ?, ?)",
+                (key, value, now, now)
+            )
+            overflow = self._conn.execute("SELECT COUNT(*) FROM llm_cache").fetchone()[0] - self.max_entries
+            if overflow > 0:
+                self._conn.execute(
+                    "DELETE FROM llm_cache WHERE key IN "
+                    "(SELECT key FROM llm_cache ORDER BY last_used LIMIT ?)",
+                    (overflow,)
+                )
+                self.evictions += overflow
+            self._conn.commit()
+
+    def __len__(self) -> int:
+        with self._lock:
+            return self._conn.execute("SELECT COUNT(*) FROM llm_cache").fetchone()[0]
+
+def normalize_prompt(prompt: str) -> str:
+    """Collapse whitespace so formatting-only differences share a cache entry."""
+    return re.sub(r"\s+", " ", prompt).strip()
+
+def hashed_ngram_embedding(text: str, dimension: int = 512) -> np.ndarray:
+    """Cheap, dependency-free text embedding from hashed character trigrams."""
+    vector = np.zeros(dimension, dtype=np.float32)
+    text = text.lower()
+    for i in range(max(len(text) - 2, 1)):
+        digest = hashlib.blake2b(text[i:i + 3].encode(), digest_size=4).digest()
+        vector[int.from_bytes(digest, "little") % dimension] += 1.0
+    norm = np.linalg.norm(vector)
+    return vector / norm if norm else vector
+
+def _llm_identity(llm: Any) -> Tuple[str, str]:
+    model = getattr(llm, "model_name", None) or getattr(llm, "model", None) or type(llm).__name__
+    return str(model), str(getattr(llm, "temperature", ""))
+
+class _SemanticRing:
+    """Fixed-capacity matrix of unit embeddings, overwritten oldest first."""
+
+    def __init__(self, capacity: int, dimension: int):
+        self.embeddings = np.zeros((capacity, dimension), dtype=np.float32)
+        self.keys: List[Optional[str]] = [None] * capacity
+        self.size = 0
+        self.position = 0
+
+    def add(self, embedding: np.ndarray, key: str) -> None:
+        self.embeddings[self.position] = embedding
+        self.keys[self.position] = key
+        self.position = (self.position + 1) % len(self.keys)
+        self.size = min(self.size + 1, len(self.keys))
+
+    def nearest(self, embedding: np.ndarray, threshold: float) -> Optional[str]:
+        if not self.size:
+            return None
+        scores = self.embeddings[:self.size] @ embedding
+        best = int(np.argmax(scores))
+        return self.keys[best] if scores[best] >= threshold else None
+
+class LLMCache:
+    """Exact and optional semantic cache in front of ``llm.predict``.
+
+    The exact tier is keyed on the normalized prompt plus the model name and
+    temperature. The semantic tier embeds ``semantic_text`` -- the variable
+    part of the prompt, such as an item description, since template
+    boilerplate would make every prompt look alike -- and reuses the response
+    of the most similar earlier entry in the same ``namespace`` for the same
+    model when the cosine similarity reaches ``semantic_threshold``. Callers
+    use one namespace per prompt template. The semantic index lives in
+    memory as a fixed-size ring of embeddings; responses always come from
+    the exact store, so TTL and eviction apply to both tiers.
+    """
+
+    def __init__(
+        self,
+        store: CacheStore,
+        semantic_threshold: Optional[float] = None,
+        embed_fn: EmbedFn = hashed_ngram_embedding,
+        max_semantic_entries: int = 10000
+    ):
+        self.store = store
+        self.semantic_threshold = semantic_threshold
+        self.embed_fn = embed_fn
+        self.max_semantic_entries = max_semantic_entries
+        # Per (model, temperature, namespace): ring of embeddings and their keys
+        self._semantic: Dict[Tuple[str, str, str], _SemanticRing] = {}
+        self._lock = threading.Lock()
+        self.hits = 0
+        self.semantic_hits = 0
+        self.misses = 0
+
+    def predict(
+        self,
+        llm: Any,
+        prompt: str,
+        semantic_text: Optional[str] = None,
+        namespace: str = ""
+    ) -> str:
+        """Return a cached response for ``prompt`` or call the LLM and cache it.
+
+        The semantic tier is only consulted when ``semantic_text`` is given.
+        """
+        cached = self.lookup(llm, prompt, semantic_text, namespace)
+        if cached is not None:
+            return cached
+        response = llm.predict(prompt)
+        self.remember(llm, prompt, response, semantic_text, namespace)
+        return response
+
+    def lookup(
+        self,
+        llm: Any,
+        prompt: str,
+        semantic_text: Optional[str] = None,
+        namespace: str = ""
+    ) -> Optional[str]:
+        scope = _llm_identity(llm)
+        cached = self.store.get(self._key(scope, normalize_prompt(prompt)))
+        if cached is not None:
+            self.hits += 1
+            return cached
+        if semantic_text is not None and self.semantic_threshold is not None:
+            cached = self._semantic_lookup((*scope, namespace), normalize_prompt(semantic_text))
+            if cached is not None:
+                self.semantic_hits += 1
+                return cached
+        self.misses += 1
+        return None
+
+    def remember(
+        self,
+        llm: Any,
+        prompt: str,
+        response: str,
+        semantic_text: Optional[str] = None,
+        namespace: str = ""
+    ) -> None:
+        scope = _llm_identity(llm)
+        key = self._key(scope, normalize_prompt(prompt))
+        self.store.set(key, response)
+        if semantic_text is not None and self.semantic_threshold is not None:
+            embedding = self.embed_fn(normalize_prompt(semantic_text))
+            with self._lock:
+                ring = self._semantic.get((*scope, namespace))
+                if ring is None:
+                    ring = self._semantic[(*scope, namespace)] = _SemanticRing(
+                        self.max_semantic_entries, len(embedding)
+                    )
+                ring.add(embedding, key)
+
+    def _semantic_lookup(self, scope: Tuple[str, str, str], normalized: str) -> Optional[str]:
+        with self._lock:
+            ring = self._semantic.get(scope)
+            if ring is None:
+                return None
+            key = ring.nearest(self.embed_fn(normalized), self.semantic_threshold)
+        return self.store.get(key) if key is not None else None
+
+    @staticmethod
+    def _key(scope: Tuple[str, str], normalized: str) -> str:
+        model, temperature = scope
+        return hashlib.sha256(f"{model}\x00{temperature}\x00{normalized}".encode()).hexdigest()
+
+    def stats(self) -> Dict[str, Any]:
+        lookups = self.hits + self.semantic_hits + self.misses
+        return {
+            "entries": len(self.store),
+            "hits": self.hits,
+            "semantic_hits": self.semantic_hits,
+            "misses": self.misses,
+            "evictions": getattr(self.store, "evictions", 0),
+            "hit_rate": (self.hits + self.semantic_hits) / lookups if lookups else 0.0
+        }
+
+_default_cache: Optional[LLMCache] = None
+_default_cache_lock = threading.Lock()
+
+def get_llm_cache() -> Optional[LLMCache]:
+    """Return the process-wide LLM cache configured in settings, if enabled."""
+    global _default_cache
+    if settings.llm_cache_backend == "none":
+        return None
+    with _default_cache_lock:
+        if _default_cache is None:
+            if settings.llm_cache_backend == "sqlite":
+                store = SQLiteCacheStore(
+                    settings.llm_cache_path,
+                    max_entries=settings.llm_cache_max_entries,
+                    ttl_seconds=settings.llm_cache_ttl_seconds
+                )
+            elif settings.llm_cache_backend == "memory":
+                store = InMemoryCacheStore(
+                    max_entries=settings.llm_cache_max_entries,
+                    ttl_seconds=settings.llm_cache_ttl_seconds
+                )
+            else:
+                raise ValueError(f"Unknown LLM cache backend: {settings.llm_cache_backend}")
+            _default_cache = LLMCache(
+                store,
+                semantic_threshold=settings.llm_semantic_cache_threshold if settings.llm_semantic_cache else None
+            )
+        return _default_cache
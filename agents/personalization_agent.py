@@ -1,51 +1,188 @@
 from .base_agent import BaseAgent, AgentContext
-from typing import Dict, Any
+from .json_stream import JsonObjectStream, StreamParseError
+from .profile_vectors import get_profile_cache
+from typing import AsyncIterator, Dict, Any, List, Optional, Set, Tuple, Union
+import asyncio
+import json
+import logging
 from langchain import BaseLanguageModel
 from langchain.prompts import PromptTemplate
+from pydantic import ValidationError
+from core.config import settings
+from core.models import StyleProfile
+
+logger = logging.getLogger(__name__)
 
 class PersonalizationAgent(BaseAgent):
-    """Agent specialized in generating personalized fashion recommendations."""
-    
+    """Agent specialized in generating personalized fashion recommendations.
+
+    Works in two stages: the user's cached profile vector is scored against
+    the catalog index to shortlist candidates, then the LLM only re-ranks
+    that shortlist and explains its picks.
+    """
+
+    # Token budget for the recent-interactions block
+    interaction_tokens = 300
+
     def __init__(self, llm: BaseLanguageModel, context: AgentContext):
         super().__init__(llm, context)
+        self.catalog = None  # Will be injected
+        self.candidates = settings.personalization_candidates
         self.prompt_template = PromptTemplate(
-            input_variables=["user_profile", "recent_interactions", "current_context"],
-            template="""Given the user's profile, recent interactions, and current context,
-            generate personalized fashion recommendations:
-            
+            input_variables=["user_profile", "recent_interactions", "current_context", "candidates"],
+            template="""Given the user's style profile, recent interactions, and current context,
+            pick the best fashion recommendations from the candidate items below:
+
             User Profile:
             {user_profile}
-            
+
             Recent Interactions:
             {recent_interactions}
-            
+
             Current Context:
             {current_context}
-            
-            Return recommendations in JSON format with the following structure:
-            {"recommendations": [
-                {"item_id": "", "reason": "", "confidence": 0.0-1.0}
-            ]}"""
+
+            Candidate Items (one JSON object per line):
+            {candidates}
+
+            Only recommend candidate items, best first. Return recommendations in JSON format with the following structure:
+            {{"recommendations": [
+                {{"item_id": "", "reason": "", "confidence": 0.0-1.0}}
+            ]}}"""
         )
-    
+
     def process(self, input_data: Dict[str, Any]) -> Dict[str, Any]:
-        """Generate personalized recommendations."""
+        """Generate personalized recommendations.
+
+        ``input_data`` may hold ``interactions``, ids of catalog items the user
+        just engaged with, which move their profile vector towards those items.
+        """
+        prepared = self._prepare(input_data)
+        if isinstance(prepared, dict):
+            return prepared
+        candidates, prompt = prepared
+        result = self.predict(prompt)
+        return self._parse_result(result, candidates)
+
+    async def astream(self, input_data: Dict[str, Any]) -> AsyncIterator[Dict[str, Any]]:
+        """Emit each recommendation as an ``item`` event as soon as its JSON closes."""
+        prepared = await asyncio.to_thread(self._prepare, input_data)
+        if isinstance(prepared, dict):
+            yield {"event": "result", "data": prepared}
+            return
+        candidates, prompt = prepared
+        shortlisted = {match["id"] for match in candidates}
+        stream = JsonObjectStream()
+        recommendations = []
+        async for chunk in self.astream_predict(prompt):
+            for entry in stream.feed(chunk):
+                recommendation = self._recommendation(entry, shortlisted)
+                if recommendation is not None:
+                    recommendations.append(recommendation)
+                    yield {"event": "item", "data": recommendation}
+        yield {"event": "result", "data": self._finish(recommendations, candidates, stream)}
+
+    def _prepare(self, input_data: Dict[str, Any]) -> Union[Dict[str, Any], Tuple[List[Dict[str, Any]], str]]:
+        """Shortlist candidates and build the re-ranking prompt.
+
+        Returns the final result instead when there is nothing to re-rank.
+        """
+        if self.catalog is None:
+            return {"recommendations": [], "error": "No catalog index loaded"}
+        profile = self._style_profile()
+        interactions = [str(item_id) for item_id in input_data.get("interactions", [])]
+        profiles = get_profile_cache()
+        key = profiles.key_for(self.context.user_id, profile)
+        if interactions:
+            fetched = self.catalog.fetch(interactions)
+            vector = profiles.update(
+                key, profile, [fetched[item_id]["values"] for item_id in interactions if item_id in fetched]
+            )
+        else:
+            vector = profiles.get(key, profile)
+
+        seen = set(interactions)
+        top_n = int(input_data.get("top_n", self.candidates))
+        candidates = [
+            match for match in self.catalog.query(vector, top_k=top_n + len(seen))
+            if match["id"] not in seen
+        ][:top_n]
+        if not candidates:
+            return {"recommendations": []}
+
         prompt = self.prompt_template.format(
-            user_profile=self.context.user_profile,
-            recent_interactions=self.context.conversation_history[-3:],  # Last 3 interactions
-            current_context=input_data.get("context", "")
+            user_profile=profile.model_dump_json(),
+            recent_interactions=self.history().render(self.interaction_tokens),
+            current_context=input_data.get("context", ""),
+            candidates="\n".join(
+                json.dumps({"item_id": match["id"], **match.get("metadata", {})}) for match in candidates
+            )
         )
-        
-        result = self.llm.predict(prompt)
-        return self._parse_result(result)
-    
+        return candidates, prompt
+
+    def degraded_response(self, prompt: str) -> Optional[str]:
+        # No picks, so _finish serves the shortlist in vector-ranked order
+        return '{"recommendations": []}'
+
     def get_agent_type(self) -> str:
         return "personalization"
-    
-    def _parse_result(self, result: str) -> Dict[str, Any]:
-        """Parse the LLM's response into a structured format."""
+
+    def _style_profile(self) -> StyleProfile:
         try:
-            import json
-            return json.loads(result)
-        except json.JSONDecodeError:
-            return {"recommendations": []}
+            return StyleProfile.model_validate(self.context.user_profile)
+        except ValidationError as e:
+            logger.warning(f"Ignoring invalid style profile: {e}")
+            return StyleProfile()
+
+    def _parse_result(self, result: str, candidates: List[Dict[str, Any]]) -> Dict[str, Any]:
+        """Parse the LLM's re-ranking, falling back to the vector ranking.
+
+        Complete recommendation objects are kept even when the response as a
+        whole is truncated or malformed.
+        """
+        shortlisted = {match["id"] for match in candidates}
+        stream = JsonObjectStream()
+        recommendations = [
+            recommendation for recommendation in (
+                self._recommendation(entry, shortlisted) for entry in stream.feed(result)
+            )
+            if recommendation is not None
+        ]
+        return self._finish(recommendations, candidates, stream)
+
+    def _recommendation(self, entry: Any, shortlisted: Set[str]) -> Optional[Dict[str, Any]]:
+        item_id = entry.get("item_id") if isinstance(entry, dict) else None
+        if item_id not in shortlisted:
+            # Drop ids the model invented or repeated
+            return None
+        shortlisted.discard(item_id)
+        return {
+            "item_id": item_id,
+            "reason": str(entry.get("reason", "")),
+            "confidence": self._confidence(entry.get("confidence"))
+        }
+
+    def _finish(
+        self,
+        recommendations: List[Dict[str, Any]],
+        candidates: List[Dict[str, Any]],
+        stream: JsonObjectStream
+    ) -> Dict[str, Any]:
+        if not recommendations:
+            try:
+                stream.finish()
+                logger.warning("Personalization response recommended no shortlisted items, using vector ranking")
+            except StreamParseError as e:
+                logger.warning(f"Unparseable personalization response, using vector ranking: {e}")
+            recommendations = [
+                {"item_id": match["id"], "reason": "", "confidence": max(0.0, min(1.0, match["score"]))}
+                for match in candidates
+            ]
+        return {"recommendations": recommendations}
+
+    @staticmethod
+    def _confidence(value: Optional[Any]) -> float:
+        try:
+            return max(0.0, min(1.0, float(value)))
+        except (TypeError, ValueError):
+            return 0.0
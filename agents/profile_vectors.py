@@ -0,0 +1,172 @@
+import hashlib
+import json
+import re
+import threading
+from collections import OrderedDict
+from typing import Any, Dict, Iterable, List, Optional, Sequence, Tuple, Union
+
+import numpy as np
+
+from core.config import settings
+from core.models import CulturalReference, FashionItem, StyleAttribute, StyleEra, StyleProfile
+from infrastructure.local_vector_index import ExactVectorIndex
+
+# Colors are open-ended strings, so they are hashed into a fixed number of buckets
+COLOR_BUCKETS = 32
+BASIC_COLORS = (
+    "black", "white", "grey", "gray", "red", "blue", "navy", "green", "olive", "yellow",
+    "orange", "pink", "purple", "brown", "beige", "cream", "tan", "khaki", "gold", "silver"
+)
+COLOR_WEIGHT = 0.5
+
+_VOCABULARY: Dict[str, int] = {}
+for _enum in (CulturalReference, StyleEra, StyleAttribute):
+    for _member in _enum:
+        _VOCABULARY.setdefault(_member.value, len(_VOCABULARY))
+_COLOR_OFFSET = len(_VOCABULARY)
+
+PROFILE_DIMENSION = _COLOR_OFFSET + COLOR_BUCKETS
+
+def _color_index(color: str) -> int:
+    digest = hashlib.blake2b(color.strip().lower().encode(), digest_size=4).digest()
+    return _COLOR_OFFSET + int.from_bytes(digest, "little") % COLOR_BUCKETS
+
+def _normalize(vector: np.ndarray) -> np.ndarray:
+    norm = np.linalg.norm(vector)
+    return vector / norm if norm else vector
+
+def _tokens(text: str) -> List[str]:
+    """Words plus joined bigrams/trigrams, so "hip hop" matches ``hip_hop``."""
+    words = re.findall(r"[a-z0-9]+", text.lower())
+    tokens = list(words)
+    for n in (2, 3):
+        tokens.extend("_".join(words[i:i + n]) for i in range(len(words) - n + 1))
+    return tokens
+
+def profile_vector(profile: StyleProfile) -> np.ndarray:
+    """Encode a ``StyleProfile`` as a unit vector over the shared style vocabulary."""
+    vector = np.zeros(PROFILE_DIMENSION, dtype=np.float32)
+    for value in (*profile.cultural_references, *profile.preferred_eras, *profile.style_attributes):
+        vector[_VOCABULARY[value.value]] = 1.0
+    for color in profile.color_preferences:
+        vector[_color_index(color)] += COLOR_WEIGHT
+    return _normalize(vector)
+
+def item_vector(item: Union[FashionItem, Dict[str, Any]]) -> np.ndarray:
+    """Encode a catalog item in the same space as ``profile_vector``.
+
+    Matches vocabulary terms in the item's name, category, attribute values
+    and ``styles``; colors come from ``color``/``colors`` attributes and from
+    basic color words in the text.
+    """
+    if isinstance(item, FashionItem):
+        item = item.model_dump(mode="json")
+    attributes = item.get("attributes") or {}
+    texts = [item.get("name", ""), str(item.get("category", ""))]
+    texts.extend(json.dumps(value) if not isinstance(value, str) else value for value in attributes.values())
+    texts.extend(item.get("styles") or attributes.get("styles") or [])
+    vector = np.zeros(PROFILE_DIMENSION, dtype=np.float32)
+    colors = set()
+    for token in _tokens(" ".join(str(text) for text in texts)):
+        if token in _VOCABULARY:
+            vector[_VOCABULARY[token]] = 1.0
+        elif token in BASIC_COLORS:
+            colors.add(token)
+    for key in ("color", "colors", "colour"):
+        value = attributes.get(key)
+        colors.update([value] if isinstance(value, str) else value or [])
+    for color in colors:
+        vector[_color_index(str(color))] += COLOR_WEIGHT
+    return _normalize(vector)
+
+def build_catalog_index(items: Iterable[FashionItem]) -> ExactVectorIndex:
+    """Index catalog items by their style vectors for candidate retrieval."""
+    index = ExactVectorIndex(PROFILE_DIMENSION, metric="cosine")
+    index.upsert(
+        {
+            "id": item.id,
+            "values": item_vector(item),
+            "metadata": {
+                "name": item.name,
+                "category": item.category.value,
+                "brand": item.brand or "",
+                "price": item.price
+            }
+        }
+        for item in items
+    )
+    return index
+
+class ProfileVectorCache:
+    """Per-user profile vectors, built once and nudged by interactions.
+
+    A user's vector starts from their ``StyleProfile`` and moves towards the
+    items they interact with by an exponential moving average, so an update
+    costs one vector operation instead of re-encoding the whole history.
+    Each entry remembers the hash of the profile it was built from; when the
+    profile is edited, the new profile vector is re-blended with the drift
+    interactions added, so edits take effect without losing history.
+    Anonymous profiles are keyed by their content.
+    """
+
+    def __init__(self, max_entries: int = 10000, decay: float = 0.9):
+        self.max_entries = max_entries
+        self.decay = decay
+        # key -> (profile hash, profile vector, current vector)
+        self._vectors: "OrderedDict[str, Tuple[str, np.ndarray, np.ndarray]]" = OrderedDict()
+        self._lock = threading.Lock()
+
+    @staticmethod
+    def _profile_hash(profile: StyleProfile) -> str:
+        return hashlib.sha256(profile.model_dump_json().encode()).hexdigest()
+
+    @classmethod
+    def key_for(cls, user_id: Optional[str], profile: StyleProfile) -> str:
+        if user_id:
+            return f"user:{user_id}"
+        return "profile:" + cls._profile_hash(profile)
+
+    def get(self, key: str, profile: StyleProfile) -> np.ndarray:
+        profile_hash = self._profile_hash(profile)
+        with self._lock:
+            entry = self._vectors.get(key)
+            if entry is not None:
+                self._vectors.move_to_end(key)
+                if entry[0] == profile_hash:
+                    return entry[2]
+        base = profile_vector(profile)
+        vector = base if entry is None else _normalize(base + entry[2] - entry[1])
+        self._remember(key, profile_hash, base, vector)
+        return vector
+
+    def update(self, key: str, profile: StyleProfile, interactions: Sequence[np.ndarray]) -> np.ndarray:
+        """Fold interacted-with item vectors into the user's vector."""
+        vector = self.get(key, profile)
+        for item in interactions:
+            vector = _normalize(self.decay * vector + (1.0 - self.decay) * item)
+        with self._lock:
+            entry = self._vectors.get(key)
+        if entry is not None:
+            self._remember(key, entry[0], entry[1], vector)
+        return vector
+
+    def _remember(self, key: str, profile_hash: str, base: np.ndarray, vector: np.ndarray) -> None:
+        with self._lock:
+            self._vectors[key] = (profile_hash, base, vector)
+            self._vectors.move_to_end(key)
+            while len(self._vectors) > self.max_entries:
+                self._vectors.popitem(last=False)
+
+_default_cache: Optional[ProfileVectorCache] = None
+_default_cache_lock = threading.Lock()
+
+def get_profile_cache() -> ProfileVectorCache:
+    """Return the process-wide profile vector cache configured in settings."""
+    global _default_cache
+    with _default_cache_lock:
+        if _default_cache is None:
+            _default_cache = ProfileVectorCache(
+                max_entries=settings.profile_cache_size,
+                decay=settings.profile_interaction_decay
+            )
+        return _default_cache
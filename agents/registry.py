@@ -0,0 +1,64 @@
+from typing import Callable, Dict, List, Optional
+from langchain import BaseLanguageModel
+from .base_agent import BaseAgent, AgentContext
+from .conversation_agent import ConversationAgent
+from .personalization_agent import PersonalizationAgent
+from .style_classification_agent import StyleClassificationAgent
+from .visual_search_agent import VisualSearchAgent
+
+AgentFactory = Callable[[BaseLanguageModel, AgentContext], BaseAgent]
+
+class UnknownAgentError(KeyError):
+    """Raised when no agent is registered for a requested type."""
+
+class AgentRegistry:
+    """Maps agent types (as returned by ``get_agent_type``) to factories."""
+    
+    def __init__(self):
+        self._factories: Dict[str, AgentFactory] = {}
+    
+    def register(self, agent_type: str, factory: AgentFactory) -> None:
+        """Register a factory that builds an agent for a request context."""
+        self._factories[agent_type] = factory
+    
+    def create(self, agent_type: str, llm: BaseLanguageModel, context: AgentContext) -> BaseAgent:
+        """Build a fresh agent bound to the given context."""
+        factory = self._factories.get(agent_type)
+        if factory is None:
+            raise UnknownAgentError(agent_type)
+        agent = factory(llm, context)
+        if agent.get_agent_type() != agent_type:
+            raise ValueError(f"Factory for {agent_type} built a {agent.get_agent_type()} agent")
+        return agent
+    
+    def agent_types(self) -> List[str]:
+        return sorted(self._factories)
+    
+    def __contains__(self, agent_type: str) -> bool:
+        return agent_type in self._factories
+
+def build_default_registry(
+    vector_store: Optional[object] = None,
+    embedder: Optional[object] = None,
+    catalog: Optional[object] = None
+) -> AgentRegistry:
+    """Register every built-in agent, injecting shared dependencies."""
+    registry = AgentRegistry()
+    registry.register("conversation", ConversationAgent)
+    
+    def personalization(llm: BaseLanguageModel, context: AgentContext) -> BaseAgent:
+        agent = PersonalizationAgent(llm, context)
+        agent.catalog = catalog
+        return agent
+    
+    registry.register("personalization", personalization)
+    registry.register("style_classification", StyleClassificationAgent)
+    
+    def visual_search(llm: BaseLanguageModel, context: AgentContext) -> BaseAgent:
+        agent = VisualSearchAgent(llm, context)
+        agent.vector_store = vector_store
+        agent.embedder = embedder
+        return agent
+    
+    registry.register("visual_search", visual_search)
+    return registry
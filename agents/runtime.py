@@ -0,0 +1,110 @@
+import asyncio
+import logging
+import time
+from typing import Any, AsyncIterator, Dict, Optional
+from langchain import BaseLanguageModel
+from .admission import PrioritySemaphore
+from .base_agent import AgentContext
+from .registry import AgentRegistry
+
+logger = logging.getLogger(__name__)
+
+class AgentRuntime:
+    """Runs agents off the event loop with a concurrency cap and timeouts.
+    
+    Free slots go to the highest-priority agent waiting (see
+    ``BaseAgent.priority``), and waiting for one counts against the timeout.
+    """
+    
+    def __init__(
+        self,
+        registry: AgentRegistry,
+        llm: BaseLanguageModel,
+        max_concurrency: int = 8,
+        default_timeout: float = 30.0
+    ):
+        self.registry = registry
+        self.llm = llm
+        self.default_timeout = default_timeout
+        self._semaphore = PrioritySemaphore(max_concurrency)
+    
+    async def run(
+        self,
+        agent_type: str,
+        input_data: Dict[str, Any],
+        context: AgentContext,
+        timeout: Optional[float] = None
+    ) -> Dict[str, Any]:
+        """Run one agent, raising ``asyncio.TimeoutError`` past its timeout.
+        
+        A timed-out agent keeps its concurrency slot until its worker thread
+        actually finishes, so the cap bounds real work rather than waiters.
+        """
+        agent = self.registry.create(agent_type, self.llm, context)
+        agent.deadline = deadline = time.monotonic() + (timeout or self.default_timeout)
+        await asyncio.wait_for(self._semaphore.acquire(agent.priority), deadline - time.monotonic())
+        task = asyncio.ensure_future(agent.aprocess(input_data))
+        task.add_done_callback(lambda _: self._semaphore.release())
+        return await asyncio.wait_for(asyncio.shield(task), deadline - time.monotonic())
+    
+    async def stream(
+        self,
+        agent_type: str,
+        input_data: Dict[str, Any],
+        context: AgentContext,
+        timeout: Optional[float] = None
+    ) -> AsyncIterator[Dict[str, Any]]:
+        """Run one agent, yielding its events as they are produced.
+        
+        The stream holds a concurrency slot until it ends and raises
+        ``asyncio.TimeoutError`` if it runs past its timeout.
+        """
+        agent = self.registry.create(agent_type, self.llm, context)
+        agent.deadline = deadline = time.monotonic() + (timeout or self.default_timeout)
+        await asyncio.wait_for(self._semaphore.acquire(agent.priority), deadline - time.monotonic())
+        events = agent.astream(input_data)
+        try:
+            while True:
+                try:
+                    event = await asyncio.wait_for(events.__anext__(), deadline - time.monotonic())
+                except StopAsyncIteration:
+                    return
+                yield event
+        finally:
+            try:
+                await events.aclose()
+            finally:
+                self._semaphore.release()
+    
+    def queued(self) -> int:
+        """Agents waiting for a concurrency slot."""
+        return self._semaphore.queued()
+    
+    async def fan_out(
+        self,
+        requests: Dict[str, Dict[str, Any]],
+        context: AgentContext,
+        timeout: Optional[float] = None
+    ) -> Dict[str, Dict[str, Any]]:
+        """Run several agents concurrently; one failure doesn't sink the rest.
+        
+        ``requests`` maps agent type to its input. Returns, per agent type, a
+        dict with ``success``, ``data``, ``error`` and ``elapsed_seconds``.
+        """
+        async def run_one(agent_type: str, input_data: Dict[str, Any]) -> Dict[str, Any]:
+            started = time.perf_counter()
+            try:
+                data = await self.run(agent_type, input_data, context, timeout)
+                result = {"success": "error" not in data, "data": data, "error": data.get("error")}
+            except asyncio.TimeoutError:
+                result = {"success": False, "data": {}, "error": f"{agent_type} timed out"}
+            except Exception as e:
+                logger.error(f"Error running {agent_type} agent: {e}")
+                result = {"success": False, "data": {}, "error": str(e)}
+            result["elapsed_seconds"] = time.perf_counter() - started
+            return result
+        
+        results = await asyncio.gather(*(
+            run_one(agent_type, input_data) for agent_type, input_data in requests.items()
+        ))
+        return dict(zip(requests, results))
@@ -1,11 +1,22 @@
 from .base_agent import BaseAgent, AgentContext
-from typing import Dict, Any
+from .json_stream import JsonObjectStream, StreamParseError, parse_json_object
+from typing import AsyncIterator, Dict, Any, List, Optional, Set
+import json
+import logging
 from langchain import BaseLanguageModel
 from langchain.prompts import PromptTemplate
 
+logger = logging.getLogger(__name__)
+
 class StyleClassificationAgent(BaseAgent):
     """Agent specialized in classifying fashion styles."""
     
+    # Classifying near-identical item descriptions gives the same answer
+    semantic_cache = True
+    
+    # Mostly catalog enrichment; yields to interactive agents when busy
+    priority = "background"
+    
     def __init__(self, llm: BaseLanguageModel, context: AgentContext):
         super().__init__(llm, context)
         self.prompt_template = PromptTemplate(
@@ -15,26 +26,130 @@ class StyleClassificationAgent(BaseAgent):
             Image URL: {image_url}
             
             Return the classification in JSON format with the following structure:
-            {"styles": ["style1", "style2", ...], "confidence": 0.0-1.0}"""
+            {{"styles": ["style1", "style2", ...], "confidence": 0.0-1.0}}"""
+        )
+        self.batch_prompt_template = PromptTemplate(
+            input_variables=["items"],
+            template="""Classify the style of each of the following fashion items into one or more categories.
+            Each item is given as a JSON object with its id, description and image URL:
+            {items}
+            
+            Return one result per item, in JSON format with the following structure:
+            {{"results": [{{"id": "item id", "styles": ["style1", "style2", ...], "confidence": 0.0-1.0}}, ...]}}"""
         )
     
     def process(self, input_data: Dict[str, Any]) -> Dict[str, Any]:
-        """Classify the fashion item's style."""
-        prompt = self.prompt_template.format(
-            description=input_data.get("description", ""),
-            image_url=input_data.get("image_url", "")
-        )
+        """Classify the fashion item's style.
+        
+        With ``items`` in ``input_data``, classifies them all in one call and
+        returns ``{"results": {item_id: classification}}``.
+        """
+        if "items" in input_data:
+            return {"results": self.classify_batch(input_data["items"])}
+        description = input_data.get("description", "")
+        image_url = input_data.get("image_url", "")
+        prompt = self.prompt_template.format(description=description, image_url=image_url)
         
-        result = self.llm.predict(prompt)
+        # Match on the item alone; the template is the same for every prompt
+        result = self.predict(prompt, semantic_text=f"{description}\n{image_url}")
         return self._parse_result(result)
     
+    async def astream(self, input_data: Dict[str, Any]) -> AsyncIterator[Dict[str, Any]]:
+        """For batches, emit each item's classification as soon as its JSON closes."""
+        if "items" not in input_data:
+            async for event in super().astream(input_data):
+                yield event
+            return
+        items = input_data["items"]
+        requested = {item["id"] for item in items}
+        stream = JsonObjectStream()
+        classified = {}
+        async for chunk in self.astream_predict(self._batch_prompt(items)):
+            for entry in stream.feed(chunk):
+                classification = self._batch_entry(entry, requested)
+                if classification is not None:
+                    classified[entry["id"]] = classification
+                    yield {"event": "item", "data": {"id": entry["id"], **classification}}
+        self._check_batch(classified, items, stream)
+        yield {"event": "result", "data": {"results": classified}}
+    
+    def classify_batch(self, items: List[Dict[str, Any]]) -> Dict[str, Dict[str, Any]]:
+        """Classify several items with a single LLM call.
+        
+        Each item needs an ``id`` plus the ``description``/``image_url`` used by
+        ``process``. Returns results keyed by item id; items the model left out
+        or answered malformed are missing from the result.
+        """
+        # A near-duplicate batch may hold different items, so only reuse exact matches
+        result = self.predict(self._batch_prompt(items))
+        requested = {item["id"] for item in items}
+        stream = JsonObjectStream()
+        classified = {}
+        # Complete entries survive even if the response is cut off part-way
+        for entry in stream.feed(result):
+            classification = self._batch_entry(entry, requested)
+            if classification is not None:
+                classified[entry["id"]] = classification
+        self._check_batch(classified, items, stream)
+        return classified
+    
+    def _batch_prompt(self, items: List[Dict[str, Any]]) -> str:
+        return self.batch_prompt_template.format(
+            items="\n".join(
+                json.dumps({
+                    "id": item["id"],
+                    "description": item.get("description", ""),
+                    "image_url": item.get("image_url", "")
+                })
+                for item in items
+            )
+        )
+    
+    @staticmethod
+    def _batch_entry(entry: Any, requested: Set[str]) -> Optional[Dict[str, Any]]:
+        if not isinstance(entry, dict) or entry.get("id") not in requested:
+            return None
+        styles = entry.get("styles")
+        if not isinstance(styles, list):
+            return None
+        try:
+            confidence = float(entry.get("confidence", 0.0))
+        except (TypeError, ValueError):
+            confidence = 0.0
+        return {"styles": [str(style) for style in styles], "confidence": confidence}
+    
+    @staticmethod
+    def _check_batch(
+        classified: Dict[str, Dict[str, Any]],
+        items: List[Dict[str, Any]],
+        stream: JsonObjectStream
+    ) -> None:
+        if len(classified) == len(items):
+            return
+        try:
+            stream.finish()
+            logger.warning(f"Batch classification answered {len(classified)} of {len(items)} items")
+        except StreamParseError as e:
+            logger.warning(f"Unparseable batch classification, kept {len(classified)} of {len(items)} items: {e}")
+    
     def get_agent_type(self) -> str:
         return "style_classification"
     
     def _parse_result(self, result: str) -> Dict[str, Any]:
-        """Parse the LLM's response into a structured format."""
+        """Parse the LLM's response into a structured format.
+        
+        A malformed response is logged and reported through ``error`` rather
+        than passed off as an item with no styles.
+        """
         try:
-            import json
-            return json.loads(result)
-        except json.JSONDecodeError:
-            return {"styles": [], "confidence": 0.0}
+            parsed = parse_json_object(result)
+            styles = parsed["styles"]
+            if not isinstance(styles, list):
+                raise TypeError(f"styles is a {type(styles).__name__}")
+            return {
+                "styles": [str(style) for style in styles],
+                "confidence": float(parsed.get("confidence", 0.0))
+            }
+        except (StreamParseError, KeyError, TypeError, ValueError, AttributeError) as e:
+            logger.warning(f"Unparseable style classification ({e}): {result[:200]!r}")
+            return {"styles": [], "confidence": 0.0, "error": "Unparseable style classification"}
@@ -0,0 +1,155 @@
+import asyncio
+import logging
+import os
+import time
+from typing import Any, Dict, Iterable, List, Set
+from pydantic import BaseModel
+from core.models import FashionItem
+from core.rate_limit import AsyncRateLimiter
+from core.utils import iter_batches
+from infrastructure.elasticsearch_client import ElasticsearchClient
+from .style_classification_agent import StyleClassificationAgent
+
+logger = logging.getLogger(__name__)
+
+class StylePipelineReport(BaseModel):
+    """Outcome of a catalog style-classification run."""
+    classified: int = 0
+    skipped: int = 0
+    failed: int = 0
+    written: int = 0
+    llm_calls: int = 0
+    failed_ids: List[str] = []
+    elapsed_seconds: float = 0.0
+    items_per_second: float = 0.0
+
+class StyleClassificationPipeline:
+    """Re-tags a whole catalog with ``StyleClassificationAgent``.
+
+    Items are packed ``items_per_prompt`` to an LLM call, calls run
+    concurrently under a rate limit, and results are written back to the
+    Elasticsearch ``styles`` field with bulk updates. Index refresh is
+    suspended once for the whole run rather than around every write batch.
+    Ids are appended to a checkpoint file only after their update has been
+    written, so rerunning an interrupted job skips finished items and
+    retries the rest.
+    """
+
+    def __init__(
+        self,
+        agent: StyleClassificationAgent,
+        es_client: ElasticsearchClient,
+        checkpoint_path: str,
+        items_per_prompt: int = 10,
+        max_concurrency: int = 8,
+        requests_per_second: float = 5.0,
+        write_batch_size: int = 500
+    ):
+        self.agent = agent
+        self.es_client = es_client
+        self.checkpoint_path = checkpoint_path
+        self.items_per_prompt = items_per_prompt
+        self.max_concurrency = max_concurrency
+        self.rate_limiter = AsyncRateLimiter(requests_per_second, burst=max_concurrency)
+        self.write_batch_size = write_batch_size
+
+    def _load_checkpoint(self) -> Set[str]:
+        if not os.path.exists(self.checkpoint_path):
+            return set()
+        with open(self.checkpoint_path) as f:
+            return {line.strip() for line in f if line.strip()}
+
+    def _append_checkpoint(self, ids: List[str]) -> None:
+        with open(self.checkpoint_path, "a") as f:
+            f.write("".join(f"{item_id}\n" for item_id in ids))
+
+    @staticmethod
+    def _describe(item: FashionItem) -> Dict[str, Any]:
+        attributes = ", ".join(f"{key}: {value}" for key, value in item.attributes.items())
+        description = f"{item.name} ({item.category.value}"
+        if item.brand:
+            description += f", {item.brand}"
+        description += f"). {attributes}" if attributes else ")"
+        return {"id": item.id, "description": description, "image_url": item.image_url}
+
+    async def run(self, items: Iterable[FashionItem]) -> StylePipelineReport:
+        """Classify every item not already in the checkpoint."""
+        report = StylePipelineReport()
+        started = time.perf_counter()
+        done = self._load_checkpoint()
+        pending_writes: List[Dict[str, Any]] = []
+        write_lock = asyncio.Lock()
+
+        def unfinished() -> Iterable[Dict[str, Any]]:
+            for item in items:
+                if item.id in done:
+                    report.skipped += 1
+                    continue
+                yield self._describe(item)
+
+        async def flush() -> None:
+            batch = pending_writes[:]
+            pending_writes.clear()
+            if not batch:
+                return
+            result = await asyncio.to_thread(self.es_client.bulk_update, batch, refresh_interval=None)
+            failed = {error.id for error in result.errors if error.id}
+            if result.errors and not failed:
+                # Whole request failed: nothing from this batch was written
+                failed = {update["id"] for update in batch}
+            written = [update["id"] for update in batch if update["id"] not in failed]
+            await asyncio.to_thread(self._append_checkpoint, written)
+            report.written += len(written)
+            report.failed += len(failed)
+            report.failed_ids.extend(sorted(failed))
+
+        async def classify(batch: List[Dict[str, Any]]) -> None:
+            await self.rate_limiter.acquire()
+            try:
+                results = await asyncio.to_thread(self.agent.classify_batch, batch)
+            except Exception as e:
+                logger.error(f"Error classifying batch of {len(batch)} items: {e}")
+                results = {}
+            report.llm_calls += 1
+            missing = [item["id"] for item in batch if item["id"] not in results]
+            report.classified += len(results)
+            report.failed += len(missing)
+            report.failed_ids.extend(missing)
+            async with write_lock:
+                pending_writes.extend(
+                    {"id": item_id, "styles": result["styles"], "style_confidence": result["confidence"]}
+                    for item_id, result in results.items()
+                )
+                if len(pending_writes) >= self.write_batch_size:
+                    await flush()
+
+        try:
+            previous_interval = await asyncio.to_thread(self.es_client.suspend_refresh)
+        except Exception as e:
+            # Writes still work, they just refresh as often as usual
+            logger.warning(f"Could not suspend index refresh: {e}")
+            previous_interval, suspended = None, False
+        else:
+            suspended = True
+        try:
+            in_flight: Set[asyncio.Task] = set()
+            for batch in iter_batches(unfinished(), self.items_per_prompt):
+                if len(in_flight) >= self.max_concurrency:
+                    _, in_flight = await asyncio.wait(in_flight, return_when=asyncio.FIRST_COMPLETED)
+                in_flight.add(asyncio.create_task(classify(batch)))
+            if in_flight:
+                await asyncio.wait(in_flight)
+            async with write_lock:
+                await flush()
+        finally:
+            if suspended:
+                await asyncio.to_thread(self.es_client.restore_refresh, previous_interval)
+
+        report.elapsed_seconds = time.perf_counter() - started
+        if report.elapsed_seconds > 0:
+            report.items_per_second = report.classified / report.elapsed_seconds
+        logger.info(
+            f"Classified {report.classified} items in {report.llm_calls} LLM calls "
+            f"({report.skipped} skipped, {report.failed} failed)"
+        )
+        return report
@@ -0,0 +1,160 @@
+import asyncio
+import logging
+import time
+from collections import Counter
+from typing import Any, Callable, Dict, List, Optional, Tuple
+
+logger = logging.getLogger(__name__)
+
+
+class InferenceBatcher:
+    """Groups concurrent inference requests into micro-batches.
+
+    Callers ``submit`` a single input and await its result. A background task
+    drains the queue into a batch once ``max_batch_size`` inputs are waiting or
+    ``max_wait_ms`` has passed since the first one arrived, then runs
+    ``predict_batch`` on the whole batch in a worker thread so the event loop
+    stays free while the model runs. If a batch fails, its inputs are retried
+    one at a time so only the bad input's caller gets the error.
+    """
+
+    def __init__(
+        self,
+        predict_batch: Callable[[List[Any]], List[Any]],
+        max_batch_size: int = 16,
+        max_wait_ms: float = 10.0,
+    ):
+        if max_batch_size < 1:
+            raise ValueError("max_batch_size must be at least 1")
+        self.predict_batch = predict_batch
+        self.max_batch_size = max_batch_size
+        self.max_wait = max_wait_ms / 1000.0
+        self._queue: Optional[asyncio.Queue] = None
+        self._worker: Optional[asyncio.Task] = None
+        self._batch_sizes: Counter = Counter()
+        self._max_queue_depth = 0
+        self._batches = 0
+        self._items = 0
+        self._busy_seconds = 0.0
+
+    def start(self) -> None:
+        """Start the batching loop on the running event loop."""
+        if self._worker is not None:
+            return
+        self._queue = asyncio.Queue()
+        self._worker = asyncio.create_task(self._run())
+
+    async def stop(self) -> None:
+        """Stop the batching loop, failing any requests still queued."""
+        if self._worker is None:
+            return
+        self._worker.cancel()
+        try:
+            await self._worker
+        except asyncio.CancelledError:
+            pass
+        self._worker = None
+        while not self._queue.empty():
+            _, future = self._queue.get_nowait()
+            if not future.done():
+                future.set_exception(RuntimeError("Inference batcher stopped"))
+
+    async def submit(self, item: Any) -> Any:
+        """Queue one input and wait for its prediction."""
+        if self._worker is None:
+            raise RuntimeError("Inference batcher is not running")
+        future = asyncio.get_running_loop().create_future()
+        await self._queue.put((item, future))
+        self._max_queue_depth = max(self._max_queue_depth, self._queue.qsize())
+        return await future
+
+    async def _collect(self, batch: List[Tuple[Any, asyncio.Future]]) -> None:
+        """Wait for the first request, then gather more until full or timed out.
+
+        Fills the caller's list in place, so requests already taken off the
+        queue can still be failed if the loop is cancelled mid-collect.
+        """
+        batch.append(await self._queue.get())
+        deadline = time.monotonic() + self.max_wait
+        while len(batch) < self.max_batch_size:
+            remaining = deadline - time.monotonic()
+            if remaining <= 0:
+                break
+            try:
+                batch.append(await asyncio.wait_for(self._queue.get(), remaining))
+            except asyncio.TimeoutError:
+                break
+
+    async def _run(self) -> None:
+        while True:
+            batch: List[Tuple[Any, asyncio.Future]] = []
+            try:
+                await self._collect(batch)
+                # Drop requests whose callers went away while queued
+                batch = [(item, future) for item, future in batch if not future.done()]
+                if batch:
+                    await self._run_batch(batch)
+            except asyncio.CancelledError:
+                # stop() only fails what is still queued; these were taken already
+                for _, future in batch:
+                    if not future.done():
+                        future.set_exception(RuntimeError("Inference batcher stopped"))
+                raise
+
+    async def _run_batch(self, batch: List[Tuple[Any, asyncio.Future]]) -> None:
+        inputs = [item for item, _ in batch]
+        started = time.perf_counter()
+        try:
+            results = await asyncio.to_thread(self._predict, inputs)
+        except Exception as e:
+            if len(batch) == 1:
+                logger.error(f"Error running inference: {e}")
+                results = [e]
+            else:
+                # One bad input shouldn't fail everyone batched with it
+                logger.warning(f"Inference batch of {len(batch)} failed ({e}); retrying items one by one")
+                results = await asyncio.to_thread(self._predict_each, inputs)
+        finally:
+            self._busy_seconds += time.perf_counter() - started
+            self._batch_sizes[len(batch)] += 1
+            self._batches += 1
+            self._items += len(batch)
+        for (_, future), result in zip(batch, results):
+            if future.done():
+                continue
+            if isinstance(result, Exception):
+                future.set_exception(result)
+            else:
+                future.set_result(result)
+
+    def _predict(self, inputs: List[Any]) -> List[Any]:
+        results = self.predict_batch(inputs)
+        if len(results) != len(inputs):
+            raise RuntimeError(f"predict_batch returned {len(results)} results for {len(inputs)} inputs")
+        return results
+
+    def _predict_each(self, inputs: List[Any]) -> List[Any]:
+        """Per-input results or exceptions, running each input as its own batch."""
+        results = []
+        for item in inputs:
+            try:
+                results.append(self._predict([item])[0])
+            except Exception as e:
+                logger.error(f"Error running inference: {e}")
+                results.append(e)
+        return results
+
+    def stats(self) -> Dict[str, Any]:
+        """Return queue depth and batch-size histogram for tuning."""
+        return {
+            "running": self._worker is not None,
+            "max_batch_size": self.max_batch_size,
+            "max_wait_ms": self.max_wait * 1000.0,
+            "queue_depth": self._queue.qsize() if self._queue is not None else 0,
+            "max_queue_depth": self._max_queue_depth,
+            "batches": self._batches,
+            "items": self._items,
+            "mean_batch_size": self._items / self._batches if self._batches else 0.0,
+            "batch_size_histogram": {str(size): count for size, count in sorted(self._batch_sizes.items())},
+            "busy_seconds": round(self._busy_seconds, 4),
+        }
@@ -0,0 +1,67 @@
+from typing import List, Tuple
+
+from PIL import Image
+
+from core.metrics import timed
+
+
+class FashionClassifier:
+    """The ViT fashion classifier plus its preprocessing and inference runner."""
+
+    def __init__(self, extractor, model, run_logits):
+        self.extractor = extractor
+        self.model = model
+        self.run_logits = run_logits
+
+    @classmethod
+    def load(
+        cls,
+        model_name: str,
+        mode: str = "eager",
+        export_dir: str = "exported_models",
+        intra_op_threads: int = 0,
+        inter_op_threads: int = 0,
+    ) -> "FashionClassifier":
+        """Download/build the model and its runner for the given inference mode."""
+        # Heavy imports live here so importing the app stays fast
+        from transformers import AutoFeatureExtractor, AutoModelForImageClassification
+        from backend.inference_modes import build_runner
+
+        extractor = AutoFeatureExtractor.from_pretrained(model_name)
+        model = AutoModelForImageClassification.from_pretrained(model_name)
+        model.eval()
+        classifier = cls(extractor, model, None)
+        classifier.run_logits = build_runner(
+            model,
+            mode,
+            export_dir=export_dir,
+            input_size=classifier.input_size(),
+            intra_op_threads=intra_op_threads,
+            inter_op_threads=inter_op_threads,
+        )
+        return classifier
+
+    def input_size(self) -> Tuple[int, int]:
+        """Return the (height, width) the feature extractor resizes images to."""
+        size = getattr(self.extractor, "size", 224)
+        if isinstance(size, dict):
+            if "height" in size:
+                return size["height"], size["width"]
+            edge = size.get("shortest_edge", 224)
+            return edge, edge
+        return int(size), int(size)
+
+    def classify_batch(self, images: List[Image.Image]) -> List[Tuple[str, float]]:
+        """Run the classifier on a batch of images as a single forward pass."""
+        import torch
+
+        with timed("preprocess"):
+            inputs = self.extractor(images=images, return_tensors="pt")
+        with timed("model_forward"):
+            logits = self.run_logits(inputs["pixel_values"])
+        probs = torch.softmax(logits, dim=1)
+        confs, pred_idxs = torch.max(probs, 1)
+        return [
+            (self.model.config.id2label[int(pred_idx)], float(conf))
+            for conf, pred_idx in zip(confs, pred_idxs)
+        ]
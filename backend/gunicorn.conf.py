@@ -0,0 +1,27 @@
+"""Multi-worker deployment for the backend that shares one copy of the model.
+
+    PRELOAD_MODEL=true gunicorn -c backend/gunicorn.conf.py backend.main:app
+
+With ``preload_app`` the master imports backend.main, and with it loads the
+model, before forking. Workers then share the weight pages copy-on-write
+instead of each holding their own copy. Prefer the eager or int8 inference
+modes here: the other modes run inference while exporting, which starts
+thread pools in the master before it forks. The SQLite-backed stores
+(result cache, try-on jobs) open their connections on first use in each
+worker, never in the master.
+"""
+import gc
+import multiprocessing
+import os
+
+bind = os.getenv("BIND", "0.0.0.0:8000")
+workers = int(os.getenv("WEB_CONCURRENCY", str(max(2, multiprocessing.cpu_count() // 2))))
+worker_class = "uvicorn.workers.UvicornWorker"
+preload_app = True
+timeout = 120
+
+
+def when_ready(server):
+    # Move everything loaded so far out of the GC's reach so collections in
+    # the workers don't touch (and copy) the shared pages
+    gc.freeze()
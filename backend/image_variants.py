@@ -0,0 +1,131 @@
+import bisect
+import logging
+import os
+import uuid
+from typing import Dict, List, Optional, Sequence
+
+from PIL import Image, features
+
+logger = logging.getLogger(__name__)
+
+# format name -> (PIL format, media type, PIL feature that must be available)
+FORMATS = {
+    "avif": ("AVIF", "image/avif", "avif"),
+    "webp": ("WEBP", "image/webp", "webp"),
+    "jpeg": ("JPEG", "image/jpeg", None),
+}
+
+
+def _format_available(feature: Optional[str]) -> bool:
+    if feature is None:
+        return True
+    try:
+        return bool(features.check(feature))
+    except ValueError:
+        # Older Pillow releases don't know the feature at all
+        return False
+
+
+class ImageVariants:
+    """Resized, re-encoded derivatives of uploaded images.
+
+    Variants are written next to each other under ``variant_dir`` as
+    ``<stem>/<width>.<format>``. Requested widths snap up to the nearest
+    configured width so the number of files per image stays bounded. Uploads
+    are named by content hash and never change, so a variant never goes
+    stale and can be cached forever.
+    """
+
+    def __init__(
+        self,
+        upload_dir: str,
+        variant_dir: str,
+        widths: Sequence[int] = (256, 512, 1024),
+        formats: Sequence[str] = ("avif", "webp"),
+        quality: int = 75,
+    ):
+        self.upload_dir = upload_dir
+        self.variant_dir = variant_dir
+        self.widths = sorted(widths)
+        self.quality = quality
+        self.formats = [name for name in formats if name in FORMATS and _format_available(FORMATS[name][2])]
+        skipped = set(formats) - set(self.formats)
+        if skipped:
+            logger.warning(f"Image variant formats unavailable in this Pillow build: {sorted(skipped)}")
+        os.makedirs(variant_dir, exist_ok=True)
+
+    def snap_width(self, width: int) -> int:
+        """Return the smallest configured width at least ``width`` (or the largest)."""
+        i = bisect.bisect_left(self.widths, width)
+        return self.widths[min(i, len(self.widths) - 1)]
+
+    def negotiate(self, accept: str, requested: Optional[str] = None) -> str:
+        """Pick an output format from an explicit request or the Accept header."""
+        if requested:
+            if requested not in FORMATS or (requested != "jpeg" and requested not in self.formats):
+                raise ValueError(f"Unsupported image format: {requested}")
+            return requested
+        accept = accept or ""
+        for name in self.formats:
+            if FORMATS[name][1] in accept:
+                return name
+        return "jpeg"
+
+    def media_type(self, fmt: str) -> str:
+        return FORMATS[fmt][1]
+
+    def path(self, filename: str, width: int, fmt: str) -> str:
+        stem = os.path.splitext(filename)[0]
+        return os.path.join(self.variant_dir, stem, f"{width}.{fmt}")
+
+    def ensure(self, filename: str, width: int, fmt: str) -> str:
+        """Return the variant's path, generating it first if needed."""
+        target = self.path(filename, width, fmt)
+        if os.path.exists(target):
+            return target
+        os.makedirs(os.path.dirname(target), exist_ok=True)
+        with Image.open(os.path.join(self.upload_dir, filename)) as image:
+            image.draft("RGB", (width, width))
+            image.thumbnail((width, width * 4), Image.LANCZOS)
+            image = image.convert("RGB")
+            # Write beside the target and rename so readers never see a partial file
+            tmp_path = f"{target}.{uuid.uuid4().hex}.tmp"
+            image.save(tmp_path, FORMATS[fmt][0], quality=self.quality)
+        os.replace(tmp_path, target)
+        return target
+
+    def generate_all(self, filename: str) -> List[str]:
+        """Generate every configured width/format variant for an upload."""
+        paths = []
+        for width in self.widths:
+            for fmt in self.formats + ["jpeg"]:
+                try:
+                    paths.append(self.ensure(filename, width, fmt))
+                except Exception as e:
+                    logger.error(f"Error generating {fmt} variant of {filename} at {width}px: {e}")
+        return paths
+
+
+def etag_matches(if_none_match: Optional[str], etag: str) -> bool:
+    """Evaluate an If-None-Match header against a strong ETag."""
+    if not if_none_match:
+        return False
+    if if_none_match.strip() == "*":
+        return True
+    candidates = [tag.strip() for tag in if_none_match.split(",")]
+    # If-None-Match uses weak comparison, so W/ prefixes are ignored
+    return any(tag.removeprefix("W/") == etag for tag in candidates)
+
+
+def parse_widths(value: str) -> List[int]:
+    return [int(width) for width in value.split(",") if width.strip()]
+
+
+def cache_headers(etag: str, vary_accept: bool = False) -> Dict[str, str]:
+    headers = {
+        "ETag": etag,
+        "Cache-Control": "public, max-age=31536000, immutable",
+    }
+    if vary_accept:
+        headers["Vary"] = "Accept"
+    return headers
@@ -0,0 +1,139 @@
+import logging
+import os
+from typing import Callable, Optional, Tuple
+
+import torch
+
+logger = logging.getLogger(__name__)
+
+INFERENCE_MODES = ("eager", "int8", "torchscript", "onnx", "onnx-int8")
+
+# Takes a (batch, 3, H, W) float tensor of pixel values, returns logits
+LogitsRunner = Callable[[torch.Tensor], torch.Tensor]
+
+
+class _LogitsOnly(torch.nn.Module):
+    """Wraps a HF classifier so tracing/export sees a plain tensor output."""
+
+    def __init__(self, model: torch.nn.Module):
+        super().__init__()
+        self.model = model
+
+    def forward(self, pixel_values: torch.Tensor) -> torch.Tensor:
+        return self.model(pixel_values=pixel_values).logits
+
+
+def configure_threads(intra_op: Optional[int] = None, inter_op: Optional[int] = None) -> None:
+    """Set PyTorch CPU thread pools; 0 or None keeps the library default."""
+    if intra_op:
+        torch.set_num_threads(intra_op)
+    if inter_op:
+        try:
+            torch.set_num_interop_threads(inter_op)
+        except RuntimeError as e:
+            # Can only be set once, before any inter-op parallel work has run
+            logger.warning(f"Could not set inter-op threads: {e}")
+
+
+def build_runner(
+    model: torch.nn.Module,
+    mode: str = "eager",
+    export_dir: str = "exported_models",
+    input_size: Tuple[int, int] = (224, 224),
+    intra_op_threads: Optional[int] = None,
+    inter_op_threads: Optional[int] = None,
+) -> LogitsRunner:
+    """Build a logits function for the given inference mode.
+
+    - ``eager``: the fp32 model as loaded.
+    - ``int8``: PyTorch dynamic int8 quantization of all Linear layers.
+    - ``torchscript``: a traced fp32 graph, saved to ``export_dir`` once.
+    - ``onnx`` / ``onnx-int8``: an ONNX export run with onnxruntime, the
+      latter with dynamically quantized int8 weights.
+
+    Exports are cached in ``export_dir`` and reused on later starts.
+    """
+    if mode not in INFERENCE_MODES:
+        raise ValueError(f"Unknown inference mode {mode!r}, expected one of {INFERENCE_MODES}")
+    model.eval()
+    if mode.startswith("onnx"):
+        return _build_onnx_runner(model, mode, export_dir, input_size, intra_op_threads, inter_op_threads)
+
+    configure_threads(intra_op_threads, inter_op_threads)
+    wrapped = _LogitsOnly(model).eval()
+    if mode == "int8":
+        wrapped = torch.ao.quantization.quantize_dynamic(wrapped, {torch.nn.Linear}, dtype=torch.qint8)
+    elif mode == "torchscript":
+        wrapped = _load_or_trace(wrapped, export_dir, input_size)
+
+    def run(pixel_values: torch.Tensor) -> torch.Tensor:
+        with torch.inference_mode():
+            return wrapped(pixel_values)
+
+    return run
+
+
+def _load_or_trace(wrapped: torch.nn.Module, export_dir: str, input_size: Tuple[int, int]) -> torch.nn.Module:
+    path = os.path.join(export_dir, "model.torchscript.pt")
+    if os.path.exists(path):
+        return torch.jit.load(path)
+    os.makedirs(export_dir, exist_ok=True)
+    example = torch.zeros(1, 3, *input_size)
+    with torch.no_grad():
+        traced = torch.jit.trace(wrapped, example)
+    traced = torch.jit.freeze(traced)
+    traced.save(path)
+    logger.info(f"Saved TorchScript model to {path}")
+    return traced
+
+
+def _export_onnx(wrapped: torch.nn.Module, path: str, input_size: Tuple[int, int]) -> None:
+    example = torch.zeros(1, 3, *input_size)
+    torch.onnx.export(
+        wrapped,
+        (example,),
+        path,
+        input_names=["pixel_values"],
+        output_names=["logits"],
+        dynamic_axes={"pixel_values": {0: "batch"}, "logits": {0: "batch"}},
+        opset_version=17,
+    )
+    logger.info(f"Exported ONNX model to {path}")
+
+
+def _build_onnx_runner(
+    model: torch.nn.Module,
+    mode: str,
+    export_dir: str,
+    input_size: Tuple[int, int],
+    intra_op_threads: Optional[int],
+    inter_op_threads: Optional[int],
+) -> LogitsRunner:
+    import onnxruntime as ort
+
+    os.makedirs(export_dir, exist_ok=True)
+    fp32_path = os.path.join(export_dir, "model.onnx")
+    if not os.path.exists(fp32_path):
+        _export_onnx(_LogitsOnly(model).eval(), fp32_path, input_size)
+    path = fp32_path
+    if mode == "onnx-int8":
+        from onnxruntime.quantization import QuantType, quantize_dynamic
+
+        path = os.path.join(export_dir, "model.int8.onnx")
+        if not os.path.exists(path):
+            quantize_dynamic(fp32_path, path, weight_type=QuantType.QInt8)
+            logger.info(f"Saved int8 ONNX model to {path}")
+
+    options = ort.SessionOptions()
+    options.graph_optimization_level = ort.GraphOptimizationLevel.ORT_ENABLE_ALL
+    if intra_op_threads:
+        options.intra_op_num_threads = intra_op_threads
+    if inter_op_threads:
+        options.inter_op_num_threads = inter_op_threads
+    session = ort.InferenceSession(path, options, providers=["CPUExecutionProvider"])
+
+    def run(pixel_values: torch.Tensor) -> torch.Tensor:
+        (logits,) = session.run(["logits"], {"pixel_values": pixel_values.numpy()})
+        return torch.from_numpy(logits)
+
+    return run
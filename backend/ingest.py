@@ -0,0 +1,77 @@
+import hashlib
+import math
+import os
+import uuid
+from typing import Tuple
+
+from fastapi import HTTPException, UploadFile
+from PIL import Image
+from starlette.concurrency import run_in_threadpool
+
+UPLOAD_CHUNK_SIZE = 1024 * 1024
+
+
+async def stream_upload_to_disk(
+    file: UploadFile,
+    upload_dir: str,
+    max_bytes: int,
+    chunk_size: int = UPLOAD_CHUNK_SIZE,
+) -> Tuple[str, str]:
+    """Copy an upload to a temporary file in chunks, hashing as it goes.
+
+    Only one chunk is held in memory at a time and every disk write runs in
+    the threadpool. Raises a 413 as soon as the body grows past ``max_bytes``.
+    Returns the temporary path and the SHA-256 hex digest of the body.
+    """
+    tmp_path = os.path.join(upload_dir, f".{uuid.uuid4().hex}.part")
+    digest = hashlib.sha256()
+    size = 0
+    f = await run_in_threadpool(open, tmp_path, "wb")
+    try:
+        while True:
+            chunk = await file.read(chunk_size)
+            if not chunk:
+                break
+            size += len(chunk)
+            if size > max_bytes:
+                raise HTTPException(status_code=413, detail=f"Image exceeds {max_bytes} bytes")
+            digest.update(chunk)
+            await run_in_threadpool(f.write, chunk)
+    except BaseException:
+        await run_in_threadpool(f.close)
+        await run_in_threadpool(_remove_quietly, tmp_path)
+        raise
+    await run_in_threadpool(f.close)
+    return tmp_path, digest.hexdigest()
+
+
+def commit_upload(tmp_path: str, final_path: str) -> None:
+    """Move a finished upload into place, keeping any existing identical copy."""
+    if os.path.exists(final_path):
+        _remove_quietly(tmp_path)
+    else:
+        os.replace(tmp_path, final_path)
+
+
+def load_image_for_model(path: str, target_size: Tuple[int, int]) -> Image.Image:
+    """Decode an image no larger than needed for a ``target_size`` model input.
+
+    JPEGs are decoded at a reduced DCT scale via ``draft`` and the result is
+    shrunk with ``thumbnail`` so both sides stay at or above the target, which
+    keeps the extractor's own resize step lossless compared to a full decode.
+    """
+    target_h, target_w = target_size
+    with Image.open(path) as image:
+        image.draft("RGB", (target_w, target_h))
+        width, height = image.size
+        scale = max(target_w / width, target_h / height)
+        if scale < 1:
+            image.thumbnail((math.ceil(width * scale), math.ceil(height * scale)), Image.BILINEAR)
+        return image.convert("RGB")
+
+
+def _remove_quietly(path: str) -> None:
+    try:
+        os.remove(path)
+    except FileNotFoundError:
+        pass
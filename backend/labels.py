@@ -0,0 +1,36 @@
+# Map model classes to eras (simple mapping for MVP)
+CATEGORY_TO_ERA = {
+    'Blazer': '1980s',
+    'Blouse': '1940s',
+    'Dress': '1960s',
+    'Jeans': '1970s',
+    'Jacket': '1990s',
+    'Shorts': '1990s',
+    'Skirt': '1950s',
+    'Sweater': '1950s',
+    'Tee': '1990s',
+    'Top': '1940s',
+    'Trousers': '1940s',
+    'Cardigan': '1950s',
+    'Tank': '1990s',
+    'Romper': '1970s',
+    'Jumpsuit': '1970s',
+    'Hoodie': '1990s',
+    'Pants': '1970s',
+    'Coat': '1940s',
+    'Sweatshirt': '1990s',
+    'Vest': '1980s',
+    'Polo': '1980s',
+    'Turtleneck': '1960s',
+    'Kimono': '1970s',
+    'Poncho': '1970s',
+    'Cape': '1940s',
+    'Overalls': '1970s',
+    'Suit': '1980s',
+    'Shirt': '1940s',
+    'Other': '1990s',
+}
+
+def era_for(pred_class: str) -> str:
+    """Return the era for a predicted class, defaulting to the 1990s."""
+    return CATEGORY_TO_ERA.get(pred_class, '1990s')
@@ -1,16 +1,51 @@
+import asyncio
+import json
 import os
-from fastapi import FastAPI, File, UploadFile
-from fastapi.responses import JSONResponse, FileResponse
+import sys
+sys.path.append(os.path.abspath(os.path.join(os.path.dirname(__file__), '..')))
+
+from datetime import datetime, timezone
+from fastapi import BackgroundTasks, FastAPI, File, Form, HTTPException, Request, UploadFile
+from fastapi.responses import FileResponse, JSONResponse, Response, StreamingResponse
 from fastapi.middleware.cors import CORSMiddleware
 from PIL import Image
-from transformers import AutoFeatureExtractor, AutoModelForImageClassification
-import torch
-import uuid
+from starlette.concurrency import run_in_threadpool
+from typing import Any, Dict, List, Optional, Tuple
+
+from core.metrics import instrument_app, timed
+from core.models import TryOnJob
+from core.utils import setup_logging
+
+from backend.batching import InferenceBatcher
+from backend.classifier import FashionClassifier
+from backend.image_variants import ImageVariants, cache_headers, etag_matches, parse_widths
+from backend.ingest import commit_upload, load_image_for_model, stream_upload_to_disk
+from backend.labels import era_for
+from backend.model_loader import ModelLoader
+from backend.result_cache import ClassificationCache
+from backend.tryon_jobs import (
+    EXPIRED, QUEUED, SUCCEEDED, TERMINAL_STATUSES, TryOnJobStore, TryOnWorkerPool, new_job_id,
+)
 
 UPLOAD_DIR = "uploads"
 os.makedirs(UPLOAD_DIR, exist_ok=True)
 
+# Maximum accepted upload size, in kilobytes
+MAX_IMAGE_SIZE = int(os.getenv("MAX_IMAGE_SIZE", "2048"))
+
+# Resized variants served by /images/{filename}?w=...
+variants = ImageVariants(
+    UPLOAD_DIR,
+    os.getenv("IMAGE_VARIANT_DIR", os.path.join(UPLOAD_DIR, ".variants")),
+    widths=parse_widths(os.getenv("IMAGE_VARIANT_WIDTHS", "256,512,1024")),
+    formats=os.getenv("IMAGE_VARIANT_FORMATS", "avif,webp").split(","),
+)
+IMAGE_VARIANT_PREGENERATE = os.getenv("IMAGE_VARIANT_PREGENERATE", "true").lower() in ("1", "true", "yes")
+THUMBNAIL_WIDTH = variants.snap_width(256)
+
+setup_logging()
 app = FastAPI()
+instrument_app(app, service="backend")
 
 # Allow CORS for local frontend
 app.add_middleware(
@@ -21,77 +56,294 @@ app.add_middleware(
     allow_headers=["*"],
 )
 
-# Load model and processor
 MODEL_NAME = "nateraw/vit-fashion-classifier"
-extractor = AutoFeatureExtractor.from_pretrained(MODEL_NAME)
-model = AutoModelForImageClassification.from_pretrained(MODEL_NAME)
-model.eval()
-
-# Map model classes to eras (simple mapping for MVP)
-CATEGORY_TO_ERA = {
-    'Blazer': '1980s',
-    'Blouse': '1940s',
-    'Dress': '1960s',
-    'Jeans': '1970s',
-    'Jacket': '1990s',
-    'Shorts': '1990s',
-    'Skirt': '1950s',
-    'Sweater': '1950s',
-    'Tee': '1990s',
-    'Top': '1940s',
-    'Trousers': '1940s',
-    'Cardigan': '1950s',
-    'Tank': '1990s',
-    'Romper': '1970s',
-    'Jumpsuit': '1970s',
-    'Hoodie': '1990s',
-    'Pants': '1970s',
-    'Coat': '1940s',
-    'Sweatshirt': '1990s',
-    'Vest': '1980s',
-    'Polo': '1980s',
-    'Turtleneck': '1960s',
-    'Kimono': '1970s',
-    'Poncho': '1970s',
-    'Cape': '1940s',
-    'Overalls': '1970s',
-    'Suit': '1980s',
-    'Shirt': '1940s',
-    'Other': '1990s',
-}
+
+# CPU inference mode: eager, int8, torchscript, onnx or onnx-int8
+INFERENCE_MODE = os.getenv("INFERENCE_MODE", "eager")
+INFERENCE_EXPORT_DIR = os.getenv("INFERENCE_EXPORT_DIR", os.path.join("exported_models", MODEL_NAME.replace("/", "--")))
+INTRA_OP_THREADS = int(os.getenv("INTRA_OP_THREADS", "0"))
+INTER_OP_THREADS = int(os.getenv("INTER_OP_THREADS", "0"))
+
+# Load the model at import time, e.g. in a gunicorn --preload master so
+# forked workers share one copy of the weights
+PRELOAD_MODEL = os.getenv("PRELOAD_MODEL", "false").lower() in ("1", "true", "yes")
+
+# Model and processor, loaded in the background after startup
+classifier = ModelLoader(
+    lambda: FashionClassifier.load(
+        MODEL_NAME,
+        INFERENCE_MODE,
+        export_dir=INFERENCE_EXPORT_DIR,
+        intra_op_threads=INTRA_OP_THREADS,
+        inter_op_threads=INTER_OP_THREADS,
+    ),
+    name=MODEL_NAME,
+)
+if PRELOAD_MODEL:
+    classifier.load()
+
+# Micro-batching configuration for /upload inference
+INFERENCE_MAX_BATCH_SIZE = int(os.getenv("INFERENCE_MAX_BATCH_SIZE", "16"))
+INFERENCE_MAX_WAIT_MS = float(os.getenv("INFERENCE_MAX_WAIT_MS", "10"))
+
+# Classification results keyed by SHA-256 of the uploaded bytes
+RESULT_CACHE_PATH = os.getenv("RESULT_CACHE_PATH", "results.sqlite3")
+RESULT_CACHE_SIZE = int(os.getenv("RESULT_CACHE_SIZE", "10000"))
+result_cache = ClassificationCache(RESULT_CACHE_PATH, max_entries=RESULT_CACHE_SIZE)
+
+def classify_batch(images: List[Image.Image]) -> List[Tuple[str, float]]:
+    return classifier.value.classify_batch(images)
+
+batcher = InferenceBatcher(
+    classify_batch,
+    max_batch_size=INFERENCE_MAX_BATCH_SIZE,
+    max_wait_ms=INFERENCE_MAX_WAIT_MS,
+)
+
+# Virtual try-on jobs, rendered by worker processes outside the API process
+TRYON_DIR = os.getenv("TRYON_DIR", "tryon")
+os.makedirs(TRYON_DIR, exist_ok=True)
+TRYON_MAX_QUEUED = int(os.getenv("TRYON_MAX_QUEUED", "100"))
+# Seconds between SSE keep-alive comments on /tryon/jobs/{job_id}/events
+TRYON_EVENTS_KEEPALIVE = 15.0
+tryon_store = TryOnJobStore(
+    os.getenv("TRYON_DB_PATH", os.path.join(TRYON_DIR, "jobs.sqlite3")),
+    result_ttl_seconds=float(os.getenv("TRYON_RESULT_TTL_SECONDS", "3600")),
+)
+tryon_pool = TryOnWorkerPool(
+    tryon_store,
+    TRYON_DIR,
+    renderer=os.getenv("TRYON_RENDERER", "backend.tryon_render:composite"),
+    workers=int(os.getenv("TRYON_WORKERS", "2")),
+    worker_nice=int(os.getenv("TRYON_WORKER_NICE", "10")),
+    job_timeout_seconds=float(os.getenv("TRYON_JOB_TIMEOUT_SECONDS", "300")),
+)
+
+@app.on_event("startup")
+async def start_batcher():
+    batcher.start()
+    classifier.start_background_load()
+    tryon_pool.start()
+
+@app.on_event("shutdown")
+async def stop_batcher():
+    await batcher.stop()
+    await tryon_pool.stop()
+    result_cache.close()
+    tryon_store.close()
 
 @app.post("/upload")
-async def upload_image(file: UploadFile = File(...)):
-    # Save image
-    ext = os.path.splitext(file.filename)[-1]
-    filename = f"{uuid.uuid4().hex}{ext}"
+async def upload_image(background_tasks: BackgroundTasks, file: UploadFile = File(...)):
+    # Stream the body to disk, hashing it on the way
+    with timed("upload_receive"):
+        tmp_path, content_hash = await stream_upload_to_disk(file, UPLOAD_DIR, MAX_IMAGE_SIZE * 1024)
+    # Identical bytes were classified before: skip storage and inference
+    cached = await run_in_threadpool(result_cache.get, content_hash)
+    if cached is not None and os.path.exists(os.path.join(UPLOAD_DIR, cached["filename"])):
+        await run_in_threadpool(os.remove, tmp_path)
+        return JSONResponse(_with_urls(cached))
+    # Cache hits work during warm-up; new images need the model
+    if not classifier.ready:
+        await run_in_threadpool(os.remove, tmp_path)
+        raise HTTPException(status_code=503, detail="Model is warming up", headers={"Retry-After": "5"})
+    # Save image under its content hash so duplicates are stored once
+    ext = os.path.splitext(file.filename)[-1].lower()
+    filename = f"{content_hash}{ext}"
     filepath = os.path.join(UPLOAD_DIR, filename)
-    with open(filepath, "wb") as f:
-        f.write(await file.read())
-    # Open and preprocess image
-    image = Image.open(filepath).convert("RGB")
-    inputs = extractor(images=image, return_tensors="pt")
-    with torch.no_grad():
-        outputs = model(**inputs)
-        logits = outputs.logits
-        probs = torch.softmax(logits, dim=1)[0]
-        conf, pred_idx = torch.max(probs, 0)
-        conf = float(conf)
-        pred_idx = int(pred_idx)
-        pred_class = model.config.id2label[pred_idx]
-    era = CATEGORY_TO_ERA.get(pred_class, '1990s')
-    # Compose response
-    return JSONResponse({
+    await run_in_threadpool(commit_upload, tmp_path, filepath)
+    # Decode at model resolution off the event loop, then classify in the next batch
+    try:
+        with timed("upload_decode"):
+            image = await run_in_threadpool(load_image_for_model, filepath, classifier.value.input_size())
+    except (OSError, Image.DecompressionBombError):
+        # Unrecognized, truncated or oversized images; UnidentifiedImageError is an OSError
+        await run_in_threadpool(os.remove, filepath)
+        raise HTTPException(status_code=400, detail="Uploaded file is not a supported image")
+    # Includes time queued for the next batch
+    with timed("inference"):
+        pred_class, conf = await batcher.submit(image)
+    era = era_for(pred_class)
+    result = {
         "filename": filename,
-        "image_url": f"/images/{filename}",
         "predicted_class": pred_class,
         "era": era,
         "confidence": round(conf * 100, 2)
-    })
+    }
+    await run_in_threadpool(result_cache.put, content_hash, result)
+    if IMAGE_VARIANT_PREGENERATE:
+        # Runs in the threadpool after the response has been sent
+        background_tasks.add_task(variants.generate_all, filename)
+    # Compose response
+    return JSONResponse(_with_urls(result))
+
+def _with_urls(result: dict) -> dict:
+    filename = result["filename"]
+    return {
+        **result,
+        "image_url": f"/images/{filename}",
+        "thumbnail_url": f"/images/{filename}?w={THUMBNAIL_WIDTH}",
+    }
+
+@app.get("/healthz")
+def liveness():
+    return {"status": "alive"}
+
+@app.get("/readyz")
+def readiness():
+    status = classifier.status()
+    return JSONResponse(status, status_code=200 if classifier.ready else 503)
+
+@app.get("/stats/inference")
+def inference_stats():
+    return {"batching": batcher.stats(), "result_cache": result_cache.stats(), "tryon": tryon_pool.stats()}
 
 @app.get("/images/{filename}")
-def get_image(filename: str):
+async def get_image(
+    filename: str,
+    request: Request,
+    w: Optional[int] = None,
+    format: Optional[str] = None,
+):
+    # Only plain files directly in UPLOAD_DIR; dotfiles are temp uploads and variants
+    if os.path.basename(filename) != filename or filename.startswith("."):
+        return JSONResponse({"error": "Not found"}, status_code=404)
     filepath = os.path.join(UPLOAD_DIR, filename)
-    if not os.path.exists(filepath):
+    if not os.path.isfile(filepath):
         return JSONResponse({"error": "Not found"}, status_code=404)
-    return FileResponse(filepath) 
\ No newline at end of file
+    stem = os.path.splitext(filename)[0]
+    if w is None and format is None:
+        # Originals are named by content hash, so the name is a strong validator
+        etag = f'"{stem}"'
+        headers = cache_headers(etag)
+        if etag_matches(request.headers.get("if-none-match"), etag):
+            return Response(status_code=304, headers=headers)
+        return FileResponse(filepath, headers=headers)
+
+    width = variants.snap_width(w or max(variants.widths))
+    try:
+        fmt = variants.negotiate(request.headers.get("accept", ""), format)
+    except ValueError as e:
+        return JSONResponse({"error": str(e)}, status_code=400)
+    etag = f'"{stem}-{width}.{fmt}"'
+    headers = cache_headers(etag, vary_accept=format is None)
+    if etag_matches(request.headers.get("if-none-match"), etag):
+        return Response(status_code=304, headers=headers)
+    # Generated on first request if upload-time generation hasn't run yet
+    path = await run_in_threadpool(variants.ensure, filename, width, fmt)
+    # FileResponse handles Range requests and uses zero-copy sendfile where the server supports it
+    return FileResponse(path, media_type=variants.media_type(fmt), headers=headers)
+
+@app.post("/tryon/jobs", status_code=202)
+async def submit_tryon(
+    user_image: UploadFile = File(...),
+    fashion_item_id: str = Form(...),
+    garment_image: Optional[UploadFile] = File(None),
+    preferences: str = Form("{}"),
+):
+    """Queue a try-on from a multipart upload; the image bytes are never base64-encoded.
+
+    The garment is either uploaded alongside or, when omitted, the image
+    previously uploaded to /upload under the filename ``fashion_item_id``.
+    """
+    try:
+        prefs = json.loads(preferences)
+    except json.JSONDecodeError:
+        raise HTTPException(status_code=400, detail="preferences must be a JSON object")
+    if not isinstance(prefs, dict):
+        raise HTTPException(status_code=400, detail="preferences must be a JSON object")
+    if garment_image is None:
+        garment_path = os.path.join(UPLOAD_DIR, fashion_item_id)
+        if os.path.basename(fashion_item_id) != fashion_item_id or fashion_item_id.startswith(".") \
+                or not os.path.isfile(garment_path):
+            raise HTTPException(status_code=404, detail=f"No uploaded image for fashion item {fashion_item_id}")
+    # Shed load before copying the images; workers drain the queue at a fixed rate
+    if await run_in_threadpool(tryon_store.count, QUEUED) >= TRYON_MAX_QUEUED:
+        raise HTTPException(status_code=503, detail="Try-on queue is full", headers={"Retry-After": "30"})
+
+    job_id = new_job_id()
+    max_bytes = MAX_IMAGE_SIZE * 1024
+    with timed("tryon_receive"):
+        person_path = await _store_tryon_input(user_image, job_id, "person", max_bytes)
+        if garment_image is not None:
+            garment_path = await _store_tryon_input(garment_image, job_id, "garment", max_bytes)
+    job = await run_in_threadpool(tryon_store.create, job_id, fashion_item_id, prefs, person_path, garment_path)
+    tryon_pool.notify_submitted()
+    return JSONResponse(
+        _tryon_view(job),
+        status_code=202,
+        headers={"Location": f"/tryon/jobs/{job_id}"},
+    )
+
+async def _store_tryon_input(file: UploadFile, job_id: str, name: str, max_bytes: int) -> str:
+    ext = os.path.splitext(file.filename or "")[-1].lower()
+    tmp_path, _ = await stream_upload_to_disk(file, tryon_pool.input_dir, max_bytes)
+    path = tryon_pool.input_path(job_id, f"{name}{ext}")
+    await run_in_threadpool(commit_upload, tmp_path, path)
+    return path
+
+def _tryon_view(job: Dict[str, Any]) -> dict:
+    def when(ts: Optional[float]) -> Optional[datetime]:
+        return None if ts is None else datetime.fromtimestamp(ts, tz=timezone.utc)
+
+    return TryOnJob(
+        job_id=job["job_id"],
+        status=job["status"],
+        fashion_item_id=job["fashion_item_id"],
+        preferences=job["preferences"],
+        created_at=when(job["created_at"]),
+        started_at=when(job["started_at"]),
+        finished_at=when(job["finished_at"]),
+        expires_at=when(job["expires_at"]),
+        result_url=f"/tryon/jobs/{job['job_id']}/result" if job["status"] == SUCCEEDED else None,
+        error=job["error"],
+    ).model_dump(mode="json")
+
+async def _get_tryon(job_id: str) -> Dict[str, Any]:
+    job = await run_in_threadpool(tryon_store.get, job_id)
+    if job is None:
+        raise HTTPException(status_code=404, detail="Try-on job not found")
+    return job
+
+@app.get("/tryon/jobs/{job_id}")
+async def get_tryon(job_id: str):
+    return _tryon_view(await _get_tryon(job_id))
+
+@app.get("/tryon/jobs/{job_id}/events")
+async def tryon_events(job_id: str, request: Request):
+    """Server-sent ``status`` events until the job reaches a terminal state."""
+    job = await _get_tryon(job_id)
+
+    async def events():
+        loop = asyncio.get_running_loop()
+        current, last_status, last_sent = job, None, loop.time()
+        while current is not None:
+            if current["status"] != last_status:
+                last_status, last_sent = current["status"], loop.time()
+                yield f"event: status\ndata: {json.dumps(_tryon_view(current))}\n\n"
+                if last_status in TERMINAL_STATUSES:
+                    break
+            elif loop.time() - last_sent >= TRYON_EVENTS_KEEPALIVE:
+                last_sent = loop.time()
+                yield ": keep-alive\n\n"
+            if await request.is_disconnected():
+                break
+            await tryon_pool.wait_for_change(tryon_pool.poll_interval)
+            current = await run_in_threadpool(tryon_store.get, job_id)
+
+    return StreamingResponse(
+        events(),
+        media_type="text/event-stream",
+        headers={"Cache-Control": "no-cache", "X-Accel-Buffering": "no"},
+    )
+
+@app.get("/tryon/jobs/{job_id}/result")
+async def get_tryon_result(job_id: str):
+    job = await _get_tryon(job_id)
+    if job["status"] == EXPIRED:
+        return JSONResponse({"error": "Try-on result has expired"}, status_code=410)
+    if job["status"] != SUCCEEDED:
+        return JSONResponse({"error": f"Try-on job is {job['status']}"}, status_code=409)
+    if not os.path.isfile(job["result_path"]):
+        return JSONResponse({"error": "Try-on result has expired"}, status_code=410)
+    # Each job renders once, so its id is a strong validator
+    return FileResponse(job["result_path"], media_type="image/png", headers={"ETag": f'"{job_id}"'})
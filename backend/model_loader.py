@@ -0,0 +1,79 @@
+import logging
+import threading
+import time
+from typing import Any, Callable, Dict, Generic, Optional, TypeVar
+
+logger = logging.getLogger(__name__)
+
+T = TypeVar("T")
+
+
+class ModelLoader(Generic[T]):
+    """Loads a model once, either inline or on a background thread.
+
+    The app can start serving immediately and report readiness separately;
+    callers check ``ready`` before using ``value``.
+    """
+
+    def __init__(self, load: Callable[[], T], name: str = "model"):
+        self._load = load
+        self.name = name
+        self._value: Optional[T] = None
+        self._error: Optional[BaseException] = None
+        self._lock = threading.Lock()
+        self._thread: Optional[threading.Thread] = None
+        self._load_seconds: Optional[float] = None
+
+    @property
+    def ready(self) -> bool:
+        return self._value is not None
+
+    @property
+    def value(self) -> T:
+        if self._value is None:
+            raise RuntimeError(f"{self.name} is not loaded yet")
+        return self._value
+
+    def load(self) -> T:
+        """Load synchronously (no-op if already loaded)."""
+        with self._lock:
+            if self._value is None:
+                started = time.perf_counter()
+                try:
+                    self._value = self._load()
+                    self._error = None
+                except BaseException as e:
+                    self._error = e
+                    logger.error(f"Error loading {self.name}: {e}")
+                    raise
+                self._load_seconds = time.perf_counter() - started
+                logger.info(f"Loaded {self.name} in {self._load_seconds:.1f}s")
+        return self._value
+
+    def start_background_load(self) -> None:
+        """Start warm-up on a daemon thread unless loading already started."""
+        if self.ready or (self._thread is not None and self._thread.is_alive()):
+            return
+
+        def run():
+            try:
+                self.load()
+            except BaseException:
+                pass  # Recorded in self._error and surfaced by status()
+
+        self._thread = threading.Thread(target=run, name=f"{self.name}-loader", daemon=True)
+        self._thread.start()
+
+    def status(self) -> Dict[str, Any]:
+        if self.ready:
+            state = "ready"
+        elif self._error is not None:
+            state = "failed"
+        else:
+            state = "loading"
+        status = {"model": self.name, "state": state}
+        if self._load_seconds is not None:
+            status["load_seconds"] = round(self._load_seconds, 2)
+        if self._error is not None:
+            status["error"] = str(self._error)
+        return status
@@ -0,0 +1,106 @@
+import json
+import logging
+import os
+import sqlite3
+import threading
+from collections import OrderedDict
+from typing import Any, Dict, Optional
+
+logger = logging.getLogger(__name__)
+
+
+class ClassificationCache:
+    """Two-tier cache of classification results keyed by image content hash.
+
+    Recent results live in a size-bounded in-memory LRU. Every result is also
+    written to a SQLite file so it survives restarts; a memory miss that hits
+    on disk is promoted back into the LRU.
+    """
+
+    def __init__(self, db_path: str, max_entries: int = 10000):
+        self.max_entries = max_entries
+        self._memory: "OrderedDict[str, Dict[str, Any]]" = OrderedDict()
+        self.db_path = db_path
+        self._lock = threading.Lock()
+        self._connection: Optional[sqlite3.Connection] = None
+        self._pid: Optional[int] = None
+        self.hits = 0
+        self.disk_hits = 0
+        self.misses = 0
+        self.evictions = 0
+
+    @property
+    def _conn(self) -> sqlite3.Connection:
+        # Opened lazily per process (callers hold self._lock), so a preloading
+        # gunicorn master doesn't share its connection with forked workers
+        if self._connection is None or self._pid != os.getpid():
+            conn = sqlite3.connect(self.db_path, check_same_thread=False)
+            conn.execute(
+                "CREATE TABLE IF NOT EXISTS results (content_hash TEXT PRIMARY KEY, result TEXT NOT NULL)"
+            )
+            conn.commit()
+            self._connection, self._pid = conn, os.getpid()
+        return self._connection
+
+    def get(self, content_hash: str) -> Optional[Dict[str, Any]]:
+        """Return the cached result for a content hash, if any."""
+        with self._lock:
+            result = self._memory.get(content_hash)
+            if result is not None:
+                self._memory.move_to_end(content_hash)
+                self.hits += 1
+                return result
+            try:
+                row = self._conn.execute(
+                    "SELECT result FROM results WHERE content_hash = ?", (content_hash,)
+                ).fetchone()
+            except sqlite3.Error as e:
+                logger.error(f"Error reading classification cache: {e}")
+                row = None
+            if row is None:
+                self.misses += 1
+                return None
+            result = json.loads(row[0])
+            self._remember(content_hash, result)
+            self.disk_hits += 1
+            return result
+
+    def put(self, content_hash: str, result: Dict[str, Any]) -> None:
+        """Store a result in memory and on disk."""
+        with self._lock:
+            self._remember(content_hash, result)
+            try:
+                self._conn.execute(
+                    "INSERT OR REPLACE INTO results (content_hash, result) VALUES (?, ?)",
+                    (content_hash, json.dumps(result)),
+                )
+                self._conn.commit()
+            except sqlite3.Error as e:
+                logger.error(f"Error writing classification cache: {e}")
+
+    def _remember(self, content_hash: str, result: Dict[str, Any]) -> None:
+        self._memory[content_hash] = result
+        self._memory.move_to_end(content_hash)
+        while len(self._memory) > self.max_entries:
+            self._memory.popitem(last=False)
+            self.evictions += 1
+
+    def stats(self) -> Dict[str, Any]:
+        """Return hit/miss/eviction counters."""
+        with self._lock:
+            lookups = self.hits + self.disk_hits + self.misses
+            return {
+                "entries": len(self._memory),
+                "max_entries": self.max_entries,
+                "hits": self.hits,
+                "disk_hits": self.disk_hits,
+                "misses": self.misses,
+                "evictions": self.evictions,
+                "hit_rate": (self.hits + self.disk_hits) / lookups if lookups else 0.0,
+            }
+
+    def close(self) -> None:
+        with self._lock:
+            if self._connection is not None and self._pid == os.getpid():
+                self._connection.close()
+            self._connection = None
@@ -0,0 +1,466 @@
+import asyncio
+import json
+import logging
+import multiprocessing
+import os
+import shutil
+import sqlite3
+import threading
+import time
+import uuid
+import weakref
+from concurrent.futures import ProcessPoolExecutor
+from concurrent.futures.process import BrokenProcessPool
+from typing import Any, Dict, Iterable, List, Optional, Set
+
+from PIL import Image
+
+from core.metrics import timed
+
+from backend.tryon_render import Renderer, load_renderer
+
+logger = logging.getLogger(__name__)
+
+QUEUED = "queued"
+RUNNING = "running"
+SUCCEEDED = "succeeded"
+FAILED = "failed"
+EXPIRED = "expired"
+TERMINAL_STATUSES = frozenset({SUCCEEDED, FAILED, EXPIRED})
+
+COLUMNS = (
+    "job_id", "status", "fashion_item_id", "preferences", "person_path", "garment_path",
+    "result_path", "error", "created_at", "started_at", "finished_at", "expires_at",
+)
+
+
+class TryOnJobStore:
+    """Persistent try-on job queue in a SQLite file.
+
+    Jobs are claimed oldest-first inside an ``IMMEDIATE`` transaction, so
+    several API processes can share one file without two of them rendering
+    the same job. Times are stored as epoch seconds.
+    """
+
+    def __init__(self, db_path: str, result_ttl_seconds: float = 3600):
+        self.db_path = db_path
+        self.result_ttl = result_ttl_seconds
+        self._lock = threading.Lock()
+        self._connection: Optional[sqlite3.Connection] = None
+        self._pid: Optional[int] = None
+
+    @property
+    def _conn(self) -> sqlite3.Connection:
+        # Opened on first use in each process (callers hold self._lock), so
+        # a gunicorn master that imports the app before forking never hands
+        # its connection to the workers
+        if self._connection is None or self._pid != os.getpid():
+            conn = sqlite3.connect(self.db_path, check_same_thread=False, isolation_level=None)
+            conn.row_factory = sqlite3.Row
+            conn.execute("PRAGMA journal_mode=WAL")
+            conn.execute("PRAGMA busy_timeout=5000")
+            conn.execute(
+                "CREATE TABLE IF NOT EXISTS jobs ("
+                "job_id TEXT PRIMARY KEY, status TEXT NOT NULL, fashion_item_id TEXT NOT NULL, "
+                "preferences TEXT NOT NULL, person_path TEXT NOT NULL, garment_path TEXT NOT NULL, "
+                "result_path TEXT, error TEXT, created_at REAL NOT NULL, started_at REAL, "
+                "finished_at REAL, expires_at REAL)"
+            )
+            conn.execute("CREATE INDEX IF NOT EXISTS jobs_status ON jobs (status, created_at)")
+            self._connection, self._pid = conn, os.getpid()
+        return self._connection
+
+    def create(
+        self,
+        job_id: str,
+        fashion_item_id: str,
+        preferences: Dict[str, Any],
+        person_path: str,
+        garment_path: str,
+    ) -> Dict[str, Any]:
+        """Queue a new job whose input images are already on disk."""
+        with self._lock:
+            self._conn.execute(
+                "INSERT INTO jobs (job_id, status, fashion_item_id, preferences, person_path, "
+                "garment_path, created_at) VALUES (?, ?, ?, ?, ?, ?, ?)",
+                (job_id, QUEUED, fashion_item_id, json.dumps(preferences), person_path,
+                 garment_path, time.time()),
+            )
+        return self.get(job_id)
+
+    def claim(self) -> Optional[Dict[str, Any]]:
+        """Mark the oldest queued job as running and return it, if there is one."""
+        with self._lock:
+            self._conn.execute("BEGIN IMMEDIATE")
+            try:
+                row = self._conn.execute(
+                    "SELECT job_id FROM jobs WHERE status = ? ORDER BY created_at LIMIT 1", (QUEUED,)
+                ).fetchone()
+                if row is not None:
+                    self._conn.execute(
+                        "UPDATE jobs SET status = ?, started_at = ? WHERE job_id = ?",
+                        (RUNNING, time.time(), row["job_id"]),
+                    )
+                self._conn.execute("COMMIT")
+            except BaseException:
+                self._conn.execute("ROLLBACK")
+                raise
+        return None if row is None else self.get(row["job_id"])
+
+    def finish(self, job_id: str, result_path: str) -> None:
+        self._complete(job_id, SUCCEEDED, result_path, None)
+
+    def fail(self, job_id: str, error: str) -> None:
+        self._complete(job_id, FAILED, None, error)
+
+    def _complete(self, job_id: str, status: str, result_path: Optional[str], error: Optional[str]) -> None:
+        # The first render to finish wins if a stale job was requeued and rendered twice
+        now = time.time()
+        with self._lock:
+            self._conn.execute(
+                "UPDATE jobs SET status = ?, result_path = ?, error = ?, finished_at = ?, expires_at = ? "
+                "WHERE job_id = ? AND status = ?",
+                (status, result_path, error, now, now + self.result_ttl, job_id, RUNNING),
+            )
+
+    def get(self, job_id: str) -> Optional[Dict[str, Any]]:
+        """Return a job as a dict, with ``preferences`` decoded."""
+        with self._lock:
+            row = self._conn.execute(
+                f"SELECT {', '.join(COLUMNS)} FROM jobs WHERE job_id = ?", (job_id,)
+            ).fetchone()
+        if row is None:
+            return None
+        job = dict(row)
+        job["preferences"] = json.loads(job["preferences"])
+        return job
+
+    def requeue_stale(self, started_before: float, exclude: Iterable[str] = ()) -> int:
+        """Put jobs that have been running since before ``started_before`` back in the queue.
+
+        Recovers jobs whose process crashed or restarted mid-render. Other
+        processes sharing the store may still be rendering younger jobs, so
+        those are left alone, as are the ``exclude`` ids the caller is still
+        rendering itself.
+        """
+        exclude = list(exclude)
+        placeholders = ",".join("?" * len(exclude))
+        with self._lock:
+            cursor = self._conn.execute(
+                "UPDATE jobs SET status = ?, started_at = NULL WHERE status = ? AND started_at < ?"
+                + (f" AND job_id NOT IN ({placeholders})" if exclude else ""),
+                (QUEUED, RUNNING, started_before, *exclude),
+            )
+        return cursor.rowcount
+
+    def requeue(self, job_id: str) -> None:
+        """Put a running job back in the queue, e.g. after its worker was restarted."""
+        with self._lock:
+            self._conn.execute(
+                "UPDATE jobs SET status = ?, started_at = NULL WHERE job_id = ? AND status = ?",
+                (QUEUED, job_id, RUNNING),
+            )
+
+    def count(self, status: str) -> int:
+        with self._lock:
+            return self._conn.execute("SELECT COUNT(*) FROM jobs WHERE status = ?", (status,)).fetchone()[0]
+
+    def expire(self, now: Optional[float] = None) -> List[str]:
+        """Expire finished jobs past their TTL and return the result files to delete.
+
+        Expired rows are kept for one more TTL so clients polling a stale job
+        get a clear "expired" rather than "not found", then removed.
+        """
+        now = time.time() if now is None else now
+        with self._lock:
+            self._conn.execute("BEGIN IMMEDIATE")
+            try:
+                rows = self._conn.execute(
+                    "SELECT result_path FROM jobs WHERE status IN (?, ?) AND expires_at <= ?",
+                    (SUCCEEDED, FAILED, now),
+                ).fetchall()
+                self._conn.execute(
+                    "UPDATE jobs SET status = ?, result_path = NULL WHERE status IN (?, ?) AND expires_at <= ?",
+                    (EXPIRED, SUCCEEDED, FAILED, now),
+                )
+                self._conn.execute(
+                    "DELETE FROM jobs WHERE status = ? AND expires_at <= ?", (EXPIRED, now - self.result_ttl)
+                )
+                self._conn.execute("COMMIT")
+            except BaseException:
+                self._conn.execute("ROLLBACK")
+                raise
+        return [row["result_path"] for row in rows if row["result_path"]]
+
+    def close(self) -> None:
+        with self._lock:
+            if self._connection is not None and self._pid == os.getpid():
+                self._connection.close()
+            self._connection = None
+
+
+_renderer: Optional[Renderer] = None
+
+
+def _init_worker(renderer_spec: str, nice: int) -> None:
+    """Runs once in each worker process."""
+    global _renderer
+    if nice and hasattr(os, "nice"):
+        # Keep rendering from competing with the API process for CPU
+        os.nice(nice)
+    _renderer = load_renderer(renderer_spec)
+
+
+def render_job(person_path: str, garment_path: str, preferences: Dict[str, Any], output_path: str) -> str:
+    """Render one try-on in a worker process and write it to ``output_path``."""
+    with Image.open(person_path) as person, Image.open(garment_path) as garment:
+        result = _renderer(person, garment, preferences)
+    tmp_path = f"{output_path}.part"
+    result.save(tmp_path, format="PNG")
+    os.replace(tmp_path, output_path)
+    return output_path
+
+
+class TryOnWorkerPool:
+    """Renders queued try-on jobs in a pool of worker processes.
+
+    A dispatcher task on the event loop claims jobs from the store while a
+    worker is free and hands them to a ``ProcessPoolExecutor``, so rendering
+    never holds the GIL or a threadpool slot in the API process and request
+    latency doesn't depend on how many jobs are in flight. Workers are
+    started with ``spawn`` so they don't inherit the API's model weights or
+    sockets. A render that exceeds ``job_timeout_seconds`` fails and its
+    worker pool is restarted (jobs caught in the restart are requeued), and
+    a pool broken by a crashed worker is rebuilt. A sweeper deletes results
+    once their TTL passes.
+    """
+
+    def __init__(
+        self,
+        store: TryOnJobStore,
+        job_dir: str,
+        renderer: str = "backend.tryon_render:composite",
+        workers: int = 2,
+        worker_nice: int = 10,
+        job_timeout_seconds: float = 300,
+        poll_interval: float = 1.0,
+    ):
+        if workers < 1:
+            raise ValueError("workers must be at least 1")
+        self.store = store
+        self.input_dir = os.path.join(job_dir, "inputs")
+        self.result_dir = os.path.join(job_dir, "results")
+        os.makedirs(self.input_dir, exist_ok=True)
+        os.makedirs(self.result_dir, exist_ok=True)
+        self.renderer = renderer
+        self.workers = workers
+        self.worker_nice = worker_nice
+        self.job_timeout = job_timeout_seconds
+        self.poll_interval = poll_interval
+        self._executor: Optional[ProcessPoolExecutor] = None
+        self._dispatcher: Optional[asyncio.Task] = None
+        self._sweeper: Optional[asyncio.Task] = None
+        self._running: Set[asyncio.Task] = set()
+        # Ids of the jobs this process is rendering, which the sweeper must not requeue
+        self._rendering: Set[str] = set()
+        # Pools shut down on purpose; their in-flight jobs are requeued, not failed
+        self._retired: "weakref.WeakSet[ProcessPoolExecutor]" = weakref.WeakSet()
+        self._wakeup: Optional[asyncio.Event] = None
+        self._changed: Optional[asyncio.Condition] = None
+        self.completed = 0
+        self.failed = 0
+        self.expired = 0
+
+    def input_path(self, job_id: str, name: str) -> str:
+        """Where an uploaded input for ``job_id`` is stored; the directory is created."""
+        path = os.path.join(self.input_dir, job_id)
+        os.makedirs(path, exist_ok=True)
+        return os.path.join(path, name)
+
+    def start(self) -> None:
+        """Start the workers, dispatcher and sweeper on the running event loop."""
+        if self._dispatcher is not None:
+            return
+        self._executor = self._new_executor()
+        self._wakeup = asyncio.Event()
+        self._changed = asyncio.Condition()
+        self._dispatcher = asyncio.create_task(self._dispatch())
+        self._sweeper = asyncio.create_task(self._sweep())
+
+    async def stop(self) -> None:
+        """Stop dispatching and shut the workers down.
+
+        Jobs still rendering are left ``running`` in the store and requeued
+        once they are older than ``job_timeout_seconds``.
+        """
+        if self._dispatcher is None:
+            return
+        for task in (self._dispatcher, self._sweeper, *self._running):
+            task.cancel()
+        await asyncio.gather(self._dispatcher, self._sweeper, *self._running, return_exceptions=True)
+        self._dispatcher = self._sweeper = None
+        self._running.clear()
+        executor, self._executor = self._executor, None
+        await asyncio.to_thread(executor.shutdown, wait=True, cancel_futures=True)
+
+    def _new_executor(self) -> ProcessPoolExecutor:
+        return ProcessPoolExecutor(
+            max_workers=self.workers,
+            mp_context=multiprocessing.get_context("spawn"),
+            initializer=_init_worker,
+            initargs=(self.renderer, self.worker_nice),
+        )
+
+    async def _replace_executor(self, executor: ProcessPoolExecutor, kill: bool) -> None:
+        """Swap in a fresh pool for ``executor``, killing its workers if ``kill``."""
+        if executor is not self._executor:
+            # Another render already replaced it
+            return
+        self._executor = self._new_executor()
+        if kill:
+            self._retired.add(executor)
+            # A running task can't be cancelled, only its process stopped
+            for process in list((getattr(executor, "_processes", None) or {}).values()):
+                process.terminate()
+        await asyncio.to_thread(executor.shutdown, wait=False, cancel_futures=True)
+
+    def notify_submitted(self) -> None:
+        """Wake the dispatcher after a job has been queued."""
+        if self._wakeup is not None:
+            self._wakeup.set()
+
+    async def wait_for_change(self, timeout: float) -> bool:
+        """Wait until a job handled by this process changes state.
+
+        Returns ``False`` on timeout; jobs rendered by another process sharing
+        the store don't wake this, so callers re-read the job either way.
+        """
+        if self._changed is None:
+            await asyncio.sleep(timeout)
+            return False
+        async with self._changed:
+            try:
+                await asyncio.wait_for(self._changed.wait(), timeout)
+                return True
+            except asyncio.TimeoutError:
+                return False
+
+    async def _notify_changed(self) -> None:
+        async with self._changed:
+            self._changed.notify_all()
+
+    async def _dispatch(self) -> None:
+        while True:
+            while len(self._running) < self.workers:
+                try:
+                    job = await asyncio.to_thread(self.store.claim)
+                except sqlite3.Error as e:
+                    logger.error(f"Error claiming try-on job: {e}")
+                    break
+                if job is None:
+                    break
+                task = asyncio.create_task(self._render(job))
+                self._running.add(task)
+                task.add_done_callback(self._render_done)
+                await self._notify_changed()
+            # Also poll, for jobs queued by other processes sharing the store
+            try:
+                await asyncio.wait_for(self._wakeup.wait(), self.poll_interval)
+            except asyncio.TimeoutError:
+                pass
+            self._wakeup.clear()
+
+    def _render_done(self, task: asyncio.Task) -> None:
+        self._running.discard(task)
+        if self._wakeup is not None:
+            self._wakeup.set()
+
+    async def _render(self, job: Dict[str, Any]) -> None:
+        job_id = job["job_id"]
+        output_path = os.path.join(self.result_dir, f"{job_id}.png")
+        loop = asyncio.get_running_loop()
+        executor = self._executor
+        self._rendering.add(job_id)
+        try:
+            with timed("tryon_render"):
+                await asyncio.wait_for(
+                    loop.run_in_executor(
+                        executor, render_job,
+                        job["person_path"], job["garment_path"], job["preferences"], output_path,
+                    ),
+                    self.job_timeout,
+                )
+        except asyncio.CancelledError:
+            raise
+        except asyncio.TimeoutError:
+            logger.error(f"Try-on job {job_id} timed out after {self.job_timeout}s; restarting workers")
+            await self._replace_executor(executor, kill=True)
+            await asyncio.to_thread(self.store.fail, job_id, f"Timed out after {self.job_timeout}s")
+            self.failed += 1
+        except BrokenProcessPool as e:
+            if executor in self._retired:
+                # Collateral of another job's timeout; render it again
+                await asyncio.to_thread(self.store.requeue, job_id)
+                self.notify_submitted()
+                await self._notify_changed()
+                return
+            logger.error(f"Try-on worker died rendering job {job_id}; rebuilding the pool")
+            await self._replace_executor(executor, kill=False)
+            await asyncio.to_thread(self.store.fail, job_id, f"Render worker crashed: {e}")
+            self.failed += 1
+        except Exception as e:
+            logger.error(f"Try-on job {job_id} failed: {e}")
+            await asyncio.to_thread(self.store.fail, job_id, f"{type(e).__name__}: {e}")
+            self.failed += 1
+        else:
+            await asyncio.to_thread(self.store.finish, job_id, output_path)
+            self.completed += 1
+        finally:
+            self._rendering.discard(job_id)
+        # Inputs are only needed for rendering
+        await asyncio.to_thread(shutil.rmtree, os.path.join(self.input_dir, job_id), True)
+        await self._notify_changed()
+
+    async def _sweep(self) -> None:
+        interval = min(max(self.store.result_ttl / 4, 1.0), 60.0)
+        while True:
+            try:
+                requeued = await asyncio.to_thread(
+                    self.store.requeue_stale, time.time() - self.job_timeout, list(self._rendering)
+                )
+                paths = await asyncio.to_thread(self.store.expire)
+            except sqlite3.Error as e:
+                logger.error(f"Error sweeping try-on jobs: {e}")
+                requeued, paths = 0, []
+            if requeued:
+                logger.warning(f"Requeued {requeued} try-on jobs running for over {self.job_timeout}s")
+                self.notify_submitted()
+            for path in paths:
+                await asyncio.to_thread(_remove_quietly, path)
+            if paths:
+                self.expired += len(paths)
+                await self._notify_changed()
+            await asyncio.sleep(interval)
+
+    def stats(self) -> Dict[str, Any]:
+        """Return queue depth and worker utilization."""
+        return {
+            "running": self._dispatcher is not None,
+            "workers": self.workers,
+            "busy_workers": len(self._running),
+            "queued": self.store.count(QUEUED),
+            "completed": self.completed,
+            "failed": self.failed,
+            "expired": self.expired,
+        }
+
+
+def new_job_id() -> str:
+    return uuid.uuid4().hex
+
+
+def _remove_quietly(path: str) -> None:
+    try:
+        os.remove(path)
+    except FileNotFoundError:
+        pass
@@ -0,0 +1,49 @@
+import importlib
+from typing import Any, Callable, Dict
+
+from PIL import Image, ImageOps
+
+# Longest side of a rendered try-on, in pixels
+MAX_RENDER_SIZE = 1024
+
+Renderer = Callable[[Image.Image, Image.Image, Dict[str, Any]], Image.Image]
+
+
+def composite(person: Image.Image, garment: Image.Image, preferences: Dict[str, Any]) -> Image.Image:
+    """Overlay the garment on the upper body of the person photo.
+
+    A placeholder until a real try-on model is wired in through
+    ``TRYON_RENDERER``: the garment is scaled to ``preferences["scale"]``
+    (default 0.55) of the person's width and centred over the torso, with
+    near-white backgrounds knocked out so product shots sit cleanly.
+    """
+    person = ImageOps.exif_transpose(person).convert("RGBA")
+    person.thumbnail((MAX_RENDER_SIZE, MAX_RENDER_SIZE), Image.LANCZOS)
+    garment = ImageOps.exif_transpose(garment).convert("RGBA")
+
+    scale = min(max(float(preferences.get("scale", 0.55)), 0.1), 1.0)
+    width = max(1, int(person.width * scale))
+    height = max(1, int(garment.height * width / garment.width))
+    garment = garment.resize((width, height), Image.LANCZOS)
+
+    # Treat near-white pixels as background when the garment has no alpha of its own
+    alpha = garment.getchannel("A")
+    if alpha.getextrema() == (255, 255):
+        alpha = garment.convert("L").point(lambda v: 0 if v > 240 else 255)
+        garment.putalpha(alpha)
+
+    x = (person.width - width) // 2
+    y = int(person.height * 0.22)
+    person.alpha_composite(garment, (x, max(0, min(y, person.height - 1))))
+    return person.convert("RGB")
+
+
+def load_renderer(spec: str) -> Renderer:
+    """Resolve a ``module:function`` spec such as ``backend.tryon_render:composite``."""
+    module_name, _, attr = spec.partition(":")
+    if not module_name or not attr:
+        raise ValueError(f"Renderer must be given as module:function, got {spec!r}")
+    renderer = getattr(importlib.import_module(module_name), attr)
+    if not callable(renderer):
+        raise ValueError(f"{spec} is not callable")
+    return renderer
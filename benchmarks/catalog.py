@@ -0,0 +1,100 @@
+"""Synthetic, reproducible fashion catalogs for benchmarks.
+
+Items are generated lazily from a seed, so a 1M-item catalog never has to
+be held as models at once. Vectors are drawn around per-category/color
+centroids rather than uniformly, so nearest-neighbour and approximate
+index results behave like a real catalog with clusters.
+"""
+import random
+from typing import Any, Dict, Iterator, List, Tuple
+
+import numpy as np
+
+from core.models import Category, FashionItem
+
+SCALES = {"10k": 10_000, "100k": 100_000, "1M": 1_000_000}
+
+CATEGORIES = [category.value for category in Category]
+BRANDS = ["Levi's", "Carhartt", "Champion", "Dickies", "Nike", "Patagonia", "Adidas", "Uniqlo", "Zara", "Gap"]
+COLORS = ["black", "white", "grey", "navy", "olive", "red", "cream", "brown", "blue", "green"]
+MATERIALS = ["denim", "cotton", "wool", "leather", "linen", "nylon", "fleece", "corduroy"]
+FITS = ["slim", "regular", "relaxed", "oversized"]
+STYLE_WORDS = ["vintage", "streetwear", "workwear", "minimalist", "classic", "sporty", "bohemian", "hip hop", "punk"]
+NOUNS = {
+    "shirt": ["tee", "oxford", "flannel", "polo", "henley"],
+    "pants": ["jeans", "chinos", "cargos", "trousers", "joggers"],
+    "dress": ["slip dress", "shirt dress", "maxi dress", "wrap dress"],
+    "jacket": ["trucker jacket", "bomber", "parka", "blazer", "chore coat"],
+    "shoes": ["sneakers", "boots", "loafers", "derbies"],
+    "accessories": ["cap", "tote", "belt", "scarf", "beanie"],
+}
+
+
+def scale_to_count(scale: str) -> int:
+    """Parse ``10k``/``100k``/``1M`` (or a plain integer)."""
+    return SCALES[scale] if scale in SCALES else int(scale)
+
+
+def generate_documents(count: int, seed: int = 0) -> Iterator[Dict[str, Any]]:
+    """Yield Elasticsearch-shaped item documents."""
+    rng = random.Random(seed)
+    for i in range(count):
+        category = rng.choice(CATEGORIES)
+        color = rng.choice(COLORS)
+        style = rng.choice(STYLE_WORDS)
+        material = rng.choice(MATERIALS)
+        name = f"{color.title()} {style} {material} {rng.choice(NOUNS[category])}"
+        yield {
+            "id": f"item-{i}",
+            "name": name,
+            "description": f"A {rng.choice(FITS)} fit {material} piece with a {style} feel.",
+            "category": category,
+            "brand": rng.choice(BRANDS),
+            "color": color,
+            "size": rng.choice(["XS", "S", "M", "L", "XL"]),
+            "price": round(rng.lognormvariate(4.0, 0.6), 2),
+            "styles": [style],
+            "attributes": {"color": color, "material": material, "fit": rng.choice(FITS)},
+            "image_url": f"https://images.example.com/items/{i}.jpg",
+        }
+
+
+def generate_catalog(count: int, seed: int = 0) -> Iterator[FashionItem]:
+    """Yield validated ``FashionItem`` models."""
+    for document in generate_documents(count, seed):
+        yield FashionItem.model_validate(document)
+
+
+def generate_vectors(
+    documents: List[Dict[str, Any]],
+    dimension: int,
+    seed: int = 0,
+    noise: float = 0.35
+) -> np.ndarray:
+    """Unit vectors clustered by (category, color), one row per document."""
+    rng = np.random.default_rng(seed)
+    centroids: Dict[Tuple[str, str], np.ndarray] = {}
+    for category in CATEGORIES:
+        for color in COLORS:
+            centroids[(category, color)] = rng.standard_normal(dimension).astype(np.float32)
+    vectors = np.empty((len(documents), dimension), dtype=np.float32)
+    for row, document in enumerate(documents):
+        vectors[row] = centroids[(document["category"], document["color"])]
+    vectors += noise * rng.standard_normal(vectors.shape).astype(np.float32)
+    vectors /= np.linalg.norm(vectors, axis=1, keepdims=True)
+    return vectors
+
+
+def vector_records(documents: List[Dict[str, Any]], vectors: np.ndarray) -> Iterator[Dict[str, Any]]:
+    """Pair documents with vectors in the upsert shape the vector store expects."""
+    for document, vector in zip(documents, vectors):
+        yield {
+            "id": document["id"],
+            "values": vector,
+            "metadata": {
+                "category": document["category"],
+                "brand": document["brand"],
+                "price": document["price"],
+                "name": document["name"],
+            },
+        }
@@ -0,0 +1,81 @@
+"""Compare per-item indexing against bulk indexing on a live Elasticsearch.
+
+Usage:
+    python benchmarks/es_bulk.py --single 500 --bulk 20000
+
+Writes to a throwaway index (deleted afterwards) and prints docs/sec for
+both paths as JSON.
+"""
+import argparse
+import json
+import os
+import random
+import sys
+import time
+sys.path.append(os.path.abspath(os.path.join(os.path.dirname(__file__), '..')))
+
+from infrastructure.elasticsearch_client import ElasticsearchClient
+
+CATEGORIES = ["shirt", "pants", "dress", "jacket", "shoes", "accessories"]
+BRANDS = ["Levi's", "Carhartt", "Champion", "Dickies", "Nike", "Patagonia"]
+COLORS = ["black", "white", "grey", "navy", "olive", "red"]
+
+
+def synthetic_items(count: int, prefix: str):
+    rng = random.Random(0)
+    for i in range(count):
+        yield {
+            "id": f"{prefix}-{i}",
+            "name": f"{rng.choice(COLORS)} {rng.choice(CATEGORIES)} {i}",
+            "description": "Synthetic benchmark item",
+            "styles": [],
+            "brand": rng.choice(BRANDS),
+            "category": rng.choice(CATEGORIES),
+            "size": rng.choice(["S", "M", "L", "XL"]),
+            "color": rng.choice(COLORS),
+            "price": round(rng.uniform(10, 300), 2),
+            "image_url": f"https://example.com/{prefix}/{i}.jpg",
+        }
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument("--single", type=int, default=500, help="documents for the per-item path")
+    parser.add_argument("--bulk", type=int, default=20000, help="documents for the bulk path")
+    parser.add_argument("--chunk-size", type=int, default=500)
+    parser.add_argument("--threads", type=int, default=4)
+    parser.add_argument("--index", default="fashion-items-benchmark")
+    args = parser.parse_args()
+
+    es = ElasticsearchClient(index_name=args.index)
+    es.client.indices.delete(index=args.index, ignore_unavailable=True)
+    es.create_index()
+    try:
+        started = time.perf_counter()
+        for item in synthetic_items(args.single, "single"):
+            es.index_item(item)
+        single_seconds = time.perf_counter() - started
+
+        report = es.bulk_index(
+            synthetic_items(args.bulk, "bulk"),
+            chunk_size=args.chunk_size,
+            thread_count=args.threads
+        )
+    finally:
+        es.client.indices.delete(index=args.index, ignore_unavailable=True)
+
+    single_rate = args.single / single_seconds if single_seconds else 0.0
+    print(json.dumps({
+        "per_item": {"docs": args.single, "seconds": round(single_seconds, 3), "docs_per_second": round(single_rate, 1)},
+        "bulk": {
+            "docs": report.indexed,
+            "failed": report.failed,
+            "seconds": round(report.elapsed_seconds, 3),
+            "docs_per_second": round(report.docs_per_second, 1),
+        },
+        "speedup": round(report.docs_per_second / single_rate, 1) if single_rate else None,
+    }, indent=2))
+
+
+if __name__ == "__main__":
+    main()
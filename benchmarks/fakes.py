@@ -0,0 +1,389 @@
+"""Local stand-ins for the hosted services, for offline benchmarks.
+
+Each fake reproduces the latency shape of the real dependency (a base
+delay with log-normal jitter, plus a throughput term where it matters) so
+concurrency, batching and caching behave as they would in production, but
+nothing leaves the process.
+"""
+import asyncio
+import hashlib
+import json
+import math
+import random
+import re
+import threading
+import time
+from collections import defaultdict
+from typing import Any, Dict, Iterable, List, Optional, Sequence, Tuple
+
+import numpy as np
+
+from backend.labels import CATEGORY_TO_ERA
+from infrastructure.elasticsearch_client import BulkIndexReport, DocumentError, ElasticsearchClient
+from infrastructure.search_cache import SearchCache
+
+STYLES = ["casual", "formal", "sporty", "bohemian", "minimalist", "street", "classic"]
+TOKEN_PATTERN = re.compile(r"[a-z0-9]+")
+
+
+class _Latency:
+    """Base delay with log-normal jitter; thread-safe."""
+
+    def __init__(self, seconds: float, jitter: float, seed: int):
+        self.seconds = seconds
+        self.jitter = jitter
+        self._rng = random.Random(seed)
+        self._lock = threading.Lock()
+
+    def sample(self) -> float:
+        if self.seconds <= 0:
+            return 0.0
+        with self._lock:
+            return self.seconds * self._rng.lognormvariate(0.0, self.jitter)
+
+    def sleep(self, extra: float = 0.0) -> None:
+        delay = self.sample() + extra
+        if delay > 0:
+            time.sleep(delay)
+
+
+class FakeLLM:
+    """Drop-in for the ``BaseLanguageModel`` calls the agents make.
+
+    Sleeps for a time-to-first-token plus output length at
+    ``tokens_per_second`` and answers in the JSON shape each agent's prompt
+    asks for, echoing the item ids it was given so the parsing paths run.
+    """
+
+    def __init__(
+        self,
+        latency: float = 0.4,
+        jitter: float = 0.3,
+        tokens_per_second: float = 60.0,
+        model_name: str = "fake-llm",
+        temperature: float = 0.0,
+        seed: int = 0
+    ):
+        self.model_name = model_name
+        self.temperature = temperature
+        self.tokens_per_second = tokens_per_second
+        self._latency = _Latency(latency, jitter, seed)
+        self._lock = threading.Lock()
+        self.calls = 0
+
+    def respond(self, prompt: str) -> str:
+        digest = int(hashlib.blake2b(prompt.encode(), digest_size=4).hexdigest(), 16)
+        if '"results"' in prompt:
+            ids = re.findall(r'"id": "([^"]+)"', prompt)
+            return json.dumps({"results": [
+                {"id": item_id, "styles": [STYLES[(digest + i) % len(STYLES)]], "confidence": 0.8}
+                for i, item_id in enumerate(ids)
+            ]})
+        if '"recommendations"' in prompt:
+            ids = re.findall(r'"item_id": "([^"]+)"', prompt)
+            return json.dumps({"recommendations": [
+                {"item_id": item_id, "reason": "Matches the user's style profile", "confidence": 0.9 - 0.05 * i}
+                for i, item_id in enumerate(ids[:5])
+            ]})
+        if '"styles"' in prompt:
+            styles = [STYLES[digest % len(STYLES)], STYLES[(digest + 3) % len(STYLES)]]
+            return json.dumps({"styles": styles, "confidence": 0.85})
+        return "That would pair well with dark denim and white sneakers for a relaxed, put-together look."
+
+    def predict(self, prompt: str) -> str:
+        response = self.respond(prompt)
+        self._latency.sleep(len(response) / 4 / self.tokens_per_second)
+        with self._lock:
+            self.calls += 1
+        return response
+
+    async def apredict(self, prompt: str) -> str:
+        return await asyncio.to_thread(self.predict, prompt)
+
+    async def astream(self, prompt: str):
+        """Yield the response word by word at ``tokens_per_second``."""
+        response = self.respond(prompt)
+        await asyncio.sleep(self._latency.sample())
+        for chunk in re.findall(r"\S+\s*", response):
+            await asyncio.sleep(len(chunk) / 4 / self.tokens_per_second)
+            yield chunk
+        with self._lock:
+            self.calls += 1
+
+
+class FakeEmbedder:
+    """Deterministic stand-in for ``ImageEmbedder``: vectors seeded by URL."""
+
+    def __init__(self, dimension: int, latency: float = 0.02, jitter: float = 0.2, seed: int = 0):
+        self.dimension = dimension
+        self._latency = _Latency(latency, jitter, seed)
+
+    def _vector(self, source: Any) -> np.ndarray:
+        key = source if isinstance(source, (str, bytes)) else repr(source)
+        key = key.encode() if isinstance(key, str) else key
+        rng = np.random.default_rng(int.from_bytes(hashlib.sha256(key).digest()[:8], "little"))
+        vector = rng.standard_normal(self.dimension).astype(np.float32)
+        return vector / np.linalg.norm(vector)
+
+    def embed_many(self, sources: Sequence[Any]) -> np.ndarray:
+        self._latency.sleep()
+        if not sources:
+            return np.zeros((0, self.dimension), dtype=np.float32)
+        return np.stack([self._vector(source) for source in sources])
+
+    def embed_each(self, sources: Sequence[Any]) -> List[np.ndarray]:
+        return list(self.embed_many(sources))
+
+    def embed_url(self, url: str) -> np.ndarray:
+        return self.embed_many([url])[0]
+
+    async def aembed_url(self, url: str) -> np.ndarray:
+        await asyncio.sleep(self._latency.sample())
+        return self._vector(url)
+
+    def fetch(self, url: str) -> bytes:
+        # Stands in for the image download; the "bytes" are the URL itself
+        return url.encode()
+
+    async def afetch(self, url: str) -> bytes:
+        return url.encode()
+
+
+class FakeClassifier:
+    """Stand-in for ``backend.classifier.FashionClassifier``.
+
+    Batch latency is ``batch_latency + per_image * len(images)``, the usual
+    shape of a CPU forward pass, so micro-batching gains show up.
+    """
+
+    def __init__(self, batch_latency: float = 0.03, per_image: float = 0.01, seed: int = 0):
+        self.batch_latency = batch_latency
+        self.per_image = per_image
+        self.labels = sorted(CATEGORY_TO_ERA)
+        self._rng = random.Random(seed)
+
+    def input_size(self) -> Tuple[int, int]:
+        return 224, 224
+
+    def classify_batch(self, images: List[Any]) -> List[Tuple[str, float]]:
+        time.sleep(self.batch_latency + self.per_image * len(images))
+        return [(self._rng.choice(self.labels), 0.9) for _ in images]
+
+
+class InMemoryElasticsearch(ElasticsearchClient):
+    """``ElasticsearchClient`` backed by an in-process inverted index.
+
+    Supports the query shapes this repo sends: ``match_all``, ``match`` and
+    ``multi_match`` scored with a BM25-like idf sum, inside ``bool`` with
+    ``term``/``terms``/``range`` filters, plus ``size``/``from``, ``_source``
+    lists and ``terms`` aggregations. Each search sleeps for ``latency`` to
+    stand in for the network round trip; the real client's result cache sits
+    in front of it.
+    """
+
+    TEXT_FIELDS = ("name", "description", "brand", "category")
+
+    def __init__(self, index_name: str = "fashion-items", latency: float = 0.005, jitter: float = 0.3, seed: int = 0):
+        # Deliberately no super().__init__(): there is no cluster to connect to
+        self.index_name = index_name
+        self._latency = _Latency(latency, jitter, seed)
+        self.cache = SearchCache()
+        self._lock = threading.RLock()
+        self._docs: List[Dict[str, Any]] = []
+        self._rows: Dict[str, int] = {}
+        self._postings: Dict[str, List[int]] = defaultdict(list)
+        self._frozen: Dict[str, np.ndarray] = {}
+        self._columns: Dict[str, np.ndarray] = {}
+
+    def create_index(self) -> bool:
+        return True
+
+    def index_item(self, item: Dict[str, Any]) -> bool:
+        self._index([item])
+        return True
+
+    def bulk_index(self, items: Iterable[Dict[str, Any]], **kwargs) -> BulkIndexReport:
+        started = time.perf_counter()
+        report = BulkIndexReport()
+        batch = []
+        for item in items:
+            if "id" not in item:
+                report.failed += 1
+                report.errors.append(DocumentError(error="missing id"))
+                continue
+            batch.append(item)
+            if len(batch) >= 10000:
+                report.indexed += self._index(batch)
+                batch = []
+        report.indexed += self._index(batch)
+        report.elapsed_seconds = time.perf_counter() - started
+        if report.elapsed_seconds > 0:
+            report.docs_per_second = report.indexed / report.elapsed_seconds
+        return report
+
+    def bulk_update(self, updates: Iterable[Dict[str, Any]], upsert: bool = False, **kwargs) -> BulkIndexReport:
+        started = time.perf_counter()
+        report = BulkIndexReport()
+        inserts = []
+        with self._lock:
+            for update in updates:
+                row = self._rows.get(update["id"])
+                if row is None and upsert:
+                    inserts.append(update)
+                elif row is None:
+                    report.failed += 1
+                    report.errors.append(DocumentError(id=update["id"], status=404, error="document missing"))
+                else:
+                    self._docs[row].update({key: value for key, value in update.items() if key != "id"})
+                    report.indexed += 1
+            self._columns.clear()
+        report.indexed += self._index(inserts)
+        self.cache.invalidate()
+        report.elapsed_seconds = time.perf_counter() - started
+        return report
+
+    def bulk_delete(self, ids: Iterable[str], **kwargs) -> BulkIndexReport:
+        started = time.perf_counter()
+        ids = list(ids)
+        with self._lock:
+            # Rebuilding is O(catalog), but deletes are rare in benchmarks
+            drop = set(ids)
+            docs = [doc for doc in self._docs if str(doc["id"]) not in drop]
+            self._docs, self._rows, self._postings = [], {}, defaultdict(list)
+            self._index(docs)
+        return BulkIndexReport(indexed=len(ids), elapsed_seconds=time.perf_counter() - started)
+
+    def refresh(self) -> bool:
+        return True
+
+    def suspend_refresh(self, refresh_interval: str = "-1") -> Optional[str]:
+        return None
+
+    def restore_refresh(self, previous_interval: Optional[str]) -> None:
+        self.cache.invalidate()
+
+    def _index(self, items: List[Dict[str, Any]]) -> int:
+        with self._lock:
+            for item in items:
+                doc_id = str(item["id"])
+                row = self._rows.get(doc_id)
+                if row is not None:
+                    # Replaced docs keep stale postings; fine for benchmarks
+                    self._docs[row] = dict(item)
+                    continue
+                row = len(self._docs)
+                self._rows[doc_id] = row
+                self._docs.append(dict(item))
+                for token in set(self._tokens(item)):
+                    self._postings[token].append(row)
+            self._frozen.clear()
+            self._columns.clear()
+        self.cache.invalidate()
+        return len(items)
+
+    def _tokens(self, item: Dict[str, Any]) -> List[str]:
+        text = " ".join(str(item.get(field) or "") for field in self.TEXT_FIELDS)
+        return TOKEN_PATTERN.findall(text.lower())
+
+    def _posting(self, token: str) -> np.ndarray:
+        posting = self._frozen.get(token)
+        if posting is None:
+            posting = self._frozen[token] = np.asarray(self._postings.get(token, ()), dtype=np.int64)
+        return posting
+
+    def _column(self, field: str) -> np.ndarray:
+        column = self._columns.get(field)
+        if column is None:
+            column = self._columns[field] = np.array([doc.get(field) for doc in self._docs], dtype=object)
+        return column
+
+    def _filter_mask(self, clauses: List[Dict[str, Any]]) -> np.ndarray:
+        mask = np.ones(len(self._docs), dtype=bool)
+        for clause in clauses:
+            (kind, body), = clause.items()
+            (field, value), = body.items()
+            column = self._column(field)
+            if kind == "term":
+                mask &= column == value
+            elif kind == "terms":
+                mask &= np.isin(column, list(value))
+            elif kind == "range":
+                numeric = np.array([math.nan if v is None else float(v) for v in column])
+                for op, bound in value.items():
+                    mask &= {"gte": numeric >= bound, "gt": numeric > bound,
+                             "lte": numeric <= bound, "lt": numeric < bound}[op]
+        return mask
+
+    def _text_query(self, query: Dict[str, Any]) -> Optional[str]:
+        if "multi_match" in query:
+            return query["multi_match"]["query"]
+        if "match" in query:
+            (_, value), = query["match"].items()
+            return value["query"] if isinstance(value, dict) else value
+        return None
+
+    def _search(self, query: Dict[str, Any]) -> Dict[str, Any]:
+        self._latency.sleep()
+        return self._execute(query)
+
+    async def _asearch(self, query: Dict[str, Any]) -> Dict[str, Any]:
+        # Like AsyncElasticsearch, the round trip doesn't hold a thread
+        await asyncio.sleep(self._latency.sample())
+        return self._execute(query)
+
+    def _execute(self, query: Dict[str, Any]) -> Dict[str, Any]:
+        body = query.get("query", {"match_all": {}})
+        size = query.get("size", 10)
+        offset = query.get("from", 0)
+        fields = query.get("_source")
+        with self._lock:
+            n = len(self._docs)
+            if not n:
+                return {"hits": {"total": {"value": 0}, "hits": []}}
+            must, filters = [body], []
+            if "bool" in body:
+                must = body["bool"].get("must", [])
+                filters = body["bool"].get("filter", [])
+            scores = np.zeros(n, dtype=np.float32)
+            text = next((t for t in map(self._text_query, must) if t), None)
+            if text:
+                for token in set(TOKEN_PATTERN.findall(text.lower())):
+                    posting = self._posting(token)
+                    if len(posting):
+                        scores[posting] += math.log(1 + (n - len(posting) + 0.5) / (len(posting) + 0.5))
+                eligible = scores > 0
+            else:
+                scores[:] = 1.0
+                eligible = np.ones(n, dtype=bool)
+            if filters:
+                eligible &= self._filter_mask(filters)
+            rows = np.flatnonzero(eligible)
+            response: Dict[str, Any] = {"hits": {"total": {"value": len(rows)}}}
+            if "aggs" in query:
+                response["aggregations"] = {
+                    name: self._terms_buckets(rows, agg["terms"]["field"], agg["terms"].get("size", 10))
+                    for name, agg in query["aggs"].items()
+                }
+            wanted = offset + size
+            if len(rows) > wanted:
+                rows = rows[np.argpartition(-scores[rows], wanted - 1)[:wanted]] if wanted else rows[:0]
+            rows = rows[np.argsort(-scores[rows], kind="stable")][offset:wanted]
+            response["hits"]["hits"] = [
+                {"_id": self._docs[row]["id"], "_score": float(scores[row]), "_source": self._project(self._docs[row], fields)}
+                for row in rows
+            ]
+            return response
+
+    def _terms_buckets(self, rows: np.ndarray, field: str, size: int) -> Dict[str, Any]:
+        values, counts = np.unique(self._column(field)[rows].astype(str), return_counts=True)
+        order = np.argsort(-counts, kind="stable")[:size]
+        return {"buckets": [{"key": str(values[i]), "doc_count": int(counts[i])} for i in order]}
+
+    @staticmethod
+    def _project(doc: Dict[str, Any], fields: Optional[List[str]]) -> Dict[str, Any]:
+        if fields is None:
+            return doc
+        return {field: doc[field] for field in fields if field in doc}
+
+    def __len__(self) -> int:
+        return len(self._docs)
@@ -0,0 +1,118 @@
+"""Accuracy and latency report for the backend's CPU inference modes.
+
+Usage:
+    python benchmarks/inference_modes.py --sample-dir data/labeled_sample
+
+The sample directory holds one subdirectory per class, named after the
+model's labels (e.g. ``Blazer/``, ``Jeans/``). Every mode is compared with the
+fp32 ``eager`` path on predicted_class and era, scored against the labels,
+and timed per batch. Results are printed as JSON.
+"""
+import argparse
+import json
+import os
+import statistics
+import sys
+import time
+sys.path.append(os.path.abspath(os.path.join(os.path.dirname(__file__), '..')))
+
+import torch
+from PIL import Image
+from transformers import AutoFeatureExtractor, AutoModelForImageClassification
+
+from backend.inference_modes import INFERENCE_MODES, build_runner
+from backend.labels import era_for
+
+IMAGE_EXTENSIONS = {".jpg", ".jpeg", ".png", ".webp"}
+
+
+def load_sample(sample_dir: str, limit: int):
+    samples = []
+    for label in sorted(os.listdir(sample_dir)):
+        label_dir = os.path.join(sample_dir, label)
+        if not os.path.isdir(label_dir):
+            continue
+        for name in sorted(os.listdir(label_dir)):
+            if os.path.splitext(name)[1].lower() in IMAGE_EXTENSIONS:
+                samples.append((os.path.join(label_dir, name), label))
+    return samples[:limit] if limit else samples
+
+
+def percentile(values, pct):
+    ordered = sorted(values)
+    return ordered[min(len(ordered) - 1, int(round(pct / 100 * (len(ordered) - 1))))]
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument("--sample-dir", required=True)
+    parser.add_argument("--model", default="nateraw/vit-fashion-classifier")
+    parser.add_argument("--modes", default=",".join(INFERENCE_MODES))
+    parser.add_argument("--batch-size", type=int, default=16)
+    parser.add_argument("--limit", type=int, default=0, help="cap on sample images (0 = all)")
+    parser.add_argument("--export-dir", default="exported_models/benchmark")
+    parser.add_argument("--intra-op-threads", type=int, default=0)
+    parser.add_argument("--inter-op-threads", type=int, default=0)
+    parser.add_argument("--output", help="also write the report to this JSON file")
+    args = parser.parse_args()
+
+    extractor = AutoFeatureExtractor.from_pretrained(args.model)
+    model = AutoModelForImageClassification.from_pretrained(args.model)
+    samples = load_sample(args.sample_dir, args.limit)
+    if not samples:
+        parser.error(f"No labeled images found in {args.sample_dir}")
+    batches = []
+    for start in range(0, len(samples), args.batch_size):
+        chunk = samples[start:start + args.batch_size]
+        images = [Image.open(path).convert("RGB") for path, _ in chunk]
+        batches.append(extractor(images=images, return_tensors="pt")["pixel_values"])
+    labels = [label for _, label in samples]
+    input_size = tuple(batches[0].shape[-2:])
+
+    # The fp32 eager path is always run first as the reference
+    modes = ["eager"] + [mode for mode in args.modes.split(",") if mode != "eager"]
+    report = {"images": len(samples), "batch_size": args.batch_size, "modes": {}}
+    reference = None
+    for mode in modes:
+        run = build_runner(
+            model,
+            mode,
+            export_dir=args.export_dir,
+            input_size=input_size,
+            intra_op_threads=args.intra_op_threads,
+            inter_op_threads=args.inter_op_threads,
+        )
+        run(batches[0])  # warm-up
+        predictions, latencies = [], []
+        for pixel_values in batches:
+            started = time.perf_counter()
+            logits = run(pixel_values)
+            latencies.append(time.perf_counter() - started)
+            predictions.extend(model.config.id2label[int(i)] for i in torch.argmax(logits, dim=1))
+        eras = [era_for(prediction) for prediction in predictions]
+        if reference is None:
+            reference = (predictions, eras)
+        total = sum(latencies)
+        report["modes"][mode] = {
+            "accuracy": sum(p == l for p, l in zip(predictions, labels)) / len(labels),
+            "era_accuracy": sum(e == era_for(l) for e, l in zip(eras, labels)) / len(labels),
+            "class_agreement_with_eager": sum(p == r for p, r in zip(predictions, reference[0])) / len(labels),
+            "era_agreement_with_eager": sum(e == r for e, r in zip(eras, reference[1])) / len(labels),
+            "batch_latency_ms_p50": round(statistics.median(latencies) * 1000, 2),
+            "batch_latency_ms_p95": round(percentile(latencies, 95) * 1000, 2),
+            "images_per_second": round(len(samples) / total, 1) if total else None,
+        }
+    eager = report["modes"]["eager"]
+    for mode, result in report["modes"].items():
+        result["accuracy_delta"] = round(result["accuracy"] - eager["accuracy"], 4)
+        if eager["images_per_second"] and result["images_per_second"]:
+            result["speedup"] = round(result["images_per_second"] / eager["images_per_second"], 2)
+
+    print(json.dumps(report, indent=2))
+    if args.output:
+        with open(args.output, "w") as f:
+            json.dump(report, f, indent=2)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,80 @@
+"""Measure item (de)serialization throughput for the API models.
+
+Usage:
+    python benchmarks/serialization.py --items 500 --repeat 50
+
+Compares validated pydantic models against ``model_construct``, and
+stdlib ``json`` against ``orjson``. Prints items/sec per case as JSON.
+"""
+import argparse
+import json
+import os
+import random
+import sys
+import time
+sys.path.append(os.path.abspath(os.path.join(os.path.dirname(__file__), '..')))
+
+import orjson
+
+from core.models import FashionItem, RecommendationResponse
+
+CATEGORIES = ["shirt", "pants", "dress", "jacket", "shoes", "accessories"]
+BRANDS = ["Levi's", "Carhartt", "Champion", "Dickies", "Nike", "Patagonia"]
+COLORS = ["black", "white", "grey", "navy", "olive", "red"]
+
+
+def synthetic_sources(count: int):
+    rng = random.Random(0)
+    return [
+        {
+            "id": f"item-{i}",
+            "name": f"{rng.choice(COLORS)} {rng.choice(CATEGORIES)} {i}",
+            "category": rng.choice(CATEGORIES),
+            "attributes": {"color": rng.choice(COLORS), "size": rng.choice(["S", "M", "L", "XL"])},
+            "image_url": f"https://example.com/items/{i}.jpg",
+            "brand": rng.choice(BRANDS),
+            "price": round(rng.uniform(10, 300), 2),
+        }
+        for i in range(count)
+    ]
+
+
+def measure(fn, items: int, repeat: int):
+    fn()  # warm up
+    started = time.perf_counter()
+    for _ in range(repeat):
+        fn()
+    seconds = time.perf_counter() - started
+    return {"seconds": round(seconds, 4), "items_per_second": round(items * repeat / seconds, 1)}
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument("--items", type=int, default=500, help="items per response")
+    parser.add_argument("--repeat", type=int, default=50)
+    args = parser.parse_args()
+
+    sources = synthetic_sources(args.items)
+    encoded = orjson.dumps(sources)
+    validated = [FashionItem.model_validate(source) for source in sources]
+    response = RecommendationResponse(items=validated, confidence_score=0.9, reasoning="benchmark")
+
+    cases = {
+        "validate": lambda: [FashionItem.model_validate(source) for source in sources],
+        "construct_unvalidated": lambda: [FashionItem.model_construct(**source) for source in sources],
+        "dump_model_json": lambda: response.model_dump_json(),
+        "dump_stdlib_json": lambda: json.dumps(response.model_dump(mode="json")),
+        "dump_orjson": lambda: orjson.dumps(response.model_dump()),
+        "roundtrip_validated": lambda: [
+            FashionItem.model_validate(item)
+            for item in json.loads(json.dumps([i.model_dump(mode="json") for i in validated]))
+        ],
+        "decode_orjson": lambda: orjson.loads(encoded),
+        "decode_stdlib_json": lambda: json.loads(encoded),
+    }
+    results = {name: measure(fn, args.items, args.repeat) for name, fn in cases.items()}
+    print(json.dumps({"items": args.items, "repeat": args.repeat, "results": results}, indent=2))
+
+
+if __name__ == "__main__":
+    main()
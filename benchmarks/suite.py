@@ -0,0 +1,440 @@
+"""Offline end-to-end benchmark suite.
+
+Usage:
+    python benchmarks/suite.py --scale 10k --output results/bench.json
+    python benchmarks/suite.py --scale 100k --scenarios ingest,search --index-type ivf
+
+Everything runs in-process against local stand-ins (see benchmarks/fakes.py):
+an in-memory Elasticsearch, the local NumPy vector index, a fake LLM and a
+fake classifier with production-like latency. The FastAPI apps are driven
+through ASGI, so middleware, routing, serialization, batching and caching
+are all on the measured path. Results are written as JSON to compare
+between releases. Every on-disk store (LLM cache, conversations, result
+cache, try-on jobs, uploads) lives in a temporary directory that is
+removed afterwards, and global settings are restored when the run ends.
+
+Scenarios:
+    ingest   bulk-load the catalog into the ES stand-in and vector index
+    search   text, vector, facet and hybrid queries against the loaded catalog
+    agents   concurrent load on the MCP server's agent endpoints
+    upload   concurrent load on the backend's /upload endpoint
+
+The 1M scale needs several GB of memory (about 2 GB for 512-d vectors
+alone); pass a smaller --dimension to reduce it.
+"""
+import argparse
+import asyncio
+import contextlib
+import io
+import json
+import logging
+import os
+import platform
+import random
+import shutil
+import statistics
+import subprocess
+import sys
+import tempfile
+import time
+from typing import Any, Awaitable, Callable, Dict, Iterator, List
+sys.path.append(os.path.abspath(os.path.join(os.path.dirname(__file__), '..')))
+
+import httpx
+import numpy as np
+from PIL import Image
+
+from benchmarks.catalog import (
+    COLORS, NOUNS, STYLE_WORDS, generate_catalog, generate_documents, generate_vectors, scale_to_count,
+    vector_records,
+)
+from benchmarks.fakes import FakeClassifier, FakeEmbedder, FakeLLM, InMemoryElasticsearch
+from core.config import settings
+
+SCENARIOS = ("ingest", "search", "agents", "upload")
+
+
+def summarize(samples: List[float]) -> Dict[str, float]:
+    if not samples:
+        return {}
+    ordered = sorted(samples)
+
+    def pct(p: float) -> float:
+        return round(ordered[min(len(ordered) - 1, int(p / 100 * len(ordered)))] * 1000, 2)
+
+    return {
+        "mean_ms": round(statistics.fmean(ordered) * 1000, 2),
+        "p50_ms": pct(50),
+        "p90_ms": pct(90),
+        "p95_ms": pct(95),
+        "p99_ms": pct(99),
+        "max_ms": round(ordered[-1] * 1000, 2),
+    }
+
+
+async def run_load(
+    call: Callable[[int], Awaitable[bool]],
+    requests: int,
+    concurrency: int
+) -> Dict[str, Any]:
+    """Issue ``requests`` calls with at most ``concurrency`` in flight."""
+    latencies: List[float] = []
+    errors = 0
+    counter = iter(range(requests))
+
+    async def worker() -> None:
+        nonlocal errors
+        for i in counter:
+            started = time.perf_counter()
+            try:
+                ok = await call(i)
+            except Exception:
+                ok = False
+            latencies.append(time.perf_counter() - started)
+            errors += 0 if ok else 1
+
+    started = time.perf_counter()
+    await asyncio.gather(*(worker() for _ in range(concurrency)))
+    seconds = time.perf_counter() - started
+    return {
+        "requests": requests,
+        "concurrency": concurrency,
+        "errors": errors,
+        "seconds": round(seconds, 3),
+        "throughput_rps": round(requests / seconds, 1) if seconds else None,
+        "latency": summarize(latencies),
+    }
+
+
+@contextlib.contextmanager
+def isolated(workdir: str) -> Iterator[None]:
+    """Point every on-disk store at ``workdir`` and undo global changes on exit.
+
+    Covers the ``*_path`` settings, the backend's store environment
+    variables and the working directory (backend.main creates relative
+    directories at import).
+    """
+    saved_settings = settings.model_dump()
+    saved_environ = dict(os.environ)
+    saved_cwd = os.getcwd()
+    for name in type(settings).model_fields:
+        if name.endswith("_path"):
+            setattr(settings, name, os.path.join(workdir, os.path.basename(getattr(settings, name))))
+    os.environ.update(
+        RESULT_CACHE_PATH=os.path.join(workdir, "results.sqlite3"),
+        IMAGE_VARIANT_DIR=os.path.join(workdir, "variants"),
+        TRYON_DIR=os.path.join(workdir, "tryon"),
+        TRYON_DB_PATH=os.path.join(workdir, "tryon", "jobs.sqlite3"),
+    )
+    try:
+        yield
+    finally:
+        os.chdir(saved_cwd)
+        os.environ.clear()
+        os.environ.update(saved_environ)
+        for name, value in saved_settings.items():
+            setattr(settings, name, value)
+
+
+class Environment:
+    """The generated catalog and the local stand-ins loaded with it."""
+
+    def __init__(self, args: argparse.Namespace, workdir: str):
+        from infrastructure.vector_store import LocalBackend, VectorStore
+
+        self.args = args
+        self.workdir = workdir
+        self.count = scale_to_count(args.scale)
+        self.documents = list(generate_documents(self.count, seed=args.seed))
+        self.vectors = generate_vectors(self.documents, args.dimension, seed=args.seed)
+        self.es = InMemoryElasticsearch(latency=args.es_latency, seed=args.seed)
+        # The local backend sizes its index from settings
+        settings.vector_store_dimension = args.dimension
+        backend = LocalBackend(index_type=args.index_type)
+        self.vector_store = VectorStore(backend=backend)
+        self.loaded = False
+
+    def load(self) -> Dict[str, Any]:
+        es_report = self.es.bulk_index(self.documents)
+        started = time.perf_counter()
+        vector_report = self.vector_store.bulk_upsert(vector_records(self.documents, self.vectors), batch_size=1000)
+        index = self.vector_store.backend.index
+        if hasattr(index, "train"):
+            index.train()
+        vector_seconds = time.perf_counter() - started
+        self.loaded = True
+        return {
+            "items": self.count,
+            "elasticsearch": {
+                "indexed": es_report.indexed,
+                "seconds": round(es_report.elapsed_seconds, 3),
+                "docs_per_second": round(es_report.docs_per_second, 1),
+            },
+            "vector_index": {
+                "upserted": vector_report.upserted,
+                "failed": vector_report.failed,
+                "seconds": round(vector_seconds, 3),
+                "vectors_per_second": round(vector_report.upserted / vector_seconds, 1) if vector_seconds else None,
+            },
+        }
+
+    def ensure_loaded(self) -> None:
+        if not self.loaded:
+            self.load()
+
+
+def text_query(rng: random.Random) -> str:
+    return f"{rng.choice(COLORS)} {rng.choice(STYLE_WORDS)} {rng.choice(rng.choice(list(NOUNS.values())))}"
+
+
+async def scenario_ingest(env: Environment) -> Dict[str, Any]:
+    return await asyncio.to_thread(env.load)
+
+
+async def scenario_search(env: Environment) -> Dict[str, Any]:
+    from infrastructure.hybrid_search import HybridRetriever, SearchFilters
+
+    env.ensure_loaded()
+    rng = random.Random(env.args.seed)
+    noise = np.random.default_rng(env.args.seed)
+    retriever = HybridRetriever(env.es, env.vector_store)
+    queries = env.args.queries
+
+    def vector_query(i: int) -> List[float]:
+        vector = env.vectors[rng.randrange(env.count)] + 0.1 * noise.standard_normal(env.args.dimension)
+        return (vector / np.linalg.norm(vector)).astype(np.float32).tolist()
+
+    async def text(i: int) -> bool:
+        query = {"size": 10, "query": {"multi_match": {"query": text_query(rng), "fields": ["name^2", "description"]}}}
+        return bool(await asyncio.to_thread(env.es.search_hits, query))
+
+    async def vector(i: int) -> bool:
+        return bool(await asyncio.to_thread(env.vector_store.similarity_search, vector_query(i), 10))
+
+    async def filtered_vector(i: int) -> bool:
+        filters = SearchFilters(category=rng.choice(list(NOUNS)), max_price=80.0)
+        matches = await asyncio.to_thread(
+            env.vector_store.similarity_search, vector_query(i), 10, filters.to_vector()
+        )
+        return bool(matches)
+
+    async def browse(i: int) -> bool:
+        # Category + color browse pages repeat constantly, so facets mostly hit the cache
+        filters = [{"term": {"category": rng.choice(list(NOUNS))}}, {"term": {"color": rng.choice(COLORS)}}]
+        facets = await asyncio.to_thread(env.es.facet_counts, {"bool": {"filter": filters}})
+        return bool(facets)
+
+    async def hybrid(i: int) -> bool:
+        results = await retriever.search(text=text_query(rng), query_vector=vector_query(i), k=10)
+        return bool(results)
+
+    concurrency = env.args.concurrency
+    return {
+        "text": await run_load(text, queries, concurrency),
+        "vector": await run_load(vector, queries, concurrency),
+        "vector_filtered": await run_load(filtered_vector, queries, concurrency),
+        "facets": await run_load(browse, queries, concurrency),
+        "hybrid": await run_load(hybrid, queries, concurrency),
+    }
+
+
+async def scenario_agents(env: Environment) -> Dict[str, Any]:
+    from agents.profile_vectors import build_catalog_index
+    from agents.registry import build_default_registry
+    from agents.runtime import AgentRuntime
+    from infrastructure import mcp_server
+
+    env.ensure_loaded()
+    args = env.args
+    if not args.llm_cache:
+        settings.llm_cache_backend = "none"
+    if not args.llm_admission:
+        # The fake LLM has no provider rate limits to protect
+        settings.llm_admission_enabled = False
+    catalog = build_catalog_index(generate_catalog(env.count, seed=args.seed))
+    llm = FakeLLM(latency=args.llm_latency, tokens_per_second=args.llm_tokens_per_second, seed=args.seed)
+    registry = build_default_registry(
+        vector_store=env.vector_store,
+        embedder=FakeEmbedder(args.dimension, latency=args.embed_latency, seed=args.seed),
+        catalog=catalog,
+    )
+    mcp_server.runtime = AgentRuntime(
+        registry,
+        llm,
+        max_concurrency=settings.agent_max_concurrency,
+        default_timeout=settings.agent_timeout_seconds,
+    )
+    rng = random.Random(args.seed)
+    context = {
+        "user_profile": {
+            "cultural_references": ["streetwear", "hip_hop"],
+            "style_attributes": ["casual", "street"],
+            "color_preferences": ["black", "olive"],
+        },
+        "conversation_history": [{"user": "I like baggy fits", "assistant": "Noted, relaxed silhouettes it is."}],
+        "current_state": {},
+    }
+
+    def document() -> Dict[str, Any]:
+        return env.documents[rng.randrange(env.count)]
+
+    payloads: Dict[str, Callable[[int], Dict[str, Any]]] = {
+        "conversation": lambda i: {"message": f"What should I wear with {document()['name']}? ({i})"},
+        "style_classification": lambda i: {"description": f"{document()['name']} ({i})", "image_url": document()["image_url"]},
+        "personalization": lambda i: {"context": "weekend in the city", "interactions": [document()["id"]]},
+        "visual_search": lambda i: {"image_url": f"{document()['image_url']}?v={i}"},
+    }
+    results = {}
+    async with httpx.AsyncClient(
+        transport=httpx.ASGITransport(app=mcp_server.app), base_url="http://bench", timeout=120
+    ) as client:
+        for agent_type, payload in payloads.items():
+            async def call(i: int, agent_type=agent_type, payload=payload) -> bool:
+                body = {"agent_type": agent_type, "input_data": payload(i), "context": context}
+                response = await client.post(f"/agents/{agent_type}", json=body)
+                return response.status_code == 200 and response.json().get("success", False)
+            results[agent_type] = await run_load(call, args.agent_requests, args.concurrency)
+
+        async def recommend(i: int) -> bool:
+            item = document()
+            body = {"description": item["name"], "image_url": f"{item['image_url']}?v={i}", "context": context}
+            response = await client.post("/recommendations", json=body)
+            return response.status_code == 200
+        results["recommendations"] = await run_load(recommend, args.agent_requests, args.concurrency)
+    results["llm_calls"] = llm.calls
+    return results
+
+
+def synthetic_jpeg(i: int, size: int) -> bytes:
+    rng = np.random.default_rng(i)
+    gradient = np.linspace(0, 255, size, dtype=np.float32)
+    pixels = np.stack([
+        np.add.outer(gradient, gradient) / 2,
+        np.tile(gradient, (size, 1)),
+        np.full((size, size), rng.integers(0, 256), dtype=np.float32),
+    ], axis=-1)
+    pixels += rng.normal(0, 12, pixels.shape)
+    buffer = io.BytesIO()
+    Image.fromarray(np.clip(pixels, 0, 255).astype(np.uint8)).save(buffer, "JPEG", quality=85)
+    return buffer.getvalue()
+
+
+async def scenario_upload(env: Environment) -> Dict[str, Any]:
+    args = env.args
+    # backend.main reads its configuration and creates its directories at import
+    os.chdir(env.workdir)
+    os.environ.setdefault("IMAGE_VARIANT_PREGENERATE", "true" if args.upload_variants else "false")
+    from backend import main
+    from backend.model_loader import ModelLoader
+
+    main.classifier = ModelLoader(
+        lambda: FakeClassifier(args.classifier_batch_latency, args.classifier_per_image, seed=args.seed),
+        name="fake-classifier",
+    )
+    main.classifier.load()
+    await main.start_batcher()
+    distinct = max(1, int(args.upload_requests * (1 - args.upload_duplicates)))
+    images = [synthetic_jpeg(i, args.upload_size) for i in range(distinct)]
+    try:
+        async with httpx.AsyncClient(
+            transport=httpx.ASGITransport(app=main.app), base_url="http://bench", timeout=120
+        ) as client:
+            async def call(i: int) -> bool:
+                files = {"file": (f"upload-{i}.jpg", images[i % distinct], "image/jpeg")}
+                response = await client.post("/upload", files=files)
+                return response.status_code == 200
+            result = await run_load(call, args.upload_requests, args.concurrency)
+        result["distinct_images"] = distinct
+        result["image_bytes"] = int(statistics.fmean(len(image) for image in images))
+        result["batching"] = main.batcher.stats()
+        result["result_cache"] = main.result_cache.stats()
+    finally:
+        await main.stop_batcher()
+    return result
+
+
+def git_revision() -> str:
+    try:
+        return subprocess.run(
+            ["git", "rev-parse", "HEAD"], capture_output=True, text=True, check=True,
+            cwd=os.path.dirname(os.path.abspath(__file__)),
+        ).stdout.strip()
+    except (OSError, subprocess.CalledProcessError):
+        return "unknown"
+
+
+async def run(args: argparse.Namespace) -> Dict[str, Any]:
+    runners = {
+        "ingest": scenario_ingest,
+        "search": scenario_search,
+        "agents": scenario_agents,
+        "upload": scenario_upload,
+    }
+    workdir = tempfile.mkdtemp(prefix="racksavant-bench-")
+    results = {}
+    try:
+        with isolated(workdir):
+            env = Environment(args, workdir)
+            for name in args.scenarios:
+                started = time.perf_counter()
+                results[name] = await runners[name](env)
+                results[name]["scenario_seconds"] = round(time.perf_counter() - started, 3)
+    finally:
+        shutil.rmtree(workdir, ignore_errors=True)
+    return {
+        "meta": {
+            "git_revision": git_revision(),
+            "python": platform.python_version(),
+            "platform": platform.platform(),
+            "cpus": os.cpu_count(),
+            "timestamp": time.strftime("%Y-%m-%dT%H:%M:%SZ", time.gmtime()),
+        },
+        "params": {key: value for key, value in vars(args).items() if key != "output"},
+        "results": results,
+    }
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--scale", default="10k", help="catalog size: 10k, 100k, 1M or an integer")
+    parser.add_argument("--scenarios", default=",".join(SCENARIOS), help="comma-separated subset to run")
+    parser.add_argument("--output", help="write results JSON here as well as to stdout")
+    parser.add_argument("--seed", type=int, default=0)
+    parser.add_argument("--dimension", type=int, default=settings.vector_store_dimension)
+    parser.add_argument("--index-type", choices=("exact", "ivf"), default="exact")
+    parser.add_argument("--concurrency", type=int, default=16)
+    parser.add_argument("--queries", type=int, default=500, help="queries per search type")
+    parser.add_argument("--agent-requests", type=int, default=200, help="requests per agent endpoint")
+    parser.add_argument("--upload-requests", type=int, default=300)
+    parser.add_argument("--upload-duplicates", type=float, default=0.2, help="fraction of repeated images")
+    parser.add_argument("--upload-size", type=int, default=800, help="edge length of generated images")
+    parser.add_argument("--upload-variants", action="store_true", help="also generate resized variants")
+    parser.add_argument("--es-latency", type=float, default=0.005, help="seconds per ES round trip")
+    parser.add_argument("--llm-latency", type=float, default=0.4, help="seconds to first token")
+    parser.add_argument("--llm-tokens-per-second", type=float, default=60.0)
+    parser.add_argument("--llm-cache", action="store_true", help="keep the LLM response cache enabled")
+    parser.add_argument("--llm-admission", action="store_true", help="keep LLM admission control and rate limits enabled")
+    parser.add_argument("--embed-latency", type=float, default=0.02)
+    parser.add_argument("--classifier-batch-latency", type=float, default=0.03)
+    parser.add_argument("--classifier-per-image", type=float, default=0.01)
+    args = parser.parse_args()
+    args.scenarios = [name for name in args.scenarios.split(",") if name]
+    unknown = set(args.scenarios) - set(SCENARIOS)
+    if unknown:
+        parser.error(f"unknown scenarios: {sorted(unknown)}")
+    if args.output:
+        args.output = os.path.abspath(args.output)
+    # One INFO line per ASGI request would drown the results
+    logging.getLogger("httpx").setLevel(logging.WARNING)
+
+    report = asyncio.run(run(args))
+    encoded = json.dumps(report, indent=2)
+    print(encoded)
+    if args.output:
+        os.makedirs(os.path.dirname(args.output), exist_ok=True)
+        with open(args.output, "w") as f:
+            f.write(encoded + "\n")
+
+
+if __name__ == "__main__":
+    main()
@@ -1,9 +1,91 @@
+from typing import Dict
 from pydantic_settings import BaseSettings
 from pydantic import field_validator
 
 class Settings(BaseSettings):
     api_key: str = "your_default_api_key"
     temperature: float = 0.7
+    default_model: str = "gpt-3.5-turbo"
+
+    # Agent runtime
+    agent_max_concurrency: int = 8
+    agent_timeout_seconds: float = 30.0
+
+    # LLM admission control, per provider/model
+    llm_admission_enabled: bool = True
+    llm_requests_per_minute: float = 3500
+    llm_tokens_per_minute: float = 90000
+    llm_max_in_flight: int = 16
+    # Overrides keyed by "provider:model" or model, e.g. {"gpt-4": {"rpm": 500, "tpm": 10000, "max_in_flight": 4}}
+    llm_rate_limits: Dict[str, Dict[str, float]] = {}
+    llm_admission_queue_size: int = 256  # waiters per model before new calls are shed
+    llm_admission_output_tokens: int = 256  # completion tokens charged up front, reconciled after the call
+    llm_admission_min_service_seconds: float = 2.0  # time a call needs after leaving the queue
+    llm_admission_max_wait_seconds: float = 30.0  # for calls made without a deadline
+    llm_rate_limit_backoff_seconds: float = 1.0  # pause after the provider returns a rate-limit error
+
+    # Conversation history
+    max_conversation_history: int = 10  # turns kept per session
+    conversation_history_tokens: int = 1000  # prompt budget for the history block
+    conversation_summary_tokens: int = 200
+    conversation_store_path: str = "data/conversations.sqlite3"
+    conversation_cache_sessions: int = 1000
+
+    # Personalization
+    profile_catalog_index_path: str = "data/profile_catalog"
+    profile_cache_size: int = 10000
+    profile_interaction_decay: float = 0.9
+    personalization_candidates: int = 20  # shortlist size sent to the LLM
+
+    # LLM response cache
+    llm_cache_backend: str = "memory"  # memory, sqlite or none
+    llm_cache_path: str = "data/llm_cache.sqlite3"
+    llm_cache_ttl_seconds: float = 86400
+    llm_cache_max_entries: int = 10000
+    llm_semantic_cache: bool = False
+    llm_semantic_cache_threshold: float = 0.95
+
+    # Image embeddings
+    embedding_model: str = "nateraw/vit-fashion-classifier"
+    embedding_cache_size: int = 10000
+    image_fetch_timeout: float = 10.0
+    max_image_size: int = 2048  # KB
+
+    # Shared HTTP clients
+    http_max_connections: int = 32  # keep-alive pool size per client
+    http_timeout_seconds: float = 10.0  # default read timeout
+    http_connect_timeout_seconds: float = 3.0
+    http_max_retries: int = 3
+    http_retry_backoff: float = 0.3
+
+    # Elasticsearch
+    elasticsearch_url: str = "http://localhost:9200"
+    elasticsearch_max_connections: int = 32  # per node
+    elasticsearch_timeout_seconds: float = 10.0
+    elasticsearch_max_retries: int = 3
+    es_query_cache_size: int = 1000  # 0 disables the search result cache
+    es_query_cache_ttl_seconds: float = 30.0
+    es_facet_cache_ttl_seconds: float = 300.0
+    es_pit_keep_alive: str = "1m"
+
+    # Vector store
+    pinecone_api_key: str = ""
+    pinecone_environment: str = ""
+    pinecone_pool_threads: int = 8
+    vector_store_backend: str = "pinecone"
+    vector_store_index: str = "fashion-items"
+    vector_store_dimension: int = 512
+    vector_store_metric: str = "cosine"
+    local_vector_index_path: str = "data/vector_index"
+    local_vector_index_type: str = "exact"
+    local_vector_index_lists: int = 256
+    local_vector_index_probes: int = 8
+
+    # Catalog sync
+    catalog_sync_state_path: str = "data/catalog_state.sqlite3"
+    catalog_sync_batch_size: int = 500
+    # A snapshot that would delete more than this share of the catalog is rejected
+    catalog_sync_max_delete_fraction: float = 0.5
 
     @field_validator("temperature")
     @classmethod
@@ -128,7 +128,11 @@ class ConversationContext(BaseModel):
         }
 
 class TryOnRequest(BaseModel):
-    """Request for virtual try-on."""
+    """Request for virtual try-on.
+
+    The backend's ``POST /tryon/jobs`` takes the same fields as a multipart
+    upload instead, so the image travels as raw bytes rather than base64.
+    """
     user_image: str = Field(..., description="Base64 encoded user image")
     fashion_item_id: str = Field(..., description="ID of the fashion item to try")
     preferences: Dict[str, Any] = Field(
@@ -148,6 +152,46 @@ class TryOnRequest(BaseModel):
             }
         }
 
+class TryOnJobStatus(str, Enum):
+    """Lifecycle of a background try-on job."""
+    QUEUED = "queued"
+    RUNNING = "running"
+    SUCCEEDED = "succeeded"
+    FAILED = "failed"
+    EXPIRED = "expired"
+
+class TryOnJob(BaseModel):
+    """A virtual try-on rendered in the background."""
+    job_id: str = Field(..., description="Unique identifier for the job")
+    status: TryOnJobStatus = Field(..., description="Current job status")
+    fashion_item_id: str = Field(..., description="ID of the fashion item to try")
+    preferences: Dict[str, Any] = Field(
+        default_factory=dict,
+        description="Additional user preferences"
+    )
+    created_at: datetime = Field(..., description="When the job was submitted")
+    started_at: Optional[datetime] = Field(None, description="When a worker picked the job up")
+    finished_at: Optional[datetime] = Field(None, description="When rendering succeeded or failed")
+    expires_at: Optional[datetime] = Field(None, description="When the result will be deleted")
+    result_url: Optional[str] = Field(None, description="URL of the rendered image, once succeeded")
+    error: Optional[str] = Field(None, description="Why the job failed")
+    
+    class Config:
+        json_schema_extra = {
+            "example": {
+                "job_id": "4f1c2d9e8a7b4c3d9e8f7a6b5c4d3e2f",
+                "status": "succeeded",
+                "fashion_item_id": "item_123",
+                "preferences": {"pose": "standing"},
+                "created_at": "2024-01-01T12:00:00Z",
+                "started_at": "2024-01-01T12:00:01Z",
+                "finished_at": "2024-01-01T12:00:09Z",
+                "expires_at": "2024-01-01T13:00:09Z",
+                "result_url": "/tryon/jobs/4f1c2d9e8a7b4c3d9e8f7a6b5c4d3e2f/result",
+                "error": None
+            }
+        }
+
 class RecommendationResponse(BaseModel):
     """API response for recommendations."""
     items: List[FashionItem] = Field(..., description="Recommended items")
@@ -0,0 +1,32 @@
+import asyncio
+import time
+
+class AsyncRateLimiter:
+    """Token-bucket rate limiter for asyncio code.
+    
+    Allows bursts of up to ``burst`` acquisitions and refills at ``rate``
+    tokens per second. ``acquire`` sleeps until enough tokens are available.
+    """
+    
+    def __init__(self, rate: float, burst: float = 1.0):
+        if rate <= 0:
+            raise ValueError("rate must be positive")
+        self.rate = rate
+        self.burst = max(burst, 1.0)
+        self._tokens = self.burst
+        self._updated = time.monotonic()
+        self._lock = asyncio.Lock()
+    
+    def _refill(self) -> None:
+        now = time.monotonic()
+        self._tokens = min(self.burst, self._tokens + (now - self._updated) * self.rate)
+        self._updated = now
+    
+    async def acquire(self, tokens: float = 1.0) -> None:
+        """Wait until ``tokens`` can be taken from the bucket."""
+        async with self._lock:
+            self._refill()
+            while self._tokens < tokens:
+                await asyncio.sleep((tokens - self._tokens) / self.rate)
+                self._refill()
+            self._tokens -= tokens
@@ -1,17 +1,25 @@
 import json
-from typing import Dict, Any, List
+from typing import Dict, Any, List, Iterable, Iterator, Callable, Tuple, Type, TypeVar
 import logging
 from datetime import datetime
+import itertools
+import random
+import time
 import uuid
 
+T = TypeVar("T")
+
 logger = logging.getLogger(__name__)
 
 def setup_logging():
-    """Configure logging for the application."""
+    """Configure logging for the application, tagging records with the request ID."""
+    from core.metrics import RequestIdFilter
     logging.basicConfig(
         level=logging.INFO,
-        format='%(asctime)s - %(name)s - %(levelname)s - %(message)s'
+        format='%(asctime)s - %(name)s - %(levelname)s - [%(request_id)s] %(message)s'
     )
+    for handler in logging.getLogger().handlers:
+        handler.addFilter(RequestIdFilter())
 
 def generate_unique_id() -> str:
     """Generate a unique identifier for recommendations or sessions."""
@@ -39,3 +47,32 @@ def merge_dictionaries(*dicts: Dict[str, Any]) -> Dict[str, Any]:
 def batch_process(items: List[Any], batch_size: int = 100) -> List[List[Any]]:
     """Process items in batches."""
     return [items[i:i + batch_size] for i in range(0, len(items), batch_size)]
+
+def iter_batches(items: Iterable[T], batch_size: int = 100) -> Iterator[List[T]]:
+    """Yield successive batches from any iterable without materializing it."""
+    iterator = iter(items)
+    while True:
+        batch = list(itertools.islice(iterator, batch_size))
+        if not batch:
+            return
+        yield batch
+
+def retry_with_backoff(
+    func: Callable[..., T],
+    *args: Any,
+    max_retries: int = 3,
+    base_delay: float = 0.5,
+    max_delay: float = 30.0,
+    retry_on: Tuple[Type[BaseException], ...] = (Exception,),
+    **kwargs: Any
+) -> T:
+    """Call func, retrying failures with exponential backoff and jitter."""
+    for attempt in range(max_retries + 1):
+        try:
+            return func(*args, **kwargs)
+        except retry_on as e:
+            if attempt == max_retries:
+                raise
+            delay = min(max_delay, base_delay * (2 ** attempt)) * random.uniform(0.5, 1.0)
+            logger.warning(f"Attempt {attempt + 1} of {getattr(func, '__name__', func)} failed ({e}); retrying in {delay:.2f}s")
+            time.sleep(delay)
@@ -0,0 +1,410 @@
+import hashlib
+import logging
+import os
+import sqlite3
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+from typing import Any, Dict, Iterable, Iterator, List, Optional, Sequence, Set, Tuple
+
+import orjson
+from pydantic import BaseModel
+
+from core.config import settings
+from core.models import FashionItem
+from core.utils import iter_batches
+from infrastructure.elasticsearch_client import ElasticsearchClient
+from infrastructure.vector_store import VectorStore
+
+logger = logging.getLogger(__name__)
+
+# (content_hash, image_url, image_hash) as last written to both stores
+StateRow = Tuple[str, str, Optional[str]]
+
+def content_fingerprint(item: FashionItem, embedding_version: Optional[str] = None) -> str:
+    """Stable hash of everything written to the stores for an item."""
+    data = orjson.dumps(item.model_dump(mode="json"), option=orjson.OPT_SORT_KEYS)
+    if embedding_version:
+        data += b"\0" + embedding_version.encode()
+    return hashlib.blake2b(data, digest_size=16).hexdigest()
+
+def vector_metadata(item: FashionItem, embedding_version: Optional[str] = None) -> Dict[str, Any]:
+    """Metadata the hybrid retriever filters on (see ``SearchFilters.to_vector``).
+
+    ``embedding_version`` records how the vector was made, so vectors from an
+    older projection can be found and re-embedded.
+    """
+    metadata = {
+        "category": item.category.value,
+        "brand": item.brand,
+        "price": item.price,
+        "name": item.name,
+        "embedding_version": embedding_version
+    }
+    # Pinecone rejects null metadata values
+    return {key: value for key, value in metadata.items() if value is not None}
+
+class SyncFailure(BaseModel):
+    """An item that is still out of step after every retry."""
+    id: str
+    stage: str  # fetch_image, embed, elasticsearch, vector_store or delete
+    error: str
+
+class SyncReport(BaseModel):
+    """Outcome of a sync run."""
+    scanned: int = 0
+    unchanged: int = 0
+    indexed: int = 0
+    embedded: int = 0
+    deleted: int = 0
+    retries: int = 0
+    failures: List[SyncFailure] = []
+    # Items recorded as in sync in the state table after the run
+    tracked: int = 0
+    consistent: bool = True
+    elapsed_seconds: float = 0.0
+
+class SyncState:
+    """SQLite table of what was last written to both stores, per item."""
+
+    def __init__(self, path: str):
+        self.path = path
+        self._lock = threading.Lock()
+        os.makedirs(os.path.dirname(path) or ".", exist_ok=True)
+        self._conn = sqlite3.connect(path, check_same_thread=False)
+        self._conn.execute("PRAGMA journal_mode=WAL")
+        self._conn.execute(
+            "CREATE TABLE IF NOT EXISTS catalog_state ("
+            "id TEXT PRIMARY KEY, content_hash TEXT NOT NULL, image_url TEXT NOT NULL, "
+            "image_hash TEXT, synced_at REAL NOT NULL)"
+        )
+        self._conn.commit()
+
+    def get_many(self, ids: Sequence[str]) -> Dict[str, StateRow]:
+        rows = {}
+        with self._lock:
+            # Stay under SQLite's bound-parameter limit
+            for batch in iter_batches(ids, 500):
+                placeholders = ",".join("?" * len(batch))
+                for row in self._conn.execute(
+                    f"SELECT id, content_hash, image_url, image_hash FROM catalog_state WHERE id IN ({placeholders})",
+                    batch
+                ):
+                    rows[row[0]] = (row[1], row[2], row[3])
+        return rows
+
+    def put_many(self, rows: Iterable[Tuple[str, str, str, Optional[str]]]) -> None:
+        now = time.time()
+        with self._lock, self._conn:
+            self._conn.executemany(
+                "INSERT OR REPLACE INTO catalog_state (id, content_hash, image_url, image_hash, synced_at) "
+                "VALUES (?, ?, ?, ?, ?)",
+                [(*row, now) for row in rows]
+            )
+
+    def delete_many(self, ids: Iterable[str]) -> None:
+        with self._lock, self._conn:
+            self._conn.executemany("DELETE FROM catalog_state WHERE id = ?", [(item_id,) for item_id in ids])
+
+    def ids(self) -> List[str]:
+        with self._lock:
+            return [row[0] for row in self._conn.execute("SELECT id FROM catalog_state")]
+
+    def __len__(self) -> int:
+        with self._lock:
+            return self._conn.execute("SELECT COUNT(*) FROM catalog_state").fetchone()[0]
+
+    def close(self) -> None:
+        with self._lock:
+            self._conn.close()
+
+class _Change:
+    """An item that needs writing, carried across retry rounds."""
+
+    __slots__ = ("item", "content_hash", "image_hash", "embed", "image_data", "vector")
+
+    def __init__(self, item: FashionItem, content_hash: str, embed: bool, image_hash: Optional[str] = None):
+        self.item = item
+        self.content_hash = content_hash
+        self.image_hash = image_hash
+        self.embed = embed
+        self.image_data: Optional[bytes] = None
+        self.vector: Optional[Any] = None
+
+class CatalogSync:
+    """Incrementally sync catalog items into Elasticsearch and the vector store.
+
+    Each item's content fingerprint and image URL are compared with what the
+    state table says was last written, so only new, changed and removed
+    items cause writes, and only items whose image changed are re-embedded
+    (others reuse their stored vector with fresh metadata). With
+    ``verify_images`` the image bytes of otherwise unchanged items are also
+    fetched and hashed, to catch images replaced in place; that costs a
+    download per item, so leave it off for routine runs.
+
+    An item's state only advances once both stores accepted it, so a
+    partial failure leaves it pending: it is retried with backoff during the
+    run and picked up again by the next one. What is still out of step at
+    the end is listed in the report.
+
+    The embedder's ``projection_version`` is part of every fingerprint and is
+    stored with each vector, so changing it re-embeds the whole catalog on
+    the next run instead of mixing old and new vectors.
+    """
+
+    def __init__(
+        self,
+        es_client: ElasticsearchClient,
+        vector_store: VectorStore,
+        embedder: Any,
+        state: Optional[SyncState] = None,
+        batch_size: Optional[int] = None,
+        max_retries: int = 3,
+        retry_delay: float = 0.5,
+        verify_images: bool = False,
+        fetch_workers: int = 8,
+        max_delete_fraction: Optional[float] = None
+    ):
+        self.es_client = es_client
+        self.vector_store = vector_store
+        self.embedder = embedder
+        self.embedding_version: Optional[str] = getattr(embedder, "projection_version", None)
+        self.state = state if state is not None else SyncState(settings.catalog_sync_state_path)
+        self.batch_size = batch_size or settings.catalog_sync_batch_size
+        self.max_retries = max_retries
+        self.retry_delay = retry_delay
+        self.verify_images = verify_images
+        self.fetch_workers = fetch_workers
+        self.max_delete_fraction = (
+            settings.catalog_sync_max_delete_fraction if max_delete_fraction is None else max_delete_fraction
+        )
+
+    def sync_snapshot(self, items: Iterable[FashionItem]) -> SyncReport:
+        """Sync a full catalog snapshot; tracked items missing from it are deleted.
+
+        If the snapshot would delete more than ``max_delete_fraction`` of the
+        tracked catalog it is assumed to be truncated, and no deletes are made.
+        """
+        started = time.perf_counter()
+        report = SyncReport()
+        seen: Set[str] = set()
+
+        def tracked() -> Iterator[FashionItem]:
+            for item in items:
+                seen.add(item.id)
+                yield item
+
+        self._upsert_all(tracked(), report)
+        known = self.state.ids()
+        removed = [item_id for item_id in known if item_id not in seen]
+        if known and len(removed) > self.max_delete_fraction * len(known):
+            logger.error(
+                f"Snapshot would delete {len(removed)} of {len(known)} items; "
+                f"assuming it is incomplete and skipping deletes"
+            )
+            report.failures.append(SyncFailure(
+                id="*",
+                stage="delete",
+                error=f"refused to delete {len(removed)} of {len(known)} items"
+            ))
+        else:
+            self._delete_all(removed, report)
+        return self._finish(report, started)
+
+    def apply_changes(self, upserts: Iterable[FashionItem] = (), deletes: Iterable[str] = ()) -> SyncReport:
+        """Apply a change feed of new or updated items and deleted ids."""
+        started = time.perf_counter()
+        report = SyncReport()
+        self._upsert_all(upserts, report)
+        self._delete_all(list(deletes), report)
+        return self._finish(report, started)
+
+    def _finish(self, report: SyncReport, started: float) -> SyncReport:
+        if report.indexed or report.deleted:
+            self.es_client.refresh()
+            self.vector_store.save()
+        report.tracked = len(self.state)
+        report.consistent = not report.failures
+        report.elapsed_seconds = time.perf_counter() - started
+        logger.info(
+            f"Catalog sync: {report.scanned} scanned, {report.unchanged} unchanged, {report.indexed} written, "
+            f"{report.embedded} embedded, {report.deleted} deleted, {len(report.failures)} failed "
+            f"in {report.elapsed_seconds:.1f}s"
+        )
+        return report
+
+    def _retrying(self, pending: List[Any], attempt, report: SyncReport) -> Dict[str, SyncFailure]:
+        """Run ``attempt(pending) -> (still_pending, failures)`` with backoff between rounds."""
+        failures: Dict[str, SyncFailure] = {}
+        for round_number in range(self.max_retries + 1):
+            if not pending:
+                break
+            if round_number:
+                report.retries += 1
+                time.sleep(self.retry_delay * (2 ** (round_number - 1)))
+            pending, failures = attempt(pending)
+        return failures
+
+    def _upsert_all(self, items: Iterable[FashionItem], report: SyncReport) -> None:
+        for batch in iter_batches(items, self.batch_size):
+            changes = self._plan(batch, report)
+            failures = self._retrying(changes, lambda pending: self._write(pending, report), report)
+            report.failures.extend(failures.values())
+
+    def _delete_all(self, ids: List[str], report: SyncReport) -> None:
+        for batch in iter_batches(ids, self.batch_size):
+            failures = self._retrying(batch, lambda pending: self._delete(pending, report), report)
+            report.failures.extend(failures.values())
+
+    def _plan(self, batch: List[FashionItem], report: SyncReport) -> List[_Change]:
+        """Work out which items in the batch changed, and how."""
+        state = self.state.get_many([item.id for item in batch])
+        changes = []
+        to_verify = []
+        for item in batch:
+            report.scanned += 1
+            content_hash = content_fingerprint(item, self.embedding_version)
+            previous = state.get(item.id)
+            if previous is None or previous[1] != item.image_url:
+                changes.append(_Change(item, content_hash, embed=True))
+            elif previous[0] != content_hash:
+                changes.append(_Change(item, content_hash, embed=False, image_hash=previous[2]))
+            elif self.verify_images:
+                to_verify.append(_Change(item, content_hash, embed=False, image_hash=previous[2]))
+            else:
+                report.unchanged += 1
+        if to_verify:
+            failures = self._fetch_images(to_verify)
+            for change in to_verify:
+                if change.item.id in failures:
+                    # Can't tell whether it changed; the stored copy stays as it is
+                    logger.warning(f"Could not verify image for {change.item.id}: {failures[change.item.id].error}")
+                    report.unchanged += 1
+                elif hashlib.sha256(change.image_data).hexdigest() != change.image_hash:
+                    change.embed = True
+                    changes.append(change)
+                else:
+                    change.image_data = None
+                    report.unchanged += 1
+        return changes
+
+    def _fetch_images(self, changes: List[_Change]) -> Dict[str, SyncFailure]:
+        """Download image bytes for changes that don't have them yet."""
+        missing = [change for change in changes if change.image_data is None]
+        failures = {}
+
+        def fetch(change: _Change) -> Optional[str]:
+            try:
+                change.image_data = self.embedder.fetch(change.item.image_url)
+                return None
+            except Exception as e:
+                return str(e)
+
+        with ThreadPoolExecutor(max_workers=self.fetch_workers) as executor:
+            for change, error in zip(missing, executor.map(fetch, missing)):
+                if error is not None:
+                    failures[change.item.id] = SyncFailure(id=change.item.id, stage="fetch_image", error=error)
+        return failures
+
+    def _write(self, changes: List[_Change], report: SyncReport) -> Tuple[List[_Change], Dict[str, SyncFailure]]:
+        """Write one round of changes to both stores; returns what still needs writing."""
+        failures: Dict[str, SyncFailure] = {}
+
+        # Metadata-only changes keep their stored vector, unless it has gone
+        # missing or was made by a different projection
+        reuse = [change for change in changes if not change.embed and change.vector is None]
+        if reuse:
+            stored = self.vector_store.fetch([change.item.id for change in reuse])
+            for change in reuse:
+                record = stored.get(change.item.id)
+                if record is not None and record["metadata"].get("embedding_version") == self.embedding_version:
+                    change.vector = record["values"]
+                else:
+                    change.embed = True
+
+        to_embed = [change for change in changes if change.embed and change.vector is None]
+        if to_embed:
+            failures.update(self._fetch_images(to_embed))
+            fetched = [change for change in to_embed if change.item.id not in failures]
+            try:
+                # Per-item results, so one undecodable image only fails its own item
+                results = self.embedder.embed_each([change.image_data for change in fetched]) if fetched else []
+            except Exception as e:
+                logger.error(f"Error embedding {len(fetched)} images: {e}")
+                results = [e] * len(fetched)
+            for change, result in zip(fetched, results):
+                if isinstance(result, Exception):
+                    failures[change.item.id] = SyncFailure(id=change.item.id, stage="embed", error=str(result))
+                    continue
+                change.vector = result
+                change.image_hash = hashlib.sha256(change.image_data).hexdigest()
+                change.image_data = None
+                report.embedded += 1
+
+        ready = [change for change in changes if change.item.id not in failures]
+        if ready:
+            # Partial updates, so fields written by other jobs (styles,
+            # style_confidence) survive a catalog change
+            es_report = self.es_client.bulk_update(
+                (change.item.model_dump(mode="json") for change in ready),
+                refresh_interval=None,
+                upsert=True
+            )
+            for error in es_report.errors:
+                # An error without an id means the request itself failed
+                for item_id in [error.id] if error.id else [change.item.id for change in ready]:
+                    failures.setdefault(item_id, SyncFailure(id=item_id, stage="elasticsearch", error=error.error))
+            vector_report = self.vector_store.bulk_upsert(
+                {"id": change.item.id, "values": change.vector, "metadata": vector_metadata(change.item, self.embedding_version)}
+                for change in ready
+            )
+            for failure in vector_report.failures:
+                for item_id in failure.ids:
+                    failures.setdefault(item_id, SyncFailure(id=item_id, stage="vector_store", error=failure.error))
+
+        written = [change for change in ready if change.item.id not in failures]
+        self.state.put_many(
+            (change.item.id, change.content_hash, change.item.image_url, change.image_hash)
+            for change in written
+        )
+        report.indexed += len(written)
+        return [change for change in changes if change.item.id in failures], failures
+
+    def _delete(self, ids: List[str], report: SyncReport) -> Tuple[List[str], Dict[str, SyncFailure]]:
+        failures: Dict[str, SyncFailure] = {}
+        es_report = self.es_client.bulk_delete(ids)
+        for error in es_report.errors:
+            for item_id in [error.id] if error.id else ids:
+                failures.setdefault(item_id, SyncFailure(id=item_id, stage="delete", error=error.error))
+        for item_id in self.vector_store.delete(ids):
+            failures.setdefault(item_id, SyncFailure(id=item_id, stage="delete", error="vector delete failed"))
+        deleted = [item_id for item_id in ids if item_id not in failures]
+        self.state.delete_many(deleted)
+        report.deleted += len(deleted)
+        return [item_id for item_id in ids if item_id in failures], failures
+
+def _read_jsonl(path: str) -> Iterator[FashionItem]:
+    with open(path, "rb") as f:
+        for line in f:
+            if line.strip():
+                yield FashionItem.model_validate(orjson.loads(line))
+
+if __name__ == "__main__":
+    import argparse
+    from infrastructure.image_embedder import ImageEmbedder
+
+    parser = argparse.ArgumentParser(description="Sync a catalog snapshot into Elasticsearch and the vector store")
+    parser.add_argument("snapshot", help="JSON lines file with one FashionItem per line")
+    parser.add_argument("--verify-images", action="store_true", help="re-hash images of unchanged items")
+    args = parser.parse_args()
+
+    logging.basicConfig(level=logging.INFO)
+    sync = CatalogSync(
+        ElasticsearchClient(),
+        VectorStore(),
+        ImageEmbedder(),
+        verify_images=args.verify_images
+    )
+    report = sync.sync_snapshot(_read_jsonl(args.snapshot))
+    print(report.model_dump_json(indent=2))
+    raise SystemExit(0 if report.consistent else 1)
@@ -0,0 +1,179 @@
+import asyncio
+import logging
+import threading
+from typing import Any, Dict, Optional, Tuple
+
+from requests.adapters import HTTPAdapter
+
+from core.config import settings
+
+logger = logging.getLogger(__name__)
+
+# Transient statuses worth retrying: rate limiting and gateway/overload errors
+RETRY_STATUSES = (429, 500, 502, 503, 504)
+
+class TimeoutHTTPAdapter(HTTPAdapter):
+    """``HTTPAdapter`` that applies a default timeout to every request.
+
+    ``requests`` waits forever unless each call passes ``timeout``; requests
+    that do pass one keep it.
+    """
+
+    def __init__(self, timeout: Tuple[float, float], **kwargs):
+        self.timeout = timeout  # (connect, read) seconds
+        super().__init__(**kwargs)
+
+    def send(self, request, **kwargs):
+        if kwargs.get("timeout") is None:
+            kwargs["timeout"] = self.timeout
+        return super().send(request, **kwargs)
+
+class ClientRegistry:
+    """Process-wide network clients, built lazily and shared by every caller.
+
+    Each client keeps a pool of keep-alive connections sized by
+    ``*_max_connections`` settings and applies the configured timeouts and
+    retry-with-backoff policy, so requests reuse warm TCP/TLS connections
+    instead of opening new ones, and a burst queues on the pool rather than
+    exhausting sockets. Client libraries other than ``requests`` are
+    imported on first use.
+    """
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self._elasticsearch = None
+        self._async_elasticsearch = None
+        self._pinecone = None
+        self._pinecone_indexes: Dict[str, Any] = {}
+        self._http_session = None
+        self._async_http = None
+
+    def elasticsearch(self):
+        """Shared synchronous Elasticsearch client."""
+        with self._lock:
+            if self._elasticsearch is None:
+                from elasticsearch import Elasticsearch
+                self._elasticsearch = Elasticsearch(settings.elasticsearch_url, **self._elasticsearch_options())
+            return self._elasticsearch
+
+    def async_elasticsearch(self):
+        """Shared ``AsyncElasticsearch`` client (needs the aiohttp extra)."""
+        with self._lock:
+            if self._async_elasticsearch is None:
+                from elasticsearch import AsyncElasticsearch
+                self._async_elasticsearch = AsyncElasticsearch(
+                    settings.elasticsearch_url, **self._elasticsearch_options()
+                )
+            return self._async_elasticsearch
+
+    @staticmethod
+    def _elasticsearch_options() -> Dict[str, Any]:
+        return {
+            "connections_per_node": settings.elasticsearch_max_connections,
+            "request_timeout": settings.elasticsearch_timeout_seconds,
+            "max_retries": settings.elasticsearch_max_retries,
+            "retry_on_timeout": True,
+            "retry_on_status": RETRY_STATUSES,
+        }
+
+    def pinecone(self):
+        """The ``pinecone`` module, initialized once per process."""
+        with self._lock:
+            if self._pinecone is None:
+                import pinecone
+                pinecone.init(
+                    api_key=settings.pinecone_api_key,
+                    environment=settings.pinecone_environment
+                )
+                self._pinecone = pinecone
+            return self._pinecone
+
+    def pinecone_index(self, name: str):
+        """Shared handle for a Pinecone index, with its own connection pool."""
+        pinecone = self.pinecone()
+        with self._lock:
+            index = self._pinecone_indexes.get(name)
+            if index is None:
+                index = self._pinecone_indexes[name] = pinecone.Index(
+                    name, pool_threads=settings.pinecone_pool_threads
+                )
+            return index
+
+    def http_session(self):
+        """Shared ``requests.Session`` with a sized pool, default timeouts and retrying GETs."""
+        with self._lock:
+            if self._http_session is None:
+                import requests
+                from urllib3.util.retry import Retry
+
+                retry = Retry(
+                    total=settings.http_max_retries,
+                    backoff_factor=settings.http_retry_backoff,
+                    status_forcelist=RETRY_STATUSES,
+                    allowed_methods=frozenset({"GET", "HEAD"}),
+                    respect_retry_after_header=True
+                )
+                adapter = TimeoutHTTPAdapter(
+                    timeout=(settings.http_connect_timeout_seconds, settings.http_timeout_seconds),
+                    pool_connections=settings.http_max_connections,
+                    pool_maxsize=settings.http_max_connections,
+                    max_retries=retry
+                )
+                session = requests.Session()
+                session.mount("http://", adapter)
+                session.mount("https://", adapter)
+                self._http_session = session
+            return self._http_session
+
+    def async_http(self):
+        """Shared ``httpx.AsyncClient`` with the same limits and timeouts.
+
+        httpx only retries failed connections, so callers that care about
+        429/5xx responses must check the status themselves.
+        """
+        with self._lock:
+            if self._async_http is None:
+                import httpx
+                self._async_http = httpx.AsyncClient(
+                    limits=httpx.Limits(
+                        max_connections=settings.http_max_connections,
+                        max_keepalive_connections=settings.http_max_connections
+                    ),
+                    timeout=httpx.Timeout(
+                        settings.http_timeout_seconds,
+                        connect=settings.http_connect_timeout_seconds
+                    ),
+                    transport=httpx.AsyncHTTPTransport(retries=settings.http_max_retries),
+                    follow_redirects=True
+                )
+            return self._async_http
+
+    async def aclose(self) -> None:
+        """Close every client that was opened; safe to call more than once."""
+        with self._lock:
+            sync_clients = [self._elasticsearch, self._http_session]
+            async_clients = [self._async_elasticsearch, self._async_http]
+            self._elasticsearch = self._http_session = None
+            self._async_elasticsearch = self._async_http = None
+            self._pinecone_indexes.clear()
+        for client in sync_clients + async_clients:
+            if client is None:
+                continue
+            try:
+                if client in async_clients:
+                    await (getattr(client, "aclose", None) or client.close)()
+                else:
+                    await asyncio.to_thread(client.close)
+            except Exception as e:
+                logger.warning(f"Error closing {type(client).__name__}: {e}")
+
+_default_registry: Optional[ClientRegistry] = None
+_default_registry_lock = threading.Lock()
+
+def get_clients() -> ClientRegistry:
+    """Return the process-wide client registry."""
+    global _default_registry
+    with _default_registry_lock:
+        if _default_registry is None:
+            _default_registry = ClientRegistry()
+        return _default_registry
@@ -1,36 +1,82 @@
-from elasticsearch import Elasticsearch
-from typing import Dict, Any, List
+from elasticsearch.helpers import parallel_bulk
+from typing import Dict, Any, Iterable, Iterator, List, Optional, Sequence
+from pydantic import BaseModel
 from core.config import settings
+from core.metrics import timed
+from infrastructure.clients import get_clients
+from infrastructure.search_cache import get_search_cache, normalize_query
 import logging
+import time
 
 logger = logging.getLogger(__name__)
 
+ITEM_PROPERTIES: Dict[str, Dict[str, str]] = {
+    "id": {"type": "keyword"},
+    "name": {"type": "text"},
+    "description": {"type": "text"},
+    "styles": {"type": "keyword"},
+    "style_confidence": {"type": "float"},
+    "brand": {"type": "keyword"},
+    "category": {"type": "keyword"},
+    "size": {"type": "keyword"},
+    "color": {"type": "keyword"},
+    "price": {"type": "float"},
+    "image_url": {"type": "text"},
+    "timestamp": {"type": "date"}
+}
+
+# Analyzed fields, whose query text the result cache may case-fold
+TEXT_FIELDS = frozenset(field for field, spec in ITEM_PROPERTIES.items() if spec["type"] == "text")
+
+# Keyword fields the browse UI filters on
+FACET_FIELDS = ("brand", "category", "color", "size")
+
+# search_after needs a total order; id breaks ties between equal scores
+DEFAULT_SORT = [{"_score": "desc"}, {"id": "asc"}]
+
+class DocumentError(BaseModel):
+    """A document the bulk API rejected."""
+    id: Optional[str] = None
+    status: Optional[int] = None
+    error: str
+
+class BulkIndexReport(BaseModel):
+    """Outcome of a bulk indexing run."""
+    indexed: int = 0
+    failed: int = 0
+    errors: List[DocumentError] = []
+    elapsed_seconds: float = 0.0
+    docs_per_second: float = 0.0
+
+class SearchPage(BaseModel):
+    """One page of a ``search_after`` scroll."""
+    items: List[Dict[str, Any]]
+    total: Optional[int] = None
+    # Pass both back to get the next page; search_after is None on the last page
+    search_after: Optional[List[Any]] = None
+    pit_id: Optional[str] = None
+
 class ElasticsearchClient:
     """Client for interacting with Elasticsearch."""
     
-    def __init__(self):
-        self.client = Elasticsearch(settings.elasticsearch_url)
-        self.index_name = "fashion-items"
+    def __init__(self, index_name: str = "fashion-items", client: Any = None, async_client: Any = None):
+        # Share one pooled connection set across every index wrapper
+        self.client = client or get_clients().elasticsearch()
+        self._async_client = async_client
+        self.index_name = index_name
+        # Result cache shared by every client on this index, cleared on writes
+        self.cache = get_search_cache(index_name)
+
+    @property
+    def async_client(self) -> Any:
+        """``AsyncElasticsearch`` for the ``a*`` methods, opened on first use."""
+        if self._async_client is None:
+            self._async_client = get_clients().async_elasticsearch()
+        return self._async_client
         
     def create_index(self) -> bool:
         """Create Elasticsearch index with mapping."""
-        mapping = {
-            "mappings": {
-                "properties": {
-                    "id": {"type": "keyword"},
-                    "name": {"type": "text"},
-                    "description": {"type": "text"},
-                    "styles": {"type": "keyword"},
-                    "brand": {"type": "keyword"},
-                    "category": {"type": "keyword"},
-                    "size": {"type": "keyword"},
-                    "color": {"type": "keyword"},
-                    "price": {"type": "float"},
-                    "image_url": {"type": "text"},
-                    "timestamp": {"type": "date"}
-                }
-            }
-        }
+        mapping = {"mappings": {"properties": ITEM_PROPERTIES}}
         
         try:
             if not self.client.indices.exists(index=self.index_name):
@@ -49,19 +95,370 @@ class ElasticsearchClient:
                 body=item,
                 refresh=True
             )
+            self.cache.invalidate()
             return True
         except Exception as e:
             logger.error(f"Error indexing item: {e}")
             return False
     
-    def search_items(self, query: Dict[str, Any]) -> List[Dict[str, Any]]:
-        """Search for fashion items."""
+    def bulk_index(
+        self,
+        items: Iterable[Dict[str, Any]],
+        chunk_size: int = 500,
+        max_chunk_bytes: int = 10 * 1024 * 1024,
+        thread_count: int = 4,
+        refresh_interval: str = "-1"
+    ) -> BulkIndexReport:
+        """Index a stream of fashion items through the _bulk API.
+
+        Refresh is switched to ``refresh_interval`` (off by default) for the
+        duration of the load, then restored and followed by a single refresh.
+        Per-document failures are collected in the report instead of aborting
+        the load.
+        """
+        return self._bulk(
+            ({"_index": self.index_name, "_id": item["id"], "_source": item} for item in items),
+            chunk_size=chunk_size,
+            max_chunk_bytes=max_chunk_bytes,
+            thread_count=thread_count,
+            refresh_interval=refresh_interval
+        )
+
+    def bulk_update(
+        self,
+        updates: Iterable[Dict[str, Any]],
+        chunk_size: int = 500,
+        max_chunk_bytes: int = 10 * 1024 * 1024,
+        thread_count: int = 4,
+        refresh_interval: str = "-1",
+        upsert: bool = False
+    ) -> BulkIndexReport:
+        """Apply partial document updates through the _bulk API.
+
+        Each update is a dict with the document ``id`` plus the fields to set,
+        e.g. ``{"id": "item_123", "styles": ["streetwear"]}``. With ``upsert``,
+        missing documents are created from the update instead of failing, and
+        fields the update doesn't mention are left alone on existing ones.
+        """
+        return self._bulk(
+            (
+                {
+                    "_op_type": "update",
+                    "_index": self.index_name,
+                    "_id": update["id"],
+                    "doc": {key: value for key, value in update.items() if key != "id"},
+                    **({"doc_as_upsert": True} if upsert else {})
+                }
+                for update in updates
+            ),
+            chunk_size=chunk_size,
+            max_chunk_bytes=max_chunk_bytes,
+            thread_count=thread_count,
+            refresh_interval=refresh_interval
+        )
+
+    def bulk_delete(
+        self,
+        ids: Iterable[str],
+        chunk_size: int = 500,
+        thread_count: int = 4
+    ) -> BulkIndexReport:
+        """Delete documents by id through the _bulk API.
+
+        Documents that are already gone count as deleted.
+        """
+        return self._bulk(
+            ({"_op_type": "delete", "_index": self.index_name, "_id": doc_id} for doc_id in ids),
+            chunk_size=chunk_size,
+            max_chunk_bytes=10 * 1024 * 1024,
+            thread_count=thread_count,
+            refresh_interval=None
+        )
+
+    def _bulk(
+        self,
+        actions: Iterator[Dict[str, Any]],
+        chunk_size: int,
+        max_chunk_bytes: int,
+        thread_count: int,
+        refresh_interval: Optional[str]
+    ) -> BulkIndexReport:
+        report = BulkIndexReport()
+        started = time.perf_counter()
+        previous_interval = None
+        suspended = False
         try:
-            response = self.client.search(
-                index=self.index_name,
-                body=query
+            if refresh_interval is not None:
+                previous_interval = self.suspend_refresh(refresh_interval)
+                suspended = True
+            for ok, info in parallel_bulk(
+                self.client,
+                actions,
+                chunk_size=chunk_size,
+                max_chunk_bytes=max_chunk_bytes,
+                thread_count=thread_count,
+                raise_on_error=False,
+                raise_on_exception=False
+            ):
+                result = next(iter(info.values()), {}) if isinstance(info, dict) else {}
+                if ok or (isinstance(info, dict) and "delete" in info and result.get("status") == 404):
+                    report.indexed += 1
+                    continue
+                report.failed += 1
+                report.errors.append(DocumentError(
+                    id=result.get("_id"),
+                    status=result.get("status"),
+                    error=str(result.get("error", info))
+                ))
+        except Exception as e:
+            logger.error(f"Error bulk indexing items: {e}")
+            report.errors.append(DocumentError(error=str(e)))
+        finally:
+            if suspended:
+                self.restore_refresh(previous_interval)
+            # Even a failed load may have written some documents
+            self.cache.invalidate()
+        report.elapsed_seconds = time.perf_counter() - started
+        if report.elapsed_seconds > 0:
+            report.docs_per_second = report.indexed / report.elapsed_seconds
+        return report
+
+    def refresh(self) -> bool:
+        """Make recent writes visible to search."""
+        try:
+            self.client.indices.refresh(index=self.index_name)
+            return True
+        except Exception as e:
+            logger.error(f"Error refreshing index: {e}")
+            return False
+        finally:
+            self.cache.invalidate()
+
+    def suspend_refresh(self, refresh_interval: str = "-1") -> Optional[str]:
+        """Stop periodic refreshes for a load spanning several bulk calls.
+
+        Pass ``refresh_interval=None`` to each bulk call in between, then hand
+        the returned interval to ``restore_refresh``.
+        """
+        previous_interval = self._get_refresh_interval()
+        self._set_refresh_interval(refresh_interval)
+        return previous_interval
+
+    def restore_refresh(self, previous_interval: Optional[str]) -> None:
+        """Undo ``suspend_refresh`` and make the load visible to search."""
+        try:
+            self._set_refresh_interval(previous_interval)
+            self.client.indices.refresh(index=self.index_name)
+        except Exception as e:
+            logger.error(f"Error restoring refresh interval: {e}")
+        finally:
+            self.cache.invalidate()
+
+    def _get_refresh_interval(self) -> Optional[str]:
+        response = self.client.indices.get_settings(
+            index=self.index_name,
+            name="index.refresh_interval"
+        )
+        index_settings = response.get(self.index_name, {}).get("settings", {})
+        return index_settings.get("index", {}).get("refresh_interval")
+
+    def _set_refresh_interval(self, interval: Optional[str]) -> None:
+        # None resets the index to the cluster default
+        self.client.indices.put_settings(
+            index=self.index_name,
+            body={"index": {"refresh_interval": interval}}
+        )
+
+    def _search(self, body: Dict[str, Any]) -> Dict[str, Any]:
+        with timed("es_query"):
+            if "pit" in body:
+                # Point-in-time searches carry the index inside the PIT
+                response = self.client.search(body=body)
+            else:
+                response = self.client.search(index=self.index_name, body=body)
+        return getattr(response, "body", response)
+
+    async def _asearch(self, body: Dict[str, Any]) -> Dict[str, Any]:
+        with timed("es_query"):
+            if "pit" in body:
+                response = await self.async_client.search(body=body)
+            else:
+                response = await self.async_client.search(index=self.index_name, body=body)
+        return getattr(response, "body", response)
+
+    def _cached_search(self, kind: str, body: Dict[str, Any], ttl_seconds: float, extract) -> Any:
+        """Run ``body`` through the result cache, caching ``extract(response)``."""
+        key = normalize_query(body, TEXT_FIELDS)
+        cached = self.cache.get(kind, key)
+        if cached is not None:
+            return cached
+        generation = self.cache.generation
+        value = extract(self._search(body))
+        self.cache.set(kind, key, value, ttl_seconds, generation)
+        return value
+
+    async def _acached_search(self, kind: str, body: Dict[str, Any], ttl_seconds: float, extract) -> Any:
+        """``_cached_search`` over the async client; shares the same cache."""
+        key = normalize_query(body, TEXT_FIELDS)
+        cached = self.cache.get(kind, key)
+        if cached is not None:
+            return cached
+        generation = self.cache.generation
+        value = extract(await self._asearch(body))
+        self.cache.set(kind, key, value, ttl_seconds, generation)
+        return value
+
+    @staticmethod
+    def _body(query: Dict[str, Any], size: Optional[int] = None, fields: Optional[Sequence[str]] = None) -> Dict[str, Any]:
+        body = dict(query)
+        if size is not None:
+            body["size"] = size
+        if fields is not None:
+            body["_source"] = list(fields)
+        return body
+
+    def search_hits(self, query: Dict[str, Any], use_cache: bool = True) -> List[Dict[str, Any]]:
+        """Search for fashion items, returning raw hits with ``_id`` and ``_score``.
+
+        Identical queries, after normalization, are answered from the result
+        cache for ``es_query_cache_ttl_seconds`` or until the next write.
+        """
+        try:
+            if not use_cache:
+                return self._search(query)["hits"]["hits"]
+            return self._cached_search(
+                "hits", query, settings.es_query_cache_ttl_seconds, lambda response: response["hits"]["hits"]
             )
-            return [hit["_source"] for hit in response["hits"]["hits"]]
         except Exception as e:
             logger.error(f"Error searching items: {e}")
             return []
+
+    async def asearch_hits(self, query: Dict[str, Any], use_cache: bool = True) -> List[Dict[str, Any]]:
+        """``search_hits`` on the async client, for callers on the event loop."""
+        try:
+            if not use_cache:
+                return (await self._asearch(query))["hits"]["hits"]
+            return await self._acached_search(
+                "hits", query, settings.es_query_cache_ttl_seconds, lambda response: response["hits"]["hits"]
+            )
+        except Exception as e:
+            logger.error(f"Error searching items: {e}")
+            return []
+
+    def search_items(
+        self,
+        query: Dict[str, Any],
+        size: Optional[int] = None,
+        fields: Optional[Sequence[str]] = None,
+        use_cache: bool = True
+    ) -> List[Dict[str, Any]]:
+        """Search for fashion items.
+
+        ``size`` overrides the number of hits and ``fields`` limits each
+        returned document to those ``_source`` fields.
+        """
+        body = self._body(query, size=size, fields=fields)
+        return [hit.get("_source", {}) for hit in self.search_hits(body, use_cache=use_cache)]
+
+    def search_page(
+        self,
+        query: Dict[str, Any],
+        size: int = 20,
+        fields: Optional[Sequence[str]] = None,
+        sort: Optional[List[Any]] = None,
+        search_after: Optional[List[Any]] = None,
+        pit_id: Optional[str] = None
+    ) -> SearchPage:
+        """Fetch one page of results, continuing from ``search_after``.
+
+        Unlike ``from``/``size`` paging, the cost per page stays flat however
+        deep the caller scrolls. Pass a ``pit_id`` from ``open_point_in_time``
+        to page through a consistent snapshot. Pages are not cached, and
+        errors are raised rather than ending the scroll early.
+        """
+        body = self._body(query, size=size, fields=fields)
+        body.pop("from", None)
+        body["sort"] = sort or body.get("sort") or DEFAULT_SORT
+        if search_after is not None:
+            body["search_after"] = search_after
+        if pit_id is not None:
+            body["pit"] = {"id": pit_id, "keep_alive": settings.es_pit_keep_alive}
+        response = self._search(body)
+        hits = response["hits"]["hits"]
+        total = response["hits"].get("total")
+        return SearchPage(
+            items=[hit.get("_source", {}) for hit in hits],
+            total=total.get("value") if isinstance(total, dict) else total,
+            search_after=hits[-1].get("sort") if len(hits) == size else None,
+            pit_id=response.get("pit_id", pit_id)
+        )
+
+    def open_point_in_time(self) -> str:
+        """Open a point-in-time snapshot of the index for ``search_page``."""
+        response = self.client.open_point_in_time(index=self.index_name, keep_alive=settings.es_pit_keep_alive)
+        return response["id"]
+
+    def close_point_in_time(self, pit_id: str) -> None:
+        try:
+            self.client.close_point_in_time(body={"id": pit_id})
+        except Exception as e:
+            logger.warning(f"Error closing point in time: {e}")
+
+    def scroll_items(
+        self,
+        query: Dict[str, Any],
+        page_size: int = 500,
+        fields: Optional[Sequence[str]] = None,
+        sort: Optional[List[Any]] = None
+    ) -> Iterator[Dict[str, Any]]:
+        """Iterate over every matching item from one point-in-time snapshot."""
+        pit_id = self.open_point_in_time()
+        try:
+            search_after = None
+            while True:
+                page = self.search_page(
+                    query, size=page_size, fields=fields, sort=sort, search_after=search_after, pit_id=pit_id
+                )
+                pit_id = page.pit_id or pit_id
+                yield from page.items
+                if page.search_after is None:
+                    return
+                search_after = page.search_after
+        finally:
+            self.close_point_in_time(pit_id)
+
+    def facet_counts(
+        self,
+        query: Optional[Dict[str, Any]] = None,
+        fields: Sequence[str] = FACET_FIELDS,
+        size: int = 20
+    ) -> Dict[str, List[Dict[str, Any]]]:
+        """Count matching items per value of each facet field.
+
+        ``query`` is a query clause (what goes under ``"query"``) to scope the
+        counts, e.g. the browse filters. Returns ``{field: [{"value": ...,
+        "count": ...}, ...]}``, most common first. Results are cached for
+        ``es_facet_cache_ttl_seconds`` or until the next write.
+        """
+        body: Dict[str, Any] = {
+            "size": 0,
+            "aggs": {field: {"terms": {"field": field, "size": size}} for field in fields}
+        }
+        if query is not None:
+            body["query"] = query
+
+        def extract(response: Dict[str, Any]) -> Dict[str, List[Dict[str, Any]]]:
+            aggregations = response.get("aggregations", {})
+            return {
+                field: [
+                    {"value": bucket["key"], "count": bucket["doc_count"]}
+                    for bucket in aggregations.get(field, {}).get("buckets", [])
+                ]
+                for field in fields
+            }
+
+        try:
+            return self._cached_search("facets", body, settings.es_facet_cache_ttl_seconds, extract)
+        except Exception as e:
+            logger.error(f"Error counting facets: {e}")
+            return {}
@@ -0,0 +1,154 @@
+import asyncio
+from typing import Dict, Any, List, Optional, Sequence
+from pydantic import BaseModel
+from infrastructure.elasticsearch_client import ElasticsearchClient
+from infrastructure.vector_store import VectorStore
+import logging
+
+logger = logging.getLogger(__name__)
+
+class SearchFilters(BaseModel):
+    """Structured filters applied to both retrievers before ranking."""
+    category: Optional[str] = None
+    brand: Optional[str] = None
+    min_price: Optional[float] = None
+    max_price: Optional[float] = None
+
+    def to_es(self) -> List[Dict[str, Any]]:
+        """Build ``bool.filter`` clauses over the fashion-items mapping."""
+        clauses = []
+        if self.category:
+            clauses.append({"term": {"category": self.category}})
+        if self.brand:
+            clauses.append({"term": {"brand": self.brand}})
+        price = {}
+        if self.min_price is not None:
+            price["gte"] = self.min_price
+        if self.max_price is not None:
+            price["lte"] = self.max_price
+        if price:
+            clauses.append({"range": {"price": price}})
+        return clauses
+
+    def to_vector(self) -> Optional[Dict[str, Any]]:
+        """Build the equivalent metadata filter for the vector store."""
+        clauses = {}
+        if self.category:
+            clauses["category"] = {"$eq": self.category}
+        if self.brand:
+            clauses["brand"] = {"$eq": self.brand}
+        price = {}
+        if self.min_price is not None:
+            price["$gte"] = self.min_price
+        if self.max_price is not None:
+            price["$lte"] = self.max_price
+        if price:
+            clauses["price"] = price
+        return clauses or None
+
+class HybridRetriever:
+    """Fuses Elasticsearch BM25 results with vector similarity results.
+
+    Both retrievers run concurrently, so latency is the slower of the two
+    rather than their sum: the text query goes through the async
+    Elasticsearch client, and the vector query, which has no async client,
+    runs in a worker thread. Filters are pushed down into each query, which
+    requires vectors to carry ``category``/``brand``/``price`` metadata.
+    Results are merged by item ``id`` using reciprocal rank fusion
+    (``fusion="rrf"``) or a weighted sum of min-max normalized scores
+    (``fusion="weighted"``).
+    """
+
+    def __init__(
+        self,
+        es_client: ElasticsearchClient,
+        vector_store: VectorStore,
+        fusion: str = "rrf",
+        rrf_k: int = 60,
+        text_weight: float = 0.5,
+        vector_weight: float = 0.5,
+        candidates: int = 50
+    ):
+        if fusion not in ("rrf", "weighted"):
+            raise ValueError(f"Unknown fusion method: {fusion}")
+        self.es_client = es_client
+        self.vector_store = vector_store
+        self.fusion = fusion
+        self.rrf_k = rrf_k
+        self.text_weight = text_weight
+        self.vector_weight = vector_weight
+        self.candidates = candidates
+
+    async def search(
+        self,
+        text: Optional[str] = None,
+        query_vector: Optional[Sequence[float]] = None,
+        filters: Optional[SearchFilters] = None,
+        k: int = 10
+    ) -> List[Dict[str, Any]]:
+        """Run text and vector retrieval in parallel and return fused results."""
+        filters = filters or SearchFilters()
+        text_task = self._text_search(text, filters) if text else _no_results()
+        vector_task = self._vector_search(query_vector, filters) if query_vector is not None else _no_results()
+        text_hits, vector_hits = await asyncio.gather(text_task, vector_task)
+        return self._fuse(text_hits, vector_hits)[:k]
+
+    async def _text_search(self, text: str, filters: SearchFilters) -> List[Dict[str, Any]]:
+        query = {
+            "size": self.candidates,
+            "query": {
+                "bool": {
+                    "must": [{"multi_match": {"query": text, "fields": ["name^2", "description"]}}],
+                    "filter": filters.to_es()
+                }
+            }
+        }
+        hits = await self.es_client.asearch_hits(query)
+        return [
+            {"id": hit["_source"].get("id", hit["_id"]), "score": hit["_score"], "item": hit["_source"]}
+            for hit in hits
+        ]
+
+    async def _vector_search(self, query_vector: Sequence[float], filters: SearchFilters) -> List[Dict[str, Any]]:
+        matches = await asyncio.to_thread(
+            self.vector_store.similarity_search,
+            query_vector,
+            self.candidates,
+            filters.to_vector()
+        )
+        return [
+            {"id": match["id"], "score": match["score"], "item": match.get("metadata") or {}}
+            for match in matches
+        ]
+
+    def _fuse(self, text_hits: List[Dict[str, Any]], vector_hits: List[Dict[str, Any]]) -> List[Dict[str, Any]]:
+        fused: Dict[str, Dict[str, Any]] = {}
+        for source, hits, weight in (
+            ("text", text_hits, self.text_weight),
+            ("vector", vector_hits, self.vector_weight)
+        ):
+            normalized = _min_max([hit["score"] for hit in hits])
+            for rank, (hit, norm_score) in enumerate(zip(hits, normalized), start=1):
+                entry = fused.get(hit["id"])
+                if entry is None:
+                    # Text hits are merged first, so ES documents win over vector metadata
+                    entry = fused[hit["id"]] = {"id": hit["id"], "score": 0.0, "item": hit["item"]}
+                if f"{source}_rank" in entry:
+                    continue  # Duplicate id within one result list
+                entry[f"{source}_rank"] = rank
+                if self.fusion == "rrf":
+                    entry["score"] += 1.0 / (self.rrf_k + rank)
+                else:
+                    entry["score"] += weight * norm_score
+        return sorted(fused.values(), key=lambda entry: entry["score"], reverse=True)
+
+async def _no_results() -> List[Dict[str, Any]]:
+    return []
+
+def _min_max(scores: List[float]) -> List[float]:
+    if not scores:
+        return []
+    low, high = min(scores), max(scores)
+    if high == low:
+        return [1.0] * len(scores)
+    return [(score - low) / (high - low) for score in scores]
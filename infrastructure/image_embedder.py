@@ -0,0 +1,276 @@
+import asyncio
+import hashlib
+import logging
+import threading
+from collections import OrderedDict
+from concurrent.futures import ThreadPoolExecutor
+from io import BytesIO
+from typing import Any, List, Optional, Sequence, Union
+
+import numpy as np
+import requests
+from PIL import Image
+
+from core.config import settings
+from core.metrics import timed
+from infrastructure.clients import get_clients
+
+logger = logging.getLogger(__name__)
+
+ImageSource = Union[str, bytes, Image.Image]
+
+# Bump whenever the features or the reduction below change, so stored
+# vectors made the old way can be told apart and re-embedded
+PROJECTION_VERSION = "cls-meanpool-v1"
+
+def pooling_projection(hidden_size: int, dimension: int) -> np.ndarray:
+    """Matrix mapping ``hidden_size`` features to ``dimension`` by fixed-stride pooling.
+
+    Output ``j`` averages input features ``[j * hidden_size // dimension,
+    (j + 1) * hidden_size // dimension)``; when ``dimension`` is the larger,
+    each output copies input ``j * hidden_size // dimension`` instead. Equal
+    sizes give the identity.
+    """
+    projection = np.zeros((hidden_size, dimension), dtype=np.float32)
+    for j in range(dimension):
+        start = j * hidden_size // dimension
+        stop = max((j + 1) * hidden_size // dimension, start + 1)
+        projection[start:stop, j] = 1.0 / (stop - start)
+    return projection
+
+class ImageTooLargeError(ValueError):
+    """Raised when a fetched image exceeds the configured size cap."""
+
+class ImageEmbedder:
+    """Turns images into L2-normalized vectors for the vector store.
+
+    Uses the CLS token of the ViT fashion classifier's final hidden state (the
+    same features its classification head sees). The hidden size is mapped to
+    ``dimension`` by averaging contiguous runs of features (see
+    ``pooling_projection``), which involves no RNG, so vectors stay comparable
+    across processes, restarts and NumPy releases; ``projection_version``
+    names that scheme. Embeddings are cached by image
+    URL and by content hash, and ``embed_many`` runs one forward pass for all
+    cache misses.
+    """
+
+    projection_version = PROJECTION_VERSION
+
+    def __init__(
+        self,
+        model_name: Optional[str] = None,
+        dimension: Optional[int] = None,
+        extractor: Any = None,
+        model: Any = None,
+        session: Optional[requests.Session] = None,
+        async_session: Any = None,
+        fetch_timeout: Optional[float] = None,
+        max_image_bytes: Optional[int] = None,
+        cache_size: Optional[int] = None,
+        fetch_workers: int = 8
+    ):
+        self.model_name = model_name or settings.embedding_model
+        self.dimension = dimension or settings.vector_store_dimension
+        self.fetch_timeout = fetch_timeout or settings.image_fetch_timeout
+        self.max_image_bytes = max_image_bytes or settings.max_image_size * 1024
+        self.cache_size = cache_size or settings.embedding_cache_size
+        self.fetch_workers = fetch_workers
+        self.session = session or get_clients().http_session()
+        self._async_session = async_session
+        # Pass an already-loaded extractor/model (e.g. the backend's) to share weights
+        self._extractor = extractor
+        self._model = model
+        self._projection: Optional[np.ndarray] = None
+        self._load_lock = threading.Lock()
+        self._cache_lock = threading.Lock()
+        self._by_hash: "OrderedDict[str, np.ndarray]" = OrderedDict()
+        self._url_to_hash: "OrderedDict[str, str]" = OrderedDict()
+
+    def _load(self) -> None:
+        with self._load_lock:
+            if self._model is None:
+                from transformers import AutoFeatureExtractor, AutoModelForImageClassification
+                self._extractor = AutoFeatureExtractor.from_pretrained(self.model_name)
+                self._model = AutoModelForImageClassification.from_pretrained(self.model_name)
+                self._model.eval()
+            if self._projection is None:
+                self._projection = pooling_projection(self._model.config.hidden_size, self.dimension)
+
+    def fetch(self, url: str) -> bytes:
+        """Download an image through the pooled session, enforcing timeout and size cap."""
+        with self.session.get(url, timeout=self.fetch_timeout, stream=True) as response:
+            response.raise_for_status()
+            declared = response.headers.get("Content-Length")
+            if declared and int(declared) > self.max_image_bytes:
+                raise ImageTooLargeError(f"{url} is {declared} bytes, limit is {self.max_image_bytes}")
+            chunks = []
+            size = 0
+            for chunk in response.iter_content(chunk_size=64 * 1024):
+                size += len(chunk)
+                if size > self.max_image_bytes:
+                    raise ImageTooLargeError(f"{url} exceeds {self.max_image_bytes} bytes")
+                chunks.append(chunk)
+        return b"".join(chunks)
+
+    async def afetch(self, url: str) -> bytes:
+        """``fetch`` through the shared async HTTP client, for callers on the event loop."""
+        if self._async_session is None:
+            self._async_session = get_clients().async_http()
+        async with self._async_session.stream("GET", url, timeout=self.fetch_timeout) as response:
+            response.raise_for_status()
+            declared = response.headers.get("Content-Length")
+            if declared and int(declared) > self.max_image_bytes:
+                raise ImageTooLargeError(f"{url} is {declared} bytes, limit is {self.max_image_bytes}")
+            chunks = []
+            size = 0
+            async for chunk in response.aiter_bytes(64 * 1024):
+                size += len(chunk)
+                if size > self.max_image_bytes:
+                    raise ImageTooLargeError(f"{url} exceeds {self.max_image_bytes} bytes")
+                chunks.append(chunk)
+        return b"".join(chunks)
+
+    def _decode(self, data: bytes) -> Image.Image:
+        image = Image.open(BytesIO(data))
+        # Decode JPEGs at reduced scale; the extractor resizes to 224px anyway
+        image.draft("RGB", (448, 448))
+        return image.convert("RGB")
+
+    def embed_images(self, images: Sequence[Image.Image]) -> np.ndarray:
+        """Embed decoded images in a single batched forward pass."""
+        import torch
+        self._load()
+        with timed("preprocess"):
+            inputs = self._extractor(images=list(images), return_tensors="pt")
+        with timed("model_forward"), torch.no_grad():
+            hidden = self._model.base_model(pixel_values=inputs["pixel_values"]).last_hidden_state
+        features = hidden[:, 0].numpy().astype(np.float32) @ self._projection
+        norms = np.linalg.norm(features, axis=1, keepdims=True)
+        return features / np.maximum(norms, 1e-12)
+
+    def embed_many(self, sources: Sequence[ImageSource]) -> np.ndarray:
+        """Embed URLs, raw bytes or PIL images, reusing cached vectors.
+
+        URLs are fetched concurrently; all uncached images then go through one
+        batched forward pass. Returns an array of shape ``(len(sources), dimension)``
+        and raises the first fetch or decode error; use ``embed_each`` to
+        skip bad images instead.
+        """
+        results = self.embed_each(sources)
+        for result in results:
+            if isinstance(result, Exception):
+                raise result
+        return np.stack(results) if results else np.zeros((0, self.dimension), dtype=np.float32)
+
+    def embed_each(self, sources: Sequence[ImageSource]) -> List[Union[np.ndarray, Exception]]:
+        """Like ``embed_many``, but one bad image doesn't fail the rest.
+
+        Returns, per source, its vector or the exception raised fetching or
+        decoding it. A failed forward pass still raises for the whole batch.
+        """
+        results: List[Union[np.ndarray, Exception, None]] = [None] * len(sources)
+        urls_to_fetch = {}
+        for i, source in enumerate(sources):
+            if isinstance(source, str):
+                cached = self._cached_for_url(source)
+                if cached is not None:
+                    results[i] = cached
+                else:
+                    urls_to_fetch.setdefault(source, []).append(i)
+
+        fetched = {}
+        if urls_to_fetch:
+            with ThreadPoolExecutor(max_workers=self.fetch_workers) as executor:
+                fetched = dict(zip(urls_to_fetch, executor.map(self._try_fetch, urls_to_fetch)))
+
+        pending = OrderedDict()  # content hash -> (image, indices)
+        undecodable = {}  # content hash -> decode error
+        for i, source in enumerate(sources):
+            if results[i] is not None:
+                continue
+            if isinstance(source, Image.Image):
+                # Decoded images have no stable bytes to hash; embed them uncached
+                pending[f"image:{i}"] = (source, [i])
+                continue
+            data = fetched[source] if isinstance(source, str) else source
+            if isinstance(data, Exception):
+                results[i] = data
+                continue
+            content_hash = hashlib.sha256(data).hexdigest()
+            if isinstance(source, str):
+                self._remember_url(source, content_hash)
+            cached = self._cached_for_hash(content_hash)
+            if cached is not None:
+                results[i] = cached
+            elif content_hash in pending:
+                pending[content_hash][1].append(i)
+            elif content_hash in undecodable:
+                results[i] = undecodable[content_hash]
+            else:
+                try:
+                    pending[content_hash] = (self._decode(data), [i])
+                except Exception as e:
+                    logger.warning(f"Skipping undecodable image {content_hash[:12]}: {e}")
+                    undecodable[content_hash] = results[i] = e
+
+        if pending:
+            embedded = self.embed_images([image for image, _ in pending.values()])
+            for (content_hash, (_, indices)), vector in zip(pending.items(), embedded):
+                if not content_hash.startswith("image:"):
+                    self._remember_hash(content_hash, vector)
+                for i in indices:
+                    results[i] = vector
+        return results
+
+    def _try_fetch(self, url: str) -> Union[bytes, Exception]:
+        try:
+            return self.fetch(url)
+        except Exception as e:
+            logger.warning(f"Error fetching image {url}: {e}")
+            return e
+
+    def embed_url(self, url: str) -> np.ndarray:
+        """Embed a single image URL."""
+        return self.embed_many([url])[0]
+
+    async def aembed_url(self, url: str) -> np.ndarray:
+        """Embed a single image URL, downloading it without blocking the event loop.
+
+        The forward pass still runs in a worker thread.
+        """
+        cached = self._cached_for_url(url)
+        if cached is not None:
+            return cached
+        data = await self.afetch(url)
+        vector = (await asyncio.to_thread(self.embed_many, [data]))[0]
+        self._remember_url(url, hashlib.sha256(data).hexdigest())
+        return vector
+
+    def _cached_for_url(self, url: str) -> Optional[np.ndarray]:
+        with self._cache_lock:
+            content_hash = self._url_to_hash.get(url)
+            if content_hash is None:
+                return None
+            self._url_to_hash.move_to_end(url)
+        return self._cached_for_hash(content_hash)
+
+    def _cached_for_hash(self, content_hash: str) -> Optional[np.ndarray]:
+        with self._cache_lock:
+            vector = self._by_hash.get(content_hash)
+            if vector is not None:
+                self._by_hash.move_to_end(content_hash)
+            return vector
+
+    def _remember_url(self, url: str, content_hash: str) -> None:
+        with self._cache_lock:
+            self._url_to_hash[url] = content_hash
+            self._url_to_hash.move_to_end(url)
+            while len(self._url_to_hash) > self.cache_size:
+                self._url_to_hash.popitem(last=False)
+
+    def _remember_hash(self, content_hash: str, vector: np.ndarray) -> None:
+        with self._cache_lock:
+            self._by_hash[content_hash] = vector
+            self._by_hash.move_to_end(content_hash)
+            while len(self._by_hash) > self.cache_size:
+                self._by_hash.popitem(last=False)
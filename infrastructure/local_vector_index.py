@@ -0,0 +1,399 @@
+import json
+import logging
+import os
+import threading
+from typing import Any, Dict, Iterable, List, Optional, Sequence
+
+import numpy as np
+
+logger = logging.getLogger(__name__)
+
+METRICS = ("cosine", "dotproduct")
+
+
+def _save_array(path: str, name: str, array: np.ndarray) -> None:
+    # Write beside the target and rename, so a live memory map of the old
+    # file is never truncated underneath a running index
+    tmp_path = os.path.join(path, f"{name}.tmp")
+    with open(tmp_path, "wb") as f:
+        np.save(f, array)
+    os.replace(tmp_path, os.path.join(path, name))
+
+
+def matches_filter(metadata: Dict[str, Any], filter: Dict[str, Any]) -> bool:
+    """Evaluate a Pinecone-style metadata filter against one record.
+
+    Supports ``$and``/``$or`` plus the ``$eq``, ``$ne``, ``$in``, ``$nin``,
+    ``$gt``, ``$gte``, ``$lt`` and ``$lte`` operators; a bare value means
+    ``$eq``. List values match ``$eq``/``$in`` on any element and
+    ``$ne``/``$nin`` only when no element matches:
+
+    >>> styles = {"styles": ["boho", "casual"]}
+    >>> matches_filter(styles, {"styles": "boho"})
+    True
+    >>> matches_filter(styles, {"styles": {"$ne": "boho"}})
+    False
+    >>> matches_filter(styles, {"styles": {"$nin": ["boho"]}})
+    False
+    >>> matches_filter(styles, {"styles": {"$nin": ["goth", "punk"]}})
+    True
+    """
+    for key, condition in filter.items():
+        if key == "$and":
+            if not all(matches_filter(metadata, clause) for clause in condition):
+                return False
+        elif key == "$or":
+            if not any(matches_filter(metadata, clause) for clause in condition):
+                return False
+        else:
+            if not isinstance(condition, dict):
+                condition = {"$eq": condition}
+            value = metadata.get(key)
+            for op, operand in condition.items():
+                if not _compare(op, value, operand):
+                    return False
+    return True
+
+
+def _compare(op: str, value: Any, operand: Any) -> bool:
+    # List-valued metadata (e.g. styles) matches $eq/$in if any element
+    # does, and $ne/$nin only if no element does, as Pinecone evaluates them
+    if isinstance(value, list) and op in ("$eq", "$in"):
+        return any(_compare(op, element, operand) for element in value)
+    if isinstance(value, list) and op in ("$ne", "$nin"):
+        return all(_compare(op, element, operand) for element in value)
+    if op == "$eq":
+        return value == operand
+    if op == "$ne":
+        return value != operand
+    if op == "$in":
+        return value in operand
+    if op == "$nin":
+        return value not in operand
+    if value is None:
+        return False
+    if op == "$gt":
+        return value > operand
+    if op == "$gte":
+        return value >= operand
+    if op == "$lt":
+        return value < operand
+    if op == "$lte":
+        return value <= operand
+    raise ValueError(f"Unsupported filter operator: {op}")
+
+
+class ExactVectorIndex:
+    """In-process vector index with exact top-k search.
+
+    Vectors are kept in one contiguous float32 matrix, so a query is a single
+    matrix product. Accepts and returns records in the same shape as Pinecone
+    (``id``/``values``/``metadata`` in, ``id``/``score``/``metadata`` out).
+    """
+
+    kind = "exact"
+
+    def __init__(self, dimension: int, metric: str = "cosine", initial_capacity: int = 1024):
+        if metric not in METRICS:
+            raise ValueError(f"Unsupported metric {metric!r}, expected one of {METRICS}")
+        self.dimension = dimension
+        self.metric = metric
+        self._vectors = np.zeros((initial_capacity, dimension), dtype=np.float32)
+        self._ids: List[str] = []
+        self._metadata: List[Dict[str, Any]] = []
+        self._rows: Dict[str, int] = {}
+        self._lock = threading.RLock()
+
+    def __len__(self) -> int:
+        return len(self._ids)
+
+    def upsert(self, vectors: Iterable[Any]) -> int:
+        """Insert or replace vectors; returns how many records were written."""
+        records = [self._coerce(record) for record in vectors]
+        if not records:
+            return 0
+        values = self._prepare(np.asarray([r[1] for r in records], dtype=np.float32))
+        with self._lock:
+            for (vector_id, _, metadata), row_values in zip(records, values):
+                row = self._rows.get(vector_id)
+                if row is None:
+                    row = len(self._ids)
+                    self._ensure_capacity(row + 1)
+                    self._ids.append(vector_id)
+                    self._metadata.append(metadata)
+                    self._rows[vector_id] = row
+                else:
+                    self._metadata[row] = metadata
+                self._vectors[row] = row_values
+                self._on_row_written(row)
+        return len(records)
+
+    def delete(self, ids: Iterable[str]) -> int:
+        """Remove vectors by id; returns how many were present."""
+        deleted = 0
+        with self._lock:
+            for vector_id in ids:
+                row = self._rows.pop(vector_id, None)
+                if row is None:
+                    continue
+                last = len(self._ids) - 1
+                if row != last:
+                    # Move the last row into the hole to keep the matrix dense
+                    self._vectors[row] = self._vectors[last]
+                    self._ids[row] = self._ids[last]
+                    self._metadata[row] = self._metadata[last]
+                    self._rows[self._ids[row]] = row
+                    self._on_row_moved(last, row)
+                self._ids.pop()
+                self._metadata.pop()
+                deleted += 1
+        return deleted
+
+    def fetch(self, ids: Iterable[str]) -> Dict[str, Dict[str, Any]]:
+        """Return stored ``values``/``metadata`` by id; unknown ids are skipped."""
+        with self._lock:
+            return {
+                vector_id: {"values": np.array(self._vectors[row]), "metadata": self._metadata[row]}
+                for vector_id, row in ((i, self._rows.get(i)) for i in ids)
+                if row is not None
+            }
+
+    def query(
+        self,
+        vector: Sequence[float],
+        top_k: int = 5,
+        include_metadata: bool = True,
+        filter: Optional[Dict[str, Any]] = None,
+    ) -> List[Dict[str, Any]]:
+        """Return the ``top_k`` closest vectors to ``vector``."""
+        return self.query_many([vector], top_k=top_k, include_metadata=include_metadata, filter=filter)[0]
+
+    def query_many(
+        self,
+        vectors: Sequence[Sequence[float]],
+        top_k: int = 5,
+        include_metadata: bool = True,
+        filter: Optional[Dict[str, Any]] = None,
+    ) -> List[List[Dict[str, Any]]]:
+        """Answer several queries with one matrix product.
+
+        ``filter`` uses Pinecone's metadata filter syntax and is applied
+        before ranking, so every query still gets up to ``top_k`` matches.
+        """
+        queries = self._prepare(np.atleast_2d(np.asarray(vectors, dtype=np.float32)))
+        with self._lock:
+            if not self._ids:
+                return [[] for _ in range(len(queries))]
+            allowed = None
+            if filter:
+                allowed = np.flatnonzero([matches_filter(metadata, filter) for metadata in self._metadata])
+            return [
+                self._matches(rows, scores, include_metadata)
+                for rows, scores in self._search(queries, top_k, allowed)
+            ]
+
+    def _search(self, queries: np.ndarray, top_k: int, allowed: Optional[np.ndarray] = None):
+        rows = np.arange(len(self._ids)) if allowed is None else allowed
+        if len(rows) == 0:
+            for _ in queries:
+                yield rows, np.zeros(0, dtype=np.float32)
+            return
+        matrix = self._vectors[:len(self._ids)] if allowed is None else self._vectors[allowed]
+        scores = queries @ matrix.T
+        for row_scores in scores:
+            yield self._top_k(rows, row_scores, top_k)
+
+    @staticmethod
+    def _top_k(rows: np.ndarray, scores: np.ndarray, top_k: int):
+        if len(scores) > top_k:
+            best = np.argpartition(-scores, top_k - 1)[:top_k]
+            rows, scores = rows[best], scores[best]
+        order = np.argsort(-scores, kind="stable")
+        return rows[order], scores[order]
+
+    def _matches(self, rows: np.ndarray, scores: np.ndarray, include_metadata: bool) -> List[Dict[str, Any]]:
+        matches = []
+        for row, score in zip(rows, scores):
+            match = {"id": self._ids[row], "score": float(score)}
+            if include_metadata:
+                match["metadata"] = self._metadata[row]
+            matches.append(match)
+        return matches
+
+    def _coerce(self, record: Any):
+        if isinstance(record, dict):
+            vector_id, values, metadata = record["id"], record["values"], record.get("metadata")
+        else:
+            vector_id, values, *rest = record
+            metadata = rest[0] if rest else None
+        if len(values) != self.dimension:
+            raise ValueError(f"Vector {vector_id!r} has dimension {len(values)}, expected {self.dimension}")
+        return str(vector_id), values, dict(metadata or {})
+
+    def _prepare(self, values: np.ndarray) -> np.ndarray:
+        if self.metric == "cosine":
+            norms = np.linalg.norm(values, axis=1, keepdims=True)
+            values = values / np.maximum(norms, 1e-12)
+        return values
+
+    def _ensure_capacity(self, size: int) -> None:
+        capacity = len(self._vectors)
+        if size <= capacity:
+            return
+        grown = np.zeros((max(size, capacity * 2, 64), self.dimension), dtype=np.float32)
+        grown[:len(self._ids)] = self._vectors[:len(self._ids)]
+        self._vectors = grown
+
+    def _on_row_written(self, row: int) -> None:
+        pass
+
+    def _on_row_moved(self, source: int, target: int) -> None:
+        pass
+
+    def _params(self) -> Dict[str, Any]:
+        return {"kind": self.kind, "dimension": self.dimension, "metric": self.metric}
+
+    def _save_extra(self, path: str) -> None:
+        pass
+
+    def _load_extra(self, path: str, mmap_mode: Optional[str]) -> None:
+        pass
+
+    def save(self, path: str) -> None:
+        """Write the index to a directory of ``.npy`` files plus JSON metadata."""
+        os.makedirs(path, exist_ok=True)
+        with self._lock:
+            _save_array(path, "vectors.npy", self._vectors[:len(self._ids)])
+            tmp_path = os.path.join(path, "records.json.tmp")
+            with open(tmp_path, "w") as f:
+                json.dump({"params": self._params(), "ids": self._ids, "metadata": self._metadata}, f)
+            os.replace(tmp_path, os.path.join(path, "records.json"))
+            self._save_extra(path)
+
+    @classmethod
+    def load(cls, path: str, mmap: bool = True) -> "ExactVectorIndex":
+        """Load an index written by ``save``.
+
+        With ``mmap`` the vector matrix is memory-mapped copy-on-write, so a
+        restart only pages in what queries touch and never re-ingests.
+        """
+        with open(os.path.join(path, "records.json")) as f:
+            records = json.load(f)
+        params = dict(records["params"])
+        kind = params.pop("kind")
+        index_cls = {"exact": ExactVectorIndex, "ivf": IVFVectorIndex}[kind]
+        index = index_cls(initial_capacity=0, **params)
+        mmap_mode = "c" if mmap else None
+        index._vectors = np.load(os.path.join(path, "vectors.npy"), mmap_mode=mmap_mode)
+        index._ids = records["ids"]
+        index._metadata = records["metadata"]
+        index._rows = {vector_id: row for row, vector_id in enumerate(index._ids)}
+        index._load_extra(path, mmap_mode)
+        return index
+
+
+class IVFVectorIndex(ExactVectorIndex):
+    """Approximate index using an inverted file over k-means clusters.
+
+    Each vector is assigned to its nearest centroid. A query scores the
+    centroids first and then only the vectors in the ``n_probe`` closest
+    clusters. Until the index holds ``train_threshold`` vectors it falls back
+    to exact search, and it trains itself lazily once that size is reached.
+    """
+
+    kind = "ivf"
+
+    def __init__(
+        self,
+        dimension: int,
+        metric: str = "cosine",
+        n_lists: int = 256,
+        n_probe: int = 8,
+        train_threshold: int = 10000,
+        initial_capacity: int = 1024,
+    ):
+        super().__init__(dimension, metric, initial_capacity)
+        self.n_lists = n_lists
+        self.n_probe = n_probe
+        self.train_threshold = train_threshold
+        self._centroids: Optional[np.ndarray] = None
+        self._assignments = np.zeros(initial_capacity, dtype=np.int32)
+
+    @property
+    def trained(self) -> bool:
+        return self._centroids is not None
+
+    def train(self, iterations: int = 10, sample_size: Optional[int] = None, seed: int = 0) -> None:
+        """Fit centroids with k-means on a sample and assign every vector."""
+        with self._lock:
+            size = len(self._ids)
+            if size == 0:
+                return
+            rng = np.random.default_rng(seed)
+            n_lists = min(self.n_lists, size)
+            sample_size = min(size, sample_size or n_lists * 64)
+            sample = np.asarray(self._vectors[rng.choice(size, sample_size, replace=False)])
+            centroids = sample[rng.choice(sample_size, n_lists, replace=False)].copy()
+            for _ in range(iterations):
+                labels = np.argmax(sample @ centroids.T, axis=1)
+                for cluster in range(n_lists):
+                    members = sample[labels == cluster]
+                    if len(members):
+                        centroids[cluster] = members.mean(axis=0)
+                centroids = self._prepare(centroids)
+            self._centroids = centroids.astype(np.float32)
+            self._assignments = np.zeros(len(self._vectors), dtype=np.int32)
+            self._assign(np.arange(size))
+
+    def _assign(self, rows: np.ndarray) -> None:
+        for start in range(0, len(rows), 8192):
+            chunk = rows[start:start + 8192]
+            self._assignments[chunk] = np.argmax(self._vectors[chunk] @ self._centroids.T, axis=1)
+
+    def _on_row_written(self, row: int) -> None:
+        if len(self._assignments) < len(self._vectors):
+            grown = np.zeros(len(self._vectors), dtype=np.int32)
+            grown[:len(self._assignments)] = self._assignments
+            self._assignments = grown
+        if self.trained:
+            self._assign(np.array([row]))
+
+    def _on_row_moved(self, source: int, target: int) -> None:
+        self._assignments[target] = self._assignments[source]
+
+    def _search(self, queries: np.ndarray, top_k: int, allowed: Optional[np.ndarray] = None):
+        size = len(self._ids)
+        if not self.trained and size >= self.train_threshold:
+            self.train()
+        candidates = size if allowed is None else len(allowed)
+        if not self.trained or candidates < self.train_threshold:
+            # Small catalogs and selective filters are cheaper to scan exactly
+            yield from super()._search(queries, top_k, allowed)
+            return
+        assignments = self._assignments[:size]
+        n_probe = min(self.n_probe, len(self._centroids))
+        probes = np.argpartition(-(queries @ self._centroids.T), n_probe - 1, axis=1)[:, :n_probe]
+        for query, query_probes in zip(queries, probes):
+            rows = np.flatnonzero(np.isin(assignments, query_probes))
+            if allowed is not None:
+                rows = np.intersect1d(rows, allowed, assume_unique=True)
+            yield self._top_k(rows, self._vectors[rows] @ query, top_k)
+
+    def _params(self) -> Dict[str, Any]:
+        return {
+            **super()._params(),
+            "n_lists": self.n_lists,
+            "n_probe": self.n_probe,
+            "train_threshold": self.train_threshold,
+        }
+
+    def _save_extra(self, path: str) -> None:
+        _save_array(path, "assignments.npy", self._assignments[:len(self._ids)])
+        if self.trained:
+            _save_array(path, "centroids.npy", self._centroids)
+
+    def _load_extra(self, path: str, mmap_mode: Optional[str]) -> None:
+        self._assignments = np.load(os.path.join(path, "assignments.npy"), mmap_mode=mmap_mode)
+        centroids_path = os.path.join(path, "centroids.npy")
+        if os.path.exists(centroids_path):
+            self._centroids = np.load(centroids_path)
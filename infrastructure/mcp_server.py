@@ -1,36 +1,212 @@
 from fastapi import FastAPI, HTTPException
+from fastapi.responses import StreamingResponse
 from pydantic import BaseModel
-from typing import Dict, Any, List
+from typing import Dict, Any, List, Optional
+from agents.admission import AdmissionRejected, get_admission_controller
+from agents.base_agent import AgentContext
+from agents.registry import UnknownAgentError, build_default_registry
+from agents.runtime import AgentRuntime
 from core.config import settings
+from core.metrics import get_request_id, instrument_app
+from core.utils import setup_logging
+from infrastructure.clients import get_clients
+from infrastructure.image_embedder import ImageEmbedder
+from infrastructure.local_vector_index import ExactVectorIndex
+from infrastructure.vector_store import VectorStore
+import asyncio
 import logging
+import math
+import orjson
+import os
+import time
 
 logger = logging.getLogger(__name__)
 
+setup_logging()
 app = FastAPI(title="Racksavant MCP Server")
+instrument_app(app, service="mcp")
+
+runtime: Optional[AgentRuntime] = None
 
 class AgentRequest(BaseModel):
     agent_type: str
     input_data: Dict[str, Any]
+    context: Optional[AgentContext] = None
+    timeout: Optional[float] = None
 
 class AgentResponse(BaseModel):
     success: bool
     data: Dict[str, Any]
     error: Optional[str] = None
+    elapsed_seconds: Optional[float] = None
+    request_id: Optional[str] = None
+
+class RecommendationRequest(BaseModel):
+    description: Optional[str] = None
+    image_url: Optional[str] = None
+    current_context: str = ""
+    context: Optional[AgentContext] = None
+    timeout: Optional[float] = None
+
+class RecommendationResponse(BaseModel):
+    results: Dict[str, AgentResponse]
+    elapsed_seconds: float
+
+def _default_context() -> AgentContext:
+    return AgentContext(user_profile={}, conversation_history=[], current_state={})
+
+def _build_llm():
+    from langchain.chat_models import ChatOpenAI
+    return ChatOpenAI(
+        model_name=settings.default_model,
+        temperature=settings.temperature,
+        request_timeout=settings.agent_timeout_seconds,
+        max_retries=settings.http_max_retries
+    )
+
+@app.on_event("startup")
+async def start_runtime():
+    global runtime
+    try:
+        vector_store = VectorStore()
+    except Exception as e:
+        logger.error(f"Vector store unavailable, visual search disabled: {e}")
+        vector_store = None
+    catalog = None
+    if os.path.exists(settings.profile_catalog_index_path):
+        # Built offline with agents.profile_vectors.build_catalog_index(items).save(path)
+        catalog = ExactVectorIndex.load(settings.profile_catalog_index_path)
+    else:
+        logger.error("Profile catalog index not found, personalization disabled")
+    runtime = AgentRuntime(
+        # The embedder loads its model on first use, not at startup
+        build_default_registry(vector_store=vector_store, embedder=ImageEmbedder(), catalog=catalog),
+        _build_llm(),
+        max_concurrency=settings.agent_max_concurrency,
+        default_timeout=settings.agent_timeout_seconds
+    )
+
+@app.on_event("shutdown")
+async def close_clients():
+    await get_clients().aclose()
 
 @app.post("/agents/{agent_type}")
 async def process_agent_request(agent_type: str, request: AgentRequest) -> AgentResponse:
     """Process requests for different agent types."""
+    started = time.perf_counter()
     try:
-        # TODO: Implement actual agent routing and processing
-        # This is a placeholder implementation
+        data = await runtime.run(
+            agent_type,
+            request.input_data,
+            request.context or _default_context(),
+            timeout=request.timeout
+        )
         return AgentResponse(
-            success=True,
-            data={"message": f"Processing request for {agent_type}"}
+            success="error" not in data,
+            data=data,
+            error=data.get("error"),
+            elapsed_seconds=time.perf_counter() - started,
+            request_id=get_request_id()
+        )
+    except UnknownAgentError:
+        raise HTTPException(status_code=404, detail=f"Unknown agent type: {agent_type}")
+    except asyncio.TimeoutError:
+        raise HTTPException(status_code=504, detail=f"{agent_type} agent timed out")
+    except AdmissionRejected as e:
+        raise HTTPException(
+            status_code=503,
+            detail=f"{agent_type} agent is overloaded: {e}",
+            headers={"Retry-After": str(math.ceil(e.retry_after))}
         )
     except Exception as e:
         logger.error(f"Error processing request: {e}")
         raise HTTPException(status_code=500, detail=str(e))
 
+def _sse(event: str, data: Any) -> bytes:
+    return b"event: " + event.encode() + b"\ndata: " + orjson.dumps(data) + b"\n\n"
+
+@app.post("/agents/{agent_type}/stream")
+async def stream_agent_request(agent_type: str, request: AgentRequest) -> StreamingResponse:
+    """Stream an agent's progress as server-sent events.
+
+    Conversation sends ``token`` events as the LLM generates; personalization
+    and batch style classification send an ``item`` event per result as soon
+    as it is parsed. Every stream ends with a ``result`` or ``error`` event.
+    """
+    if agent_type not in runtime.registry:
+        raise HTTPException(status_code=404, detail=f"Unknown agent type: {agent_type}")
+    request_id = get_request_id()
+
+    async def events():
+        try:
+            async for event in runtime.stream(
+                agent_type,
+                request.input_data,
+                request.context or _default_context(),
+                timeout=request.timeout
+            ):
+                yield _sse(event["event"], event["data"])
+        except asyncio.TimeoutError:
+            yield _sse("error", {"error": f"{agent_type} agent timed out", "request_id": request_id})
+        except AdmissionRejected as e:
+            yield _sse("error", {
+                "error": f"{agent_type} agent is overloaded: {e}",
+                "retry_after": e.retry_after,
+                "request_id": request_id
+            })
+        except Exception as e:
+            logger.error(f"Error streaming {agent_type} agent: {e}")
+            yield _sse("error", {"error": str(e), "request_id": request_id})
+
+    return StreamingResponse(
+        events(),
+        media_type="text/event-stream",
+        # Stop proxies from buffering the stream and defeating the point
+        headers={"Cache-Control": "no-cache", "X-Accel-Buffering": "no"}
+    )
+
+@app.post("/recommendations")
+async def recommend(request: RecommendationRequest) -> RecommendationResponse:
+    """Run style classification, visual search and personalization concurrently."""
+    started = time.perf_counter()
+    requests: Dict[str, Dict[str, Any]] = {
+        "personalization": {"context": request.current_context}
+    }
+    if request.description or request.image_url:
+        requests["style_classification"] = {
+            "description": request.description or "",
+            "image_url": request.image_url or ""
+        }
+    if request.image_url:
+        requests["visual_search"] = {"image_url": request.image_url}
+    results = await runtime.fan_out(
+        requests,
+        request.context or _default_context(),
+        timeout=request.timeout
+    )
+    return RecommendationResponse(
+        results={
+            agent_type: AgentResponse(**result, request_id=get_request_id())
+            for agent_type, result in results.items()
+        },
+        elapsed_seconds=time.perf_counter() - started
+    )
+
+@app.get("/agents")
+async def list_agents() -> Dict[str, List[str]]:
+    """List the registered agent types."""
+    return {"agent_types": runtime.registry.agent_types()}
+
+@app.get("/stats/admission")
+async def admission_stats() -> Dict[str, Any]:
+    """Queue depth per priority and remaining rate-limit budget per model."""
+    controller = get_admission_controller()
+    return {
+        "enabled": controller is not None,
+        "agent_slots_queued": runtime.queued(),
+        "models": controller.stats() if controller is not None else {}
+    }
+
 @app.get("/health")
 async def health_check() -> Dict[str, str]:
     """Health check endpoint."""
@@ -0,0 +1,134 @@
+import threading
+import time
+from collections import OrderedDict
+from typing import Any, Dict, FrozenSet, Iterable, Optional, Tuple
+
+import orjson
+
+from core.config import settings
+from core.metrics import REGISTRY, Counter
+
+# Boolean clause lists whose order doesn't change the result
+UNORDERED_CLAUSES = frozenset({"must", "filter", "should", "must_not"})
+
+CACHE_REQUESTS: Counter = REGISTRY.register(Counter(
+    "racksavant_search_cache_requests_total",
+    "Elasticsearch result cache lookups",
+    ("kind", "result")
+))
+
+def _sort_key(item: Any) -> bytes:
+    return orjson.dumps(item, option=orjson.OPT_SORT_KEYS)
+
+def _field_name(field: str) -> str:
+    """``name^2`` -> ``name``."""
+    return field.split("^", 1)[0]
+
+def _normalize(node: Any, text_fields: FrozenSet[str], key: Optional[str] = None, text: bool = False) -> Any:
+    """``text`` marks a value that is analyzed query text when it is a string."""
+    if isinstance(node, dict):
+        if key == "multi_match":
+            # Only fold case when every targeted field is analyzed; keyword
+            # fields (and the all-fields default) match case-sensitively
+            fields = node.get("fields")
+            analyzed = bool(fields) and all(_field_name(field) in text_fields for field in fields)
+            children = {k: _normalize(v, text_fields, k, analyzed and k == "query") for k, v in node.items()}
+        elif key in ("match", "match_phrase"):
+            # {"match": {"name": "..."}} or {"match": {"name": {"query": "..."}}}
+            children = {
+                field: {
+                    k: _normalize(inner, text_fields, k, field in text_fields and k == "query")
+                    for k, inner in v.items()
+                }
+                if isinstance(v, dict) else _normalize(v, text_fields, field, field in text_fields)
+                for field, v in node.items()
+            }
+        else:
+            children = {k: _normalize(v, text_fields, k) for k, v in node.items()}
+        if key == "terms":
+            # {"terms": {"brand": [...]}} matches any listed value, in any order
+            children = {
+                k: sorted(v, key=_sort_key) if isinstance(v, list) else v
+                for k, v in children.items()
+            }
+        return children
+    if isinstance(node, list):
+        items = [_normalize(item, text_fields) for item in node]
+        if key in UNORDERED_CLAUSES:
+            items.sort(key=_sort_key)
+        return items
+    if text and isinstance(node, str):
+        # The analyzer lowercases and splits on whitespace anyway
+        return " ".join(node.lower().split())
+    return node
+
+def normalize_query(query: Dict[str, Any], text_fields: Iterable[str] = ()) -> bytes:
+    """Canonical cache key for a search body.
+
+    Keys are sorted, bool clause lists and ``terms`` values are ordered, and
+    full-text ``query`` strings aimed only at ``text_fields`` (fields mapped
+    as ``text``) are lowercased with whitespace collapsed, so bodies that
+    differ only in those ways share a cache entry.
+    """
+    return orjson.dumps(_normalize(query, frozenset(text_fields)), option=orjson.OPT_SORT_KEYS)
+
+class SearchCache:
+    """TTL + LRU cache of serialized search responses for one index.
+
+    Entries are stored as JSON bytes so callers always get a fresh copy they
+    can mutate. ``invalidate`` drops everything and bumps a generation
+    counter; a search that started before the invalidation can't store its
+    (possibly stale) response afterwards.
+    """
+
+    def __init__(self, max_entries: int = 1000):
+        self.max_entries = max_entries
+        self._entries: "OrderedDict[Tuple[str, bytes], Tuple[bytes, float]]" = OrderedDict()
+        self._lock = threading.Lock()
+        self.generation = 0
+
+    def get(self, kind: str, key: bytes) -> Optional[Any]:
+        with self._lock:
+            entry = self._entries.get((kind, key))
+            if entry is not None and entry[1] < time.monotonic():
+                del self._entries[(kind, key)]
+                entry = None
+            if entry is not None:
+                self._entries.move_to_end((kind, key))
+        CACHE_REQUESTS.inc(kind=kind, result="miss" if entry is None else "hit")
+        return None if entry is None else orjson.loads(entry[0])
+
+    def set(self, kind: str, key: bytes, value: Any, ttl_seconds: float, generation: int) -> None:
+        if ttl_seconds <= 0 or self.max_entries <= 0:
+            return
+        data = orjson.dumps(value)
+        with self._lock:
+            if generation != self.generation:
+                return
+            self._entries[(kind, key)] = (data, time.monotonic() + ttl_seconds)
+            self._entries.move_to_end((kind, key))
+            while len(self._entries) > self.max_entries:
+                self._entries.popitem(last=False)
+
+    def invalidate(self) -> None:
+        with self._lock:
+            self._entries.clear()
+            self.generation += 1
+
+    def __len__(self) -> int:
+        return len(self._entries)
+
+_caches: Dict[str, SearchCache] = {}
+_caches_lock = threading.Lock()
+
+def get_search_cache(index_name: str) -> SearchCache:
+    """Return the process-wide result cache for ``index_name``.
+
+    Shared by every ``ElasticsearchClient`` on the same index, so a write
+    through any of them invalidates results cached by the others.
+    """
+    with _caches_lock:
+        cache = _caches.get(index_name)
+        if cache is None:
+            cache = _caches[index_name] = SearchCache(settings.es_query_cache_size)
+        return cache
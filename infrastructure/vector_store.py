@@ -1,50 +1,344 @@
-import pinecone
-from typing import Dict, List, Any, Optional
+from abc import ABC, abstractmethod
+from concurrent.futures import FIRST_COMPLETED, ThreadPoolExecutor, wait
+from typing import Dict, List, Any, Iterable, Optional, Sequence
+from pydantic import BaseModel
 from core.config import settings
+from core.metrics import timed
+from core.utils import iter_batches, retry_with_backoff
+from infrastructure.clients import get_clients
+from infrastructure.local_vector_index import ExactVectorIndex, IVFVectorIndex
 import logging
+import os
+import threading
+import time
 
 logger = logging.getLogger(__name__)
 
-class VectorStore:
-    """Vector store implementation using Pinecone."""
-    
+class BatchFailure(BaseModel):
+    """A bulk upsert batch that still failed after all retries."""
+    batch_index: int
+    ids: List[str]
+    error: str
+
+class BulkUpsertReport(BaseModel):
+    """Outcome of a bulk upsert run."""
+    upserted: int = 0
+    failed: int = 0
+    batches: int = 0
+    failures: List[BatchFailure] = []
+    elapsed_seconds: float = 0.0
+    vectors_per_second: float = 0.0
+
+class VectorBackend(ABC):
+    """Interface implemented by every vector index backend."""
+
+    @abstractmethod
+    def create_index(self) -> bool:
+        """Create or open the index."""
+        pass
+
+    @abstractmethod
+    def upsert(self, vectors: List[Dict[str, Any]]) -> None:
+        """Insert or replace vectors."""
+        pass
+
+    @abstractmethod
+    def query(
+        self,
+        vector: Sequence[float],
+        top_k: int,
+        filter: Optional[Dict[str, Any]] = None
+    ) -> List[Dict[str, Any]]:
+        """Return the closest matches with their metadata.
+
+        ``filter`` is a Pinecone-style metadata filter applied before ranking.
+        """
+        pass
+
+    def query_many(
+        self,
+        vectors: Sequence[Sequence[float]],
+        top_k: int,
+        filter: Optional[Dict[str, Any]] = None
+    ) -> List[List[Dict[str, Any]]]:
+        """Answer several queries; backends override this when they can batch."""
+        return [self.query(vector, top_k, filter) for vector in vectors]
+
+    @abstractmethod
+    def delete(self, ids: List[str]) -> None:
+        """Remove vectors by id; unknown ids are ignored."""
+        pass
+
+    @abstractmethod
+    def fetch(self, ids: List[str]) -> Dict[str, Dict[str, Any]]:
+        """Return stored ``values``/``metadata`` by id; unknown ids are skipped."""
+        pass
+
+    def persist(self) -> None:
+        """Flush the index to durable storage, if the backend needs it."""
+        pass
+
+class PineconeBackend(VectorBackend):
+    """Vector backend using a hosted Pinecone index."""
+
     def __init__(self):
-        pinecone.init(
-            api_key=settings.pinecone_api_key,
-            environment=settings.pinecone_environment
-        )
+        # pinecone.init runs once per process, not once per backend
+        self._clients = get_clients()
+        self._pinecone = self._clients.pinecone()
         self.index_name = settings.vector_store_index
-        
+
+    @property
+    def index(self):
+        return self._clients.pinecone_index(self.index_name)
+
     def create_index(self) -> bool:
-        """Create Pinecone index if it doesn't exist."""
-        if self.index_name not in pinecone.list_indexes():
-            pinecone.create_index(
+        if self.index_name not in self._pinecone.list_indexes():
+            self._pinecone.create_index(
                 self.index_name,
                 dimension=settings.vector_store_dimension,
-                metric="cosine"
+                metric=settings.vector_store_metric
             )
         return True
-    
+
+    def upsert(self, vectors: List[Dict[str, Any]]) -> None:
+        self.index.upsert(vectors)
+
+    def query(
+        self,
+        vector: Sequence[float],
+        top_k: int,
+        filter: Optional[Dict[str, Any]] = None
+    ) -> List[Dict[str, Any]]:
+        results = self.index.query(
+            vector=list(vector),
+            top_k=top_k,
+            filter=filter,
+            include_metadata=True
+        )
+        return results["matches"]
+
+    def delete(self, ids: List[str]) -> None:
+        self.index.delete(ids=list(ids))
+
+    def fetch(self, ids: List[str]) -> Dict[str, Dict[str, Any]]:
+        vectors = self.index.fetch(ids=list(ids))["vectors"]
+        return {
+            vector_id: {"values": vector["values"], "metadata": vector.get("metadata", {})}
+            for vector_id, vector in vectors.items()
+        }
+
+class LocalBackend(VectorBackend):
+    """In-process NumPy vector backend persisted to memory-mapped files.
+
+    Uses exact search by default; ``index_type="ivf"`` switches to the
+    approximate inverted-file index for large catalogs.
+    """
+
+    def __init__(self, path: Optional[str] = None, index_type: str = "exact"):
+        self.path = path
+        self.index_type = index_type
+        self.index = None
+        self._lock = threading.Lock()
+
+    def create_index(self) -> bool:
+        with self._lock:
+            if self.index is None:
+                self.index = self._open_index()
+        return True
+
+    def _open_index(self):
+        if self.path and os.path.exists(os.path.join(self.path, "records.json")):
+            index = ExactVectorIndex.load(self.path)
+            logger.info(f"Loaded {len(index)} vectors from {self.path}")
+            return index
+        if self.index_type == "ivf":
+            return IVFVectorIndex(
+                settings.vector_store_dimension,
+                metric=settings.vector_store_metric,
+                n_lists=settings.local_vector_index_lists,
+                n_probe=settings.local_vector_index_probes
+            )
+        return ExactVectorIndex(
+            settings.vector_store_dimension,
+            metric=settings.vector_store_metric
+        )
+
+    def upsert(self, vectors: List[Dict[str, Any]]) -> None:
+        self.create_index()
+        self.index.upsert(vectors)
+
+    def query(
+        self,
+        vector: Sequence[float],
+        top_k: int,
+        filter: Optional[Dict[str, Any]] = None
+    ) -> List[Dict[str, Any]]:
+        self.create_index()
+        return self.index.query(vector, top_k=top_k, filter=filter)
+
+    def query_many(
+        self,
+        vectors: Sequence[Sequence[float]],
+        top_k: int,
+        filter: Optional[Dict[str, Any]] = None
+    ) -> List[List[Dict[str, Any]]]:
+        self.create_index()
+        return self.index.query_many(vectors, top_k=top_k, filter=filter)
+
+    def delete(self, ids: List[str]) -> None:
+        self.create_index()
+        self.index.delete(ids)
+
+    def fetch(self, ids: List[str]) -> Dict[str, Dict[str, Any]]:
+        self.create_index()
+        return self.index.fetch(ids)
+
+    def persist(self) -> None:
+        if self.path and self.index is not None:
+            self.index.save(self.path)
+
+def create_backend(name: Optional[str] = None) -> VectorBackend:
+    """Build the vector backend named in settings (``pinecone`` or ``local``)."""
+    name = name or settings.vector_store_backend
+    if name == "pinecone":
+        return PineconeBackend()
+    if name == "local":
+        return LocalBackend(
+            path=settings.local_vector_index_path,
+            index_type=settings.local_vector_index_type
+        )
+    raise ValueError(f"Unknown vector store backend: {name}")
+
+class VectorStore:
+    """Vector store with a pluggable backend (Pinecone or local)."""
+
+    def __init__(self, backend: Optional[VectorBackend] = None):
+        self.index_name = settings.vector_store_index
+        self.backend = backend or create_backend()
+
+    def create_index(self) -> bool:
+        """Create the index if it doesn't exist."""
+        return self.backend.create_index()
+
     def upsert(self, vectors: List[Dict[str, Any]]) -> bool:
         """Upsert vectors into the index."""
         try:
-            pinecone_index = pinecone.Index(self.index_name)
-            pinecone_index.upsert(vectors)
+            self.backend.upsert(vectors)
             return True
         except Exception as e:
             logger.error(f"Error upserting vectors: {e}")
             return False
-    
-    def similarity_search(self, query_vector: List[float], k: int = 5) -> List[Dict[str, Any]]:
-        """Perform similarity search."""
+
+    def bulk_upsert(
+        self,
+        vectors: Iterable[Dict[str, Any]],
+        batch_size: int = 100,
+        max_workers: int = 4,
+        max_retries: int = 3
+    ) -> BulkUpsertReport:
+        """Stream vectors into the index in concurrent, retried batches.
+
+        The iterable is consumed lazily and at most ``2 * max_workers``
+        batches are in flight at once, so memory use does not depend on
+        catalog size. Batches that keep failing are recorded in the report
+        rather than aborting the run.
+        """
+        report = BulkUpsertReport()
+        started = time.perf_counter()
+
+        def send(batch: List[Dict[str, Any]]) -> int:
+            retry_with_backoff(self.backend.upsert, batch, max_retries=max_retries)
+            return len(batch)
+
+        with ThreadPoolExecutor(max_workers=max_workers) as executor:
+            in_flight = {}
+
+            def collect(done) -> None:
+                for future in done:
+                    batch_index, batch = in_flight.pop(future)
+                    try:
+                        report.upserted += future.result()
+                    except Exception as e:
+                        logger.error(f"Error upserting batch {batch_index}: {e}")
+                        report.failed += len(batch)
+                        report.failures.append(BatchFailure(
+                            batch_index=batch_index,
+                            ids=[str(vector["id"]) for vector in batch],
+                            error=str(e)
+                        ))
+
+            for batch_index, batch in enumerate(iter_batches(vectors, batch_size)):
+                if len(in_flight) >= 2 * max_workers:
+                    done, _ = wait(in_flight, return_when=FIRST_COMPLETED)
+                    collect(done)
+                in_flight[executor.submit(send, batch)] = (batch_index, batch)
+                report.batches += 1
+            collect(wait(in_flight).done)
+
+        report.elapsed_seconds = time.perf_counter() - started
+        if report.elapsed_seconds > 0:
+            report.vectors_per_second = report.upserted / report.elapsed_seconds
+        logger.info(
+            f"Bulk upserted {report.upserted} vectors in {report.batches} batches "
+            f"({report.vectors_per_second:.0f}/s, {report.failed} failed)"
+        )
+        return report
+
+    def delete(self, ids: Iterable[str], batch_size: int = 1000, max_retries: int = 3) -> List[str]:
+        """Delete vectors by id in retried batches.
+
+        Returns the ids whose batch kept failing, so callers can retry them.
+        """
+        failed = []
+        for batch in iter_batches(ids, batch_size):
+            try:
+                retry_with_backoff(self.backend.delete, batch, max_retries=max_retries)
+            except Exception as e:
+                logger.error(f"Error deleting {len(batch)} vectors: {e}")
+                failed.extend(batch)
+        return failed
+
+    def fetch(self, ids: List[str]) -> Dict[str, Dict[str, Any]]:
+        """Return stored vectors by id; unknown ids (and failed lookups) are skipped."""
         try:
-            pinecone_index = pinecone.Index(self.index_name)
-            results = pinecone_index.query(
-                vector=query_vector,
-                top_k=k,
-                include_metadata=True
-            )
-            return results["matches"]
+            return self.backend.fetch(ids)
+        except Exception as e:
+            logger.error(f"Error fetching vectors: {e}")
+            return {}
+
+    def similarity_search(
+        self,
+        query_vector: List[float],
+        k: int = 5,
+        filter: Optional[Dict[str, Any]] = None
+    ) -> List[Dict[str, Any]]:
+        """Perform similarity search, optionally pre-filtered on metadata."""
+        try:
+            with timed("vector_query"):
+                return self.backend.query(query_vector, top_k=k, filter=filter)
         except Exception as e:
             logger.error(f"Error performing similarity search: {e}")
             return []
+
+    def similarity_search_many(
+        self,
+        query_vectors: List[List[float]],
+        k: int = 5,
+        filter: Optional[Dict[str, Any]] = None
+    ) -> List[List[Dict[str, Any]]]:
+        """Perform similarity search for several query vectors at once."""
+        try:
+            with timed("vector_query"):
+                return self.backend.query_many(query_vectors, top_k=k, filter=filter)
+        except Exception as e:
+            logger.error(f"Error performing similarity search: {e}")
+            return [[] for _ in query_vectors]
+
+    def save(self) -> bool:
+        """Persist the index, for backends that keep it locally."""
+        try:
+            self.backend.persist()
+            return True
+        except Exception as e:
+            logger.error(f"Error saving vector index: {e}")
+            return False
@@ -112,6 +112,7 @@ function App() {
         {
           ...data,
           imageUrl: `${BACKEND_URL}${data.image_url}`,
+          thumbnailUrl: data.thumbnail_url && `${BACKEND_URL}${data.thumbnail_url}`,
         },
         ...prev,
       ]);
@@ -120,6 +121,7 @@ function App() {
         {
           ...data,
           imageUrl: `${BACKEND_URL}${data.image_url}`,
+          thumbnailUrl: data.thumbnail_url && `${BACKEND_URL}${data.thumbnail_url}`,
         },
         ...prev,
       ]);
@@ -217,8 +219,9 @@ function App() {
             {item.imageUrl && (
               <div style={{ textAlign: "center", marginBottom: 20 }}>
                 <img
-                  src={item.imageUrl}
+                  src={item.thumbnailUrl || item.imageUrl}
                   alt={item.predicted_class || item.name}
+                  loading="lazy"
                   style={{ maxWidth: 120, maxHeight: 120, borderRadius: 10, marginBottom: 10 }}
                 />
               </div>